@@ -2,18 +2,29 @@ import streamlit as st
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
-import re
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np
 import time
-from gspread.exceptions import APIError
+from storage import open_store
+from bulk_writer import IngestLedger
+from ingest_queue import IngestQueue
+from prepared import PreparedCache, read_with_retry
+from pickup import PickupIndex
+from netting import NettingIndex
+from cube import rollup, lead_rollup, pacing_matrix, budget_vs_actual
+from curve import booking_curves, period_curve, CHECKPOINTS
+from perf import PERF
+from sheets import SheetsHandle
+from report import ReportBuilder, default_stay_range, report_key
+from schema import with_derived
 
 # ------------------------------------------------------------------------------
 # 0. 스타일 & 유틸리티
 # ------------------------------------------------------------------------------
 st.set_page_config(page_title="ARI Final Integrity", layout="wide")
+# 이번 화면 실행의 계측 묶음 (사이드바 진단 패널 / perf 로그)
+perf_run = PERF.begin_run("app")
 st.markdown("""
 <style>
     div[data-testid="stMetricValue"] { font-size: 24px !important; font-weight: 800; color: #333; }
@@ -25,317 +36,458 @@ st.markdown("""
 # ------------------------------------------------------------------------------
 # 1. 구글 시트 연결 & 캐싱
 # ------------------------------------------------------------------------------
-def get_gspread_client():
-    try:
-        creds_info = st.secrets["gcp_service_account"]
-        scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+# 인증 + 스프레드시트 열기는 프로세스당 1회 (세션 간 공유). 실패하면 캐시되지 않아 다음 실행 때 다시 시도
+@st.cache_resource(show_spinner=False)
+def get_sheets():
+    creds_info = st.secrets["gcp_service_account"]
+    scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+    with PERF.timer('sheets.authorize'):
         creds = Credentials.from_service_account_info(creds_info, scopes=scope)
-        return gspread.authorize(creds)
-    except Exception as e:
-        st.error(f"❌ 인증 오류: {e}")
-        return None
-
-@st.cache_data(ttl=600)
-def load_data_from_sheet(_sheet_obj):
-    max_retries = 5
-    for i in range(max_retries):
-        try:
-            return _sheet_obj.get_all_values()
-        except APIError as e:
-            if e.response.status_code == 429:
-                time.sleep((2 ** i) + 1)
-                continue
-            else:
-                raise e
-    return []
-
-# ------------------------------------------------------------------------------
-# 2. 데이터 처리 엔진 (리드타임 계산 로직 삭제 -> 원본 사용)
-# ------------------------------------------------------------------------------
-def normalize_and_map_columns(df):
-    col_map = {}
-    rules = {
-        'CheckIn': ['checkin', 'check-in', 'arrival', '입실', '일자', 'date'],
-        'Guest_Name': ['guest', 'name', 'customer', '고객', '투숙객', '성명'],
-        'Booking_Date': ['booking', 'create', 'res', '예약', '생성'],
-        'Rooms': ['room', 'qty', 'rmws', '객실수', '수량'],
-        'Nights': ['night', 'los', '박수', '박'],
-        'Room_Revenue': ['room_rev', 'revenue', 'roomrate', '객실료', '매출'],
-        'Total_Revenue': ['total', 'amount', '총금액', '합계'],
-        'Segment': ['segment', '세그먼트'],
-        'Account': ['account', 'source', 'agent', '거래처', '에이전시'],
-        'Room_Type': ['type', 'cat', '객실타입', '룸타입'],
-        'Nat_Orig': ['nation', 'country', 'nat', '국적'],
-        'Lead_Time': ['lead', '리드', 'lt', 'l/t'] # 리드타임 컬럼 인식
-    }
-
-    for original_col in df.columns:
-        clean_col = str(original_col).lower().replace(" ", "").replace("_", "").replace("-", "")
-        mapped = False
-        for target_col, keywords in rules.items():
-            for kw in keywords:
-                if kw in clean_col:
-                    if target_col == 'Room_Revenue' and 'total' in clean_col: continue
-                    if target_col == 'Total_Revenue' and 'room' in clean_col and 'total' not in clean_col: continue
-                    if target_col == 'CheckIn' and ('book' in clean_col or 'res' in clean_col): continue
-                    
-                    if target_col not in col_map.values():
-                        col_map[original_col] = target_col
-                        mapped = True
-                        break
-            if mapped: break
-    return df.rename(columns=col_map)
-
-def find_valid_header_row(df):
-    for i, row in df.iterrows():
-        row_str = " ".join(row.astype(str).values).lower()
-        keywords = ['guest', 'name', 'check', 'date', 'room', '고객', '입실', '객실']
-        if sum(1 for k in keywords if k in row_str) >= 2:
-            df.columns = df.iloc[i]
-            return df.iloc[i+1:].reset_index(drop=True)
-    return df
-
-def process_data(uploaded_file, status, sub_segment="General"):
-    try:
-        is_otb = "Sales on the Book" in uploaded_file.name or "영업 현황" in uploaded_file.name
-        
-        if uploaded_file.name.endswith('.csv'):
-            df_raw = pd.read_csv(uploaded_file, header=None)
-        else:
-            df_raw = pd.read_excel(uploaded_file, header=None)
-
-        if is_otb:
-            # [OTB]
-            df_raw = find_valid_header_row(df_raw)
-            if '일자' in df_raw.columns: 
-                df_raw = df_raw[~df_raw['일자'].astype(str).str.contains('소계|Subtotal|합계|Total', na=False)]
-            elif df_raw.shape[1] > 0:
-                df_raw = df_raw[~df_raw.iloc[:, 0].astype(str).str.contains('소계|Subtotal|합계|Total', na=False)]
-
-            df = pd.DataFrame()
-            df['Guest_Name'] = f'OTB_{sub_segment}_DATA'
-            
-            date_col = next((c for c in df_raw.columns if '일자' in str(c) or 'Date' in str(c)), df_raw.columns[0])
-            df['CheckIn'] = pd.to_datetime(df_raw[date_col], errors='coerce')
-            
-            try:
-                df['RN'] = pd.to_numeric(df_raw.iloc[:, -5], errors='coerce').fillna(0)
-                df['Room_Revenue'] = pd.to_numeric(df_raw.iloc[:, -1], errors='coerce').fillna(0)
-                df['ADR'] = pd.to_numeric(df_raw.iloc[:, -3], errors='coerce').fillna(0)
-                df['Total_Revenue'] = df['Room_Revenue']
-            except:
-                df['RN'] = 0; df['Room_Revenue'] = 0; df['ADR'] = 0; df['Total_Revenue'] = 0
-
-            df['Booking_Date'] = df['CheckIn']
-            df['Segment'] = f'OTB_{sub_segment}'
-            df['Account'] = 'OTB_Summary'
-            df['Room_Type'] = 'Run of House'
-            df['Nat_Orig'] = 'KOR'
-            df['Lead_Time'] = 0
-            
-        else:
-            # [리스트]
-            df_raw = find_valid_header_row(df_raw)
-            df_raw = df_raw[~df_raw.iloc[:, 0].astype(str).str.contains('합계|Total|소계|Subtotal', case=False, na=False)]
-            
-            df = normalize_and_map_columns(df_raw).copy()
-            if 'Guest_Name' in df.columns:
-                df = df[~df['Guest_Name'].astype(str).str.contains('합계|Total|소계|Subtotal', case=False, na=False)]
-            
-            if 'CheckIn' not in df.columns: return pd.DataFrame()
-            if 'Booking_Date' not in df.columns: df['Booking_Date'] = df['CheckIn']
-            
-            req_cols = ['Rooms', 'Nights', 'Room_Revenue', 'Total_Revenue', 'Guest_Name', 'Segment', 'Account', 'Room_Type', 'Nat_Orig', 'Lead_Time']
-            for c in req_cols:
-                if c not in df.columns: 
-                    if c in ['Rooms', 'Nights', 'Room_Revenue', 'Total_Revenue', 'Lead_Time']: df[c] = 0 
-                    else: df[c] = 'Unknown'
-
-            for col in ['Room_Revenue', 'Total_Revenue', 'Rooms', 'Nights', 'Lead_Time']:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-            df['Total_Revenue'] = np.where(df['Total_Revenue'] == 0, df['Room_Revenue'], df['Total_Revenue'])
-            df['RN'] = df['Rooms'] * df['Nights'].replace(0, 1)
-            
-            df['Is_Zero_Rate'] = df['Room_Revenue'] <= 0
-            df['ADR'] = df.apply(lambda x: x['Room_Revenue'] / x['RN'] if x['RN'] > 0 else 0, axis=1)
-
-        # 공통
-        df['Snapshot_Date'] = datetime.now().strftime('%Y-%m-%d')
-        df['Status'] = status
-        
-        df['CheckIn_dt'] = pd.to_datetime(df['CheckIn'], errors='coerce')
-        df['Booking_dt'] = pd.to_datetime(df['Booking_Date'], errors='coerce')
-        df.loc[df['Booking_dt'].isna(), 'Booking_dt'] = df.loc[df['Booking_dt'].isna(), 'CheckIn_dt']
-        
-        df = df.dropna(subset=['CheckIn_dt'])
-
-        df['Stay_Month'] = df['CheckIn_dt'].dt.strftime('%Y-%m')
-        df['Booking_Month'] = df['Booking_dt'].dt.strftime('%Y-%m')
-        df['Stay_YearWeek'] = df['CheckIn_dt'].dt.strftime('%Y-%U주')
-        df['Day_of_Week'] = df['CheckIn_dt'].dt.day_name()
-        
-        df['Weekday_Num'] = df['CheckIn_dt'].dt.weekday
-        df['Day_Type'] = df['Weekday_Num'].apply(lambda x: 'Weekend' if x >= 4 else 'Weekday')
-
-        # [지배인님 요청] 리드타임 강제 계산 로직 삭제 -> 엑셀 값 그대로 사용
-        df['Lead_Time'] = df['Lead_Time'].fillna(0).astype(int)
-        
-        def classify_nat(row):
-            name = str(row.get('Guest_Name', ''))
-            orig = str(row.get('Nat_Orig', '')).upper()
-            if re.search('[가-힣]', name): return 'KOR'
-            if any(x in orig for x in ['CHN', 'HKG', 'TWN', 'MAC']): return 'CHN'
-            return 'OTH'
-        df['Nat_Group'] = df.apply(classify_nat, axis=1)
-
-        def get_month_label(row_dt):
-            try:
-                curr = datetime.now()
-                offset = (row_dt.year - curr.year) * 12 + (row_dt.month - curr.month)
-                if offset == 0: return "0.당월(M)"
-                elif offset == 1: return "1.익월(M+1)"
-                elif offset == 2: return "2.익익월(M+2)"
-                else: return "3.그외"
-            except: return "Unknown"
-        df['Month_Label'] = df['CheckIn_dt'].apply(get_month_label)
-
-        df['CheckIn'] = df['CheckIn_dt'].dt.strftime('%Y-%m-%d')
-        cols = ['Guest_Name', 'CheckIn', 'RN', 'Room_Revenue', 'Total_Revenue', 'ADR', 'Segment', 'Account', 'Room_Type', 'Snapshot_Date', 'Status', 'Stay_Month', 'Booking_Month', 'Stay_YearWeek', 'Lead_Time', 'Day_Type', 'Day_of_Week', 'Nat_Group', 'Month_Label', 'Is_Zero_Rate']
-        
-        final_df = pd.DataFrame()
-        for c in cols:
-            final_df[c] = df[c] if c in df.columns else ''
-        return final_df
-
-    except Exception as e:
-        return pd.DataFrame()
+        client = PERF.watch_client(gspread.authorize(creds))
+    with PERF.timer('sheets.open'):
+        return SheetsHandle(client)
+
+# 업로드 장부 (파일/행 해시) - 같은 파일 재업로드 시 중복 적재 방지
+@st.cache_resource
+def get_ledger():
+    return IngestLedger()
+
+# 저장소: 로컬 SQLite(기본) + 구글 시트 미러. 프로세스당 1개 (시트에서 가져온 이력은 장부에도 기록)
+@st.cache_resource
+def get_store(_sheet_obj, _ledger):
+    return open_store(_sheet_obj, ledger=_ledger)
+
+# OTB 스냅샷 픽업 인덱스. 아직 구성 전이면 저장소에 쌓인 OTB 이력으로 1회 구성 (OTB 가 없어도 다시 읽지 않음)
+@st.cache_resource
+def get_pickup(_store):
+    pickup = PickupIndex()
+    if not pickup.built:
+        pickup.rebuild(_store)
+    return pickup
+
+# 백그라운드 업로드 큐 (프로세스당 1개, 세션 간 공유)
+# 취소 상계 인덱스 (예약 키 해시로 취소 <-> 원 예약 매칭). 아직 구성 전이면 저장소의 리스트 행으로 1회 구성
+@st.cache_resource
+def get_netting(_store):
+    netting = NettingIndex()
+    if not netting.built:
+        netting.rebuild(_store)
+    return netting
+
+@st.cache_resource
+def get_ingest_queue(_store, _ledger, _pickup, _netting):
+    return IngestQueue(_store, _ledger, _pickup, netting=_netting)
+
+# 화면용 준비 데이터 (파생 컬럼/분리 프레임/큐브). 저장소 버전 + 조회 기간당 1회 계산, 세션 간 공유
+# 조회 기간(입실월) 필터는 저장소에서 처리 -> 전체 이력을 메모리에 올리지 않음
+@st.cache_resource
+def get_prepared_cache():
+    return PreparedCache()
+
+# 정적 GM 리포트 빌더 (차트 렌더링 프로세스 풀 + 디스크 캐시). 프로세스당 1개
+@st.cache_resource
+def get_report_builder():
+    return ReportBuilder()
 
 # ------------------------------------------------------------------------------
 # 3. 공통 분석 모듈 (세그먼트 월별 상세 + 페이싱 ADR 완벽 복구)
 # ------------------------------------------------------------------------------
-def render_rich_analysis(target_df, title_prefix, color_scale="Blues"):
-    if target_df.empty:
+# 선택된 탭만 실행 (streamlit 의 on_change="rerun" 탭: 닫힌 탭은 .open == False)
+# 지원하지 않는 버전이면 기존처럼 모든 탭을 실행
+def lazy_tabs(labels, key):
+    try:
+        tabs = st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        tabs = st.tabs(labels)
+    return [(tab, getattr(tab, 'open', None) is not False) for tab in tabs]
+
+# 그림 사양 캐시: (화면 버전, 그림 이름, 옵션) 단위. 같은 조합은 집계/그림 생성 없이 바로 반환
+# view_version = (데이터 버전, 조회 기간) -> 데이터가 바뀌면 자동으로 새로 생성
+@st.cache_data(max_entries=256)
+def _figure_spec(view_version, name, option, _build):
+    with PERF.timer('chart.build', chart=name):
+        return _build().to_dict()
+
+# 표 데이터 캐시 (그림과 같은 키 규칙)
+@st.cache_data(max_entries=256)
+def _table_data(view_version, name, _build):
+    with PERF.timer('table.build', table=name):
+        return _build()
+
+# 캐시 적중 여부 기록: 생성 함수가 실제로 불렸으면 실패
+def figure_spec(view_version, name, option, _build):
+    built = []
+    spec = _figure_spec(view_version, name, option, lambda: built.append(name) or _build())
+    PERF.cache('figure', hit=not built)
+    return spec
+
+def table_data(view_version, name, _build):
+    built = []
+    data = _table_data(view_version, name, lambda: built.append(name) or _build())
+    PERF.cache('table', hit=not built)
+    return data
+
+def pacing_figure(target_cube, metric, label, color_scale):
+    fmt = {'ADR': ".0f", 'RN': "d", 'Room_Revenue': ".2s"}[metric]
+    return px.imshow(pacing_matrix(target_cube, metric), text_auto=fmt, aspect="auto", color_continuous_scale=color_scale, title=f"Booking Pattern ({label})")
+
+def lead_figure(target_cube, title_prefix):
+    lead_stats = lead_rollup(target_cube)
+    fig_lead = go.Figure()
+    fig_lead.add_trace(go.Bar(x=lead_stats['Lead_Group'], y=lead_stats['RN'], name='RN', marker_color='red' if "취소" in title_prefix else 'blue'))
+    fig_lead.add_trace(go.Scatter(x=lead_stats['Lead_Group'], y=lead_stats['ADR'], name='ADR', yaxis='y2', line=dict(color='black', width=2)))
+    fig_lead.update_layout(yaxis2=dict(overlaying='y', side='right', title='ADR'), title="리드타임별 물량 vs 단가")
+    return fig_lead
+
+# Pacing 기준 전환은 이 차트만 다시 실행 (전체 스크립트 재실행 없음)
+@st.fragment
+@PERF.timed('render.pacing')
+def render_pacing(target_cube, title_prefix, color_scale, view_version):
+    # [복구] ADR 선택 옵션
+    pivot_metric = st.radio("분석 기준", ["객실수 (RN)", "객실매출", "객실단가 (ADR)"], horizontal=True, key=f"{title_prefix}_pacing_radio")
+    metric = 'ADR' if "ADR" in pivot_metric else ('RN' if "RN" in pivot_metric else 'Room_Revenue')
+    spec = figure_spec(view_version, f"{title_prefix}_pacing", metric,
+                       lambda: pacing_figure(target_cube, metric, pivot_metric, color_scale))
+    st.plotly_chart(spec, use_container_width=True, key=f"{title_prefix}_pacing")
+
+# target_cube: build_cube() 결과를 slice_cube() 로 자른 부분 큐브
+@PERF.timed('render.analysis')
+def render_rich_analysis(target_cube, title_prefix, color_scale="Blues", view_version=None):
+    if target_cube.empty:
         st.warning(f"⚠️ {title_prefix} 데이터가 없습니다.")
         return
 
-    # 탭 구성
-    t1, t2, t3, t4, t5, t6 = st.tabs([
+    def fig(name, build):
+        return figure_spec(view_version, f"{title_prefix}_{name}", None, build)
+
+    def table(name, build):
+        return table_data(view_version, f"{title_prefix}_{name}", build)
+
+    # 탭 구성 (선택된 탭만 실행)
+    (t1, o1), (t2, o2), (t3, o3), (t4, o4), (t5, o5), (t6, o6) = lazy_tabs([
         "📊 세그먼트 분석", "📅 예약패턴(Pacing)", "🏢 거래처", 
         "⏳ 리드타임", "🛏️ 객실타입", "🗓️ 요일별"
-    ])
+    ], key=f"{title_prefix}_tabs")
     
     # 1. 세그먼트 (월별 상세 복구)
     with t1:
-        st.subheader(f"📊 {title_prefix} 세그먼트 상세")
-        seg_stats = target_df.groupby('Segment').agg({'RN': 'sum', 'Room_Revenue': 'sum'}).reset_index()
-        seg_stats['ADR'] = (seg_stats['Room_Revenue'] / seg_stats['RN']).fillna(0)
-        
-        c1, c2 = st.columns(2)
-        c1.plotly_chart(px.pie(seg_stats, values='Room_Revenue', names='Segment', title="매출 비중"), use_container_width=True, key=f"{title_prefix}_seg_pie")
-        c2.plotly_chart(px.bar(seg_stats, x='Segment', y='ADR', title="세그먼트별 ADR", text_auto=',.0f', color='Segment'), use_container_width=True, key=f"{title_prefix}_seg_bar")
-        
-        st.divider()
-        st.markdown("##### 📅 세그먼트 x 월별 상세 실적 (RN / ADR / 매출)")
-        # [복구] 세그먼트 월별 상세 테이블
-        seg_monthly = target_df.groupby(['Segment', 'Stay_Month']).agg({
-            'RN': 'sum', 
-            'Room_Revenue': 'sum'
-        }).reset_index()
-        seg_monthly['ADR'] = (seg_monthly['Room_Revenue'] / seg_monthly['RN']).fillna(0)
-        seg_monthly = seg_monthly.sort_values(['Stay_Month', 'Segment'])
-        
-        st.dataframe(seg_monthly, 
-                     column_config={
-                         "Stay_Month": st.column_config.TextColumn("월"),
-                         "Segment": st.column_config.TextColumn("세그먼트"),
-                         "Room_Revenue": st.column_config.NumberColumn("매출액", format="%d원"),
-                         "ADR": st.column_config.NumberColumn("ADR", format="%d원"),
-                         "RN": st.column_config.NumberColumn("RN", format="%d")
-                     }, hide_index=True, use_container_width=True)
+        if o1:
+            st.subheader(f"📊 {title_prefix} 세그먼트 상세")
+            seg_stats = table("seg", lambda: rollup(target_cube, ['Segment']))
+            
+            c1, c2 = st.columns(2)
+            c1.plotly_chart(fig("seg_pie", lambda: px.pie(seg_stats, values='Room_Revenue', names='Segment', title="매출 비중")), use_container_width=True, key=f"{title_prefix}_seg_pie")
+            c2.plotly_chart(fig("seg_bar", lambda: px.bar(seg_stats, x='Segment', y='ADR', title="세그먼트별 ADR", text_auto=',.0f', color='Segment')), use_container_width=True, key=f"{title_prefix}_seg_bar")
+            
+            st.divider()
+            st.markdown("##### 📅 세그먼트 x 월별 상세 실적 (RN / ADR / 매출)")
+            # [복구] 세그먼트 월별 상세 테이블
+            seg_monthly = table("seg_monthly", lambda: rollup(target_cube, ['Segment', 'Stay_Month']).sort_values(['Stay_Month', 'Segment']))
+            
+            st.dataframe(seg_monthly, 
+                         column_config={
+                             "Stay_Month": st.column_config.TextColumn("월"),
+                             "Segment": st.column_config.TextColumn("세그먼트"),
+                             "Room_Revenue": st.column_config.NumberColumn("매출액", format="%d원"),
+                             "ADR": st.column_config.NumberColumn("ADR", format="%d원"),
+                             "RN": st.column_config.NumberColumn("RN", format="%d")
+                         }, hide_index=True, use_container_width=True)
 
     # 2. Pacing (ADR 옵션 복구)
     with t2:
-        st.subheader(f"📅 {title_prefix} Pacing (예약월 vs 입실월)")
-        
-        # [복구] ADR 선택 옵션
-        pivot_metric = st.radio("분석 기준", ["객실수 (RN)", "객실매출", "객실단가 (ADR)"], horizontal=True, key=f"{title_prefix}_pacing_radio")
-        
-        if "ADR" in pivot_metric:
-            rev_piv = target_df.pivot_table(index='Booking_Month', columns='Stay_Month', values='Room_Revenue', aggfunc='sum', fill_value=0)
-            rn_piv = target_df.pivot_table(index='Booking_Month', columns='Stay_Month', values='RN', aggfunc='sum', fill_value=0)
-            pacing = rev_piv.div(rn_piv).fillna(0)
-            fmt = ".0f"
-        elif "RN" in pivot_metric:
-            pacing = target_df.pivot_table(index='Booking_Month', columns='Stay_Month', values='RN', aggfunc='sum', fill_value=0)
-            fmt = "d"
-        else:
-            pacing = target_df.pivot_table(index='Booking_Month', columns='Stay_Month', values='Room_Revenue', aggfunc='sum', fill_value=0)
-            fmt = ".2s"
-
-        fig = px.imshow(pacing, text_auto=fmt, aspect="auto", color_continuous_scale=color_scale, title=f"Booking Pattern ({pivot_metric})")
-        st.plotly_chart(fig, use_container_width=True, key=f"{title_prefix}_pacing")
+        if o2:
+            st.subheader(f"📅 {title_prefix} Pacing (예약월 vs 입실월)")
+            render_pacing(target_cube, title_prefix, color_scale, view_version)
 
     # 3. 거래처
     with t3:
-        st.subheader(f"🏢 {title_prefix} 거래처 분석")
-        acc_stats = target_df.groupby('Account').agg({'RN': 'sum', 'Room_Revenue': 'sum'}).reset_index()
-        acc_stats['ADR'] = (acc_stats['Room_Revenue'] / acc_stats['RN']).fillna(0)
-        
-        fig_acc = px.scatter(acc_stats, x="RN", y="ADR", size="Room_Revenue", color="Account", hover_name="Account", size_max=60)
-        st.plotly_chart(fig_acc, use_container_width=True, key=f"{title_prefix}_acc")
-        st.dataframe(acc_stats.sort_values('RN', ascending=False), 
-                     column_config={"Room_Revenue": st.column_config.NumberColumn(format="%d원"), "ADR": st.column_config.NumberColumn(format="%d원")}, 
-                     hide_index=True, use_container_width=True)
+        if o3:
+            st.subheader(f"🏢 {title_prefix} 거래처 분석")
+            acc_stats = table("acc", lambda: rollup(target_cube, ['Account']))
+            
+            fig_acc = fig("acc", lambda: px.scatter(acc_stats, x="RN", y="ADR", size="Room_Revenue", color="Account", hover_name="Account", size_max=60))
+            st.plotly_chart(fig_acc, use_container_width=True, key=f"{title_prefix}_acc")
+            st.dataframe(acc_stats.sort_values('RN', ascending=False), 
+                         column_config={"Room_Revenue": st.column_config.NumberColumn(format="%d원"), "ADR": st.column_config.NumberColumn(format="%d원")}, 
+                         hide_index=True, use_container_width=True)
 
     # 4. 리드타임
     with t4:
-        st.subheader(f"⏳ {title_prefix} 리드타임 분석 (파일 원본 값)")
-        bins = [-1, 0, 3, 7, 14, 30, 60, 90, 999]
-        labels = ['당일', '1-3일', '4-7일', '8-14일', '15-30일', '31-60일', '61-90일', '90일+']
-        temp_df = target_df.copy()
-        temp_df['Lead_Group'] = pd.cut(temp_df['Lead_Time'], bins=bins, labels=labels)
-        
-        lead_stats = temp_df.groupby('Lead_Group').agg({'RN': 'sum', 'Room_Revenue': 'sum'}).reset_index()
-        lead_stats['ADR'] = (lead_stats['Room_Revenue'] / lead_stats['RN']).fillna(0)
-        
-        fig_lead = go.Figure()
-        fig_lead.add_trace(go.Bar(x=lead_stats['Lead_Group'], y=lead_stats['RN'], name='RN', marker_color='red' if "취소" in title_prefix else 'blue'))
-        fig_lead.add_trace(go.Scatter(x=lead_stats['Lead_Group'], y=lead_stats['ADR'], name='ADR', yaxis='y2', line=dict(color='black', width=2)))
-        fig_lead.update_layout(yaxis2=dict(overlaying='y', side='right', title='ADR'), title="리드타임별 물량 vs 단가")
-        st.plotly_chart(fig_lead, use_container_width=True, key=f"{title_prefix}_lead")
+        if o4:
+            st.subheader(f"⏳ {title_prefix} 리드타임 분석 (파일 원본 값)")
+            st.plotly_chart(fig("lead", lambda: lead_figure(target_cube, title_prefix)), use_container_width=True, key=f"{title_prefix}_lead")
 
     # 5. 객실타입
     with t5:
-        st.subheader(f"🛏️ {title_prefix} 객실타입 분석")
-        rt_stats = target_df.groupby('Room_Type').agg({'RN': 'sum', 'Room_Revenue': 'sum'}).reset_index()
-        rt_stats['ADR'] = (rt_stats['Room_Revenue'] / rt_stats['RN']).fillna(0)
-        st.dataframe(rt_stats.sort_values('RN', ascending=False), 
-                     column_config={"Room_Revenue": st.column_config.NumberColumn(format="%d원"), "ADR": st.column_config.NumberColumn(format="%d원")}, 
-                     hide_index=True, use_container_width=True)
+        if o5:
+            st.subheader(f"🛏️ {title_prefix} 객실타입 분석")
+            rt_stats = table("rt", lambda: rollup(target_cube, ['Room_Type']))
+            st.dataframe(rt_stats.sort_values('RN', ascending=False), 
+                         column_config={"Room_Revenue": st.column_config.NumberColumn(format="%d원"), "ADR": st.column_config.NumberColumn(format="%d원")}, 
+                         hide_index=True, use_container_width=True)
 
     # 6. 요일별
     with t6:
-        st.subheader(f"🗓️ {title_prefix} 요일별 분석")
-        wd_stats = target_df.groupby('Day_Type').agg({'RN':'sum', 'Room_Revenue':'sum'}).reset_index()
-        wd_stats['ADR'] = (wd_stats['Room_Revenue'] / wd_stats['RN']).fillna(0)
-        c1, c2 = st.columns(2)
-        c1.plotly_chart(px.bar(wd_stats, x='Day_Type', y='ADR', title="요일별 ADR", text_auto=',.0f'), use_container_width=True, key=f"{title_prefix}_wd_bar")
-        c2.plotly_chart(px.pie(wd_stats, values='RN', names='Day_Type', title="요일별 비중"), use_container_width=True, key=f"{title_prefix}_wd_pie")
+        if o6:
+            st.subheader(f"🗓️ {title_prefix} 요일별 분석")
+            wd_stats = table("wd", lambda: rollup(target_cube, ['Day_Type']))
+            c1, c2 = st.columns(2)
+            c1.plotly_chart(fig("wd_bar", lambda: px.bar(wd_stats, x='Day_Type', y='ADR', title="요일별 ADR", text_auto=',.0f')), use_container_width=True, key=f"{title_prefix}_wd_bar")
+            c2.plotly_chart(fig("wd_pie", lambda: px.pie(wd_stats, values='RN', names='Day_Type', title="요일별 비중")), use_container_width=True, key=f"{title_prefix}_wd_pie")
+
+# ------------------------------------------------------------------------------
+# 4. 픽업 (OTB 스냅샷 비교)
+# ------------------------------------------------------------------------------
+@st.cache_data(max_entries=16)
+def get_pickup_frames(version, segment, start, end, stay_range, _pickup):
+    return _pickup.between(start, end, segment, stay_range), _pickup.rolling(end, segment=segment, stay_range=stay_range)
+
+# 스냅샷/구분 선택은 픽업 탭만 다시 실행
+@st.fragment
+@PERF.timed('render.pickup')
+def render_pickup(pickup, stay_range):
+    segments = pickup.segments()
+    if not segments:
+        st.info("OTB 스냅샷이 없습니다. 세일즈 온더북 파일을 업로드해주세요.")
+        return
+    c1, c2, c3 = st.columns(3)
+    segment = c1.selectbox("OTB 구분", segments, key="pu_segment")
+    snaps = pickup.snapshots(segment)
+    if len(snaps) < 2:
+        st.info(f"{segment}: 비교할 스냅샷이 2개 이상 필요합니다. (현재 {len(snaps)}개)")
+        return
+    end = c3.selectbox("기준 스냅샷", snaps[::-1], key="pu_end")
+    prior = [s for s in snaps if s < end][::-1]
+    start = c2.selectbox("비교 스냅샷", prior, key="pu_start")
+    if start is None:
+        st.info("기준 스냅샷 이전 스냅샷이 없습니다.")
+        return
+
+    pu, roll = get_pickup_frames(pickup.version, segment, start, end, stay_range, pickup)
+
+    rn, rev = pu['RN'].sum(), pu['Room_Revenue'].sum()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("RN 픽업", f"{rn:,.0f}")
+    m2.metric("매출 픽업", f"{rev:,.0f}원")
+    m3.metric("픽업 ADR", f"{(rev / rn if rn else 0):,.0f}원")
+
+    st.subheader(f"📅 입실일별 픽업 ({start} → {end})")
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=pu['Stay_Date'], y=pu['RN'], name='RN 픽업'))
+    fig.add_trace(go.Scatter(x=pu['Stay_Date'], y=pu['ADR_Change'], name='ADR 변화', yaxis='y2', line=dict(color='black', width=1)))
+    fig.update_layout(yaxis2=dict(overlaying='y', side='right', title='ADR 변화'))
+    st.plotly_chart(fig, use_container_width=True, key="pu_daily")
+
+    st.subheader(f"⏱️ 최근 1/7/30일 픽업 (기준 {end})")
+    if roll.empty:
+        st.info("기간 내 픽업이 없습니다.")
+        return
+    roll = roll.assign(Stay_Month=roll['Stay_Date'].dt.strftime('%Y-%m'))
+    monthly = roll.groupby(['Stay_Month', 'Window'])[['RN', 'Room_Revenue']].sum()
+    monthly = monthly.unstack('Window').reindex(columns=[f'{n}일' for n in (1, 7, 30)], level=1).fillna(0)
+    monthly.columns = [f"{w} {m}" for m, w in monthly.columns]
+    st.dataframe(monthly, column_config={c: st.column_config.NumberColumn(format="%d원") for c in monthly.columns if 'Room_Revenue' in c}, use_container_width=True)
+
+# ------------------------------------------------------------------------------
+# 5. 부킹 커브 (도착 전 일수별 누적 예약, 작년 동기 비교)
+# ------------------------------------------------------------------------------
+CURVE_COLUMNS = ['CheckIn_dt', 'Booking_dt', 'Lead_Time', 'Segment', 'RN', 'Room_Revenue']
+
+def _booked(df):
+    return df[(df['Status'] == 'Booked') & ~df['Segment'].astype(str).str.startswith('OTB')]
+
+@st.cache_data(max_entries=8)
+def get_booking_curves(view_version, segments, ly_range, _df, _store):
+    # _df: 조회 기간 예약 행 (화면 준비 데이터). ly_range: 조회 기간 앞의 작년 동기 입실월 구간 (없으면 None)
+    # 작년 동기 구간은 커브 계산에만 쓰고 버림 (준비 데이터를 따로 만들지 않음)
+    df = _df[CURVE_COLUMNS]
+    if ly_range:
+        with PERF.timer('curve.read_ly'):
+            ly = _booked(with_derived(read_with_retry(_store, ly_range), ['CheckIn_dt', 'Booking_dt']))
+        df = pd.concat([ly[CURVE_COLUMNS], df], ignore_index=True)
+    with PERF.timer('curve.build'):
+        return booking_curves(df, list(segments) or None)
+
+@st.fragment
+@PERF.timed('render.booking_curve')
+def render_booking_curve(store, stay_range):
+    lo, hi = stay_range
+    months = store.months()
+    # 조회 기간은 화면 준비 데이터를 그대로 쓰고, 작년 동기(52주 전) 입실일은 그 앞 구간만 더 읽음
+    ly_lo = max((pd.Period(lo, freq='M') - 12).strftime('%Y-%m'), months[0])
+    ly_range = (ly_lo, (pd.Period(lo, freq='M') - 1).strftime('%Y-%m')) if ly_lo < lo else None
+    prep = get_prepared_cache().get(store, stay_range)
+    df_bk = _booked(prep.df_list)
+    if df_bk.empty:
+        st.info("예약 리스트 데이터가 없습니다.")
+        return
+
+    c1, c2, c3 = st.columns([2, 1, 1])
+    segments = c1.multiselect("세그먼트 (비우면 전체)", sorted(df_bk['Segment'].astype(str).unique()), key="curve_segments")
+    options = [m for m in months if lo <= m <= hi]
+    curr = datetime.now().strftime('%Y-%m')
+    month = c2.selectbox("입실월", options, index=options.index(curr) if curr in options else len(options) - 1, key="curve_month")
+    label = c3.radio("기준", ["객실수 (RN)", "객실매출", "객실단가 (ADR)"], key="curve_metric")
+    metric = 'ADR' if "ADR" in label else ('RN' if "RN" in label else 'Room_Revenue')
+
+    curves = get_booking_curves((prep.version, stay_range), tuple(segments), ly_range, df_bk, store)
+    start = pd.Period(month, freq='M').start_time
+    end = pd.Period(month, freq='M').end_time.normalize()
+    pc = period_curve(curves, start, end)
+    if pc.empty:
+        st.info("선택한 조건의 예약이 없습니다.")
+        return
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=pc.index, y=pc[metric], name=f"{month}", line=dict(color='blue', width=2)))
+    fig.add_trace(go.Scatter(x=pc.index, y=pc[f'{metric}_LY'], name="작년 동기 (52주 전)", line=dict(color='gray', dash='dot')))
+    fig.update_layout(title=f"{month} 부킹 커브 ({label})", xaxis=dict(title="도착 전 일수", autorange='reversed'))
+    st.plotly_chart(fig, use_container_width=True, key="curve_chart")
+
+    points = pc.reindex(CHECKPOINTS)[[metric, f'{metric}_LY']]
+    points.columns = ['올해', '작년 동기']
+    points['차이'] = points['올해'] - points['작년 동기']
+    points['증감률(%)'] = (points['차이'] / points['작년 동기'].where(points['작년 동기'] != 0) * 100).round(1)
+    points.index = [f"D-{d}" for d in points.index]
+    st.dataframe(points, use_container_width=True)
+
+# ------------------------------------------------------------------------------
+# 6. 순 OTB (취소를 원 예약에서 상계)
+# ------------------------------------------------------------------------------
+@st.cache_data(max_entries=16)
+def get_net_frames(version, stay_range, _netting):
+    return _netting.net(('Stay_Month',), stay_range), _netting.net(('Stay_Month', 'Segment'), stay_range)
+
+@st.fragment
+@PERF.timed('render.net')
+def render_net(netting, stay_range):
+    monthly, by_segment = get_net_frames(netting.version, stay_range, netting)
+    if monthly.empty:
+        st.info("예약/취소 리스트 데이터가 없습니다.")
+        return
+    tot = monthly.sum(numeric_only=True)
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("총 예약 RN", f"{tot['Gross_RN']:,.0f}")
+    m2.metric("취소 RN (상계)", f"{tot['Cancelled_RN']:,.0f}")
+    m3.metric("순 OTB RN", f"{tot['Net_RN']:,.0f}")
+    m4.metric("순 매출", f"{tot['Net_Revenue']:,.0f}원")
+    m5.metric("취소율", f"{(tot['Cancelled_RN'] / tot['Gross_RN'] * 100 if tot['Gross_RN'] else 0):.1f}%")
+    if tot['Unmatched_Cancellations']:
+        st.caption(f"⚠️ 원 예약을 찾지 못한 취소 {tot['Unmatched_Cancellations']:,.0f}건 ({tot['Unmatched_Cancel_RN']:,.0f} RN)"
+                   " - 예약 리스트에 없는 예약의 취소로 보고 상계하지 않음")
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=monthly['Stay_Month'], y=monthly['Net_RN'], name='순 OTB RN', marker_color='navy'))
+    fig.add_trace(go.Bar(x=monthly['Stay_Month'], y=monthly['Cancelled_RN'], name='취소 RN', marker_color='salmon'))
+    fig.add_trace(go.Scatter(x=monthly['Stay_Month'], y=monthly['Cancel_Rate'], name='취소율(%)', yaxis='y2', mode='lines+markers', line=dict(color='black')))
+    fig.update_layout(barmode='stack', title="입실월별 순 OTB (예약 - 취소)", yaxis2=dict(overlaying='y', side='right', title='취소율(%)'))
+    st.plotly_chart(fig, use_container_width=True, key="net_chart")
+
+    st.markdown("##### 📋 입실월 x 세그먼트 순 OTB")
+    st.dataframe(by_segment[['Stay_Month', 'Segment', 'Gross_RN', 'Cancelled_RN', 'Net_RN', 'Net_Revenue', 'Net_ADR', 'Cancel_Rate']],
+                 column_config={
+                     "Stay_Month": st.column_config.TextColumn("월"),
+                     "Segment": st.column_config.TextColumn("세그먼트"),
+                     "Gross_RN": st.column_config.NumberColumn("총 예약 RN", format="%d"),
+                     "Cancelled_RN": st.column_config.NumberColumn("취소 RN", format="%d"),
+                     "Net_RN": st.column_config.NumberColumn("순 RN", format="%d"),
+                     "Net_Revenue": st.column_config.NumberColumn("순 매출", format="%d원"),
+                     "Net_ADR": st.column_config.NumberColumn("순 ADR", format="%d원"),
+                     "Cancel_Rate": st.column_config.NumberColumn("취소율(%)", format="%.1f"),
+                 }, hide_index=True, use_container_width=True)
+
+# ------------------------------------------------------------------------------
+# 7. 정적 GM 리포트 (Excel / PDF / HTML 다운로드)
+# ------------------------------------------------------------------------------
+# 리포트 파일은 키(데이터 내용 해시)마다 한 번만 생성 -> 내용이 바뀌지 않으므로 경로 단위로 캐시
+@st.cache_data(max_entries=6)
+def report_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+REPORT_MIME = {'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+               'pdf': "application/pdf", 'html': "text/html"}
+
+# 이 데이터의 리포트가 없으면 백그라운드에서 1회 생성 (새 업로드로 데이터가 바뀔 때만). 생성 중에는 1초마다 상태 확인
+def render_report(builder, key, cube, budget, stay_range):
+    if builder.status(key) is None:
+        builder.build_async(cube, budget, stay_range, key=key)
+
+    @st.fragment(run_every=1.0 if builder.status(key) == '생성 중' else None)
+    def report_status():
+        status = builder.status(key)
+        if status == '완료':
+            files = builder.files(key)
+            name = f"gm_report_{'_'.join(stay_range) if stay_range else 'all'}"
+            cols = st.columns(len(files))
+            for col, (fmt, path) in zip(cols, files.items()):
+                col.download_button(f"⬇️ {fmt.upper()}", report_bytes(path), file_name=f"{name}.{fmt}", mime=REPORT_MIME[fmt], key=f"report_{fmt}")
+            # 생성이 끝난 직후면 상태 확인 주기를 끄기 위해 1회 다시 그림
+            if st.session_state.get('report_waiting') == key:
+                st.session_state['report_waiting'] = None
+                st.rerun()
+        elif status == '생성 중':
+            st.session_state['report_waiting'] = key
+            st.info("⏳ 리포트 생성 중... (완료되면 다운로드 버튼이 표시됩니다)")
+        else:
+            st.warning(f"⚠️ 리포트 {status}")
+            if st.button("🔄 다시 생성", key="report_retry"):
+                builder.build_async(cube, budget, stay_range, key=key)
+                st.rerun()
+
+    report_status()
+
+# ------------------------------------------------------------------------------
+# 8. 성능 진단 (사이드바, 켜면 표시)
+# ------------------------------------------------------------------------------
+CACHE_NAMES = {'prepared': "준비 데이터", 'figure': "그림", 'table': "표", 'sheet_sync': "시트 증분", 'report': "리포트"}
+
+def render_diagnostics(run):
+    if not st.sidebar.toggle("⏱️ 성능 진단", key="show_perf"):
+        return
+    events = PERF.run_events(run)
+    counters = PERF.run_counters(run)
+    timed = sorted((e for e in events if e['kind'] in ('time', 'api')), key=lambda e: e['ts'] - e['seconds'])
+    with st.sidebar.expander("⏱️ 이번 실행", expanded=True):
+        total = sum(e['seconds'] for e in timed if e['depth'] == 0)
+        elapsed = PERF.elapsed()
+        st.caption((f"실행 {elapsed * 1000:,.0f}ms · " if elapsed is not None else "") + f"계측 합계 {total * 1000:,.0f}ms · 시트 API {counters.get('sheets.calls', 0):,}회"
+                   f" · 수신 {counters.get('sheets.bytes_in', 0) / 1024:,.0f}KB · 송신 {counters.get('sheets.bytes_out', 0) / 1024:,.0f}KB"
+                   f" · 재시도 {counters.get('sheets.retry', 0)}회 · 429 {counters.get('sheets.429', 0)}회")
+        hits = [f"{label} {counters.get(f'cache.{name}.hit', 0)}/{counters.get(f'cache.{name}.hit', 0) + counters.get(f'cache.{name}.miss', 0)}"
+                for name, label in CACHE_NAMES.items() if f'cache.{name}.hit' in counters or f'cache.{name}.miss' in counters]
+        if hits:
+            st.caption("캐시 적중 " + " · ".join(hits))
+        if timed:
+            st.dataframe(pd.DataFrame({'단계': ["\u00a0\u00a0" * e['depth'] + e['name'] for e in timed],
+                                       'ms': [round(e['seconds'] * 1000, 1) for e in timed]}), hide_index=True, use_container_width=True)
+    with st.sidebar.expander("📈 누적 (서버 시작 이후)"):
+        st.dataframe(PERF.summary().round(3), hide_index=True, use_container_width=True)
+        st.dataframe(pd.Series(PERF.counters, name='값').sort_index(), use_container_width=True)
+        if PERF.log is not None:
+            st.caption(f"상세 로그: {PERF.log.handlers[0].baseFilename}")
 
 # ------------------------------------------------------------------------------
 # UI 메인
 # ------------------------------------------------------------------------------
 try:
-    c = get_gspread_client()
-    sh = c.open("Amber_Revenue_DB")
-    db_sheet = sh.get_worksheet(0)
+    try:
+        sheets = get_sheets()
+    except Exception as e:
+        st.error(f"❌ 인증 오류: {e}")
+        st.stop()
+    ledger = get_ledger()
+    with PERF.timer('store.open'):
+        store = get_store(sheets.db, ledger)
+    pickup = get_pickup(store)
+    netting = get_netting(store)
+    ingest_queue = get_ingest_queue(store, ledger, pickup, netting)
     
+    # 예산: 저장소 버전 + 10분 단위 캐시. 새로 읽을 때는 DB 시트 증분 확인과 한 요청으로
     try:
-        budget_raw = sh.worksheet("Budget").get_all_values()
-        budget_df = pd.DataFrame(budget_raw[1:], columns=budget_raw[0])
-        budget_df['Budget'] = pd.to_numeric(budget_df['Budget'], errors='coerce').fillna(0)
-    except:
+        with PERF.timer('budget.load'):
+            budget_df = sheets.budget(store)
+    except Exception:
         budget_df = pd.DataFrame(columns=['Month', 'Budget'])
 
     st.title("🏛️ 앰버 호텔 경영 리포트 (Final Integrity)")
@@ -343,134 +495,176 @@ try:
     # 초기화
     with st.sidebar.expander("🛠️ 데이터 관리", expanded=True):
         if st.button("🗑️ 전체 데이터 삭제 (필수)"):
-            db_sheet.clear()
-            cols = ['Guest_Name', 'CheckIn', 'RN', 'Room_Revenue', 'Total_Revenue', 'ADR', 'Segment', 'Account', 'Room_Type', 'Snapshot_Date', 'Status', 'Stay_Month', 'Booking_Month', 'Stay_YearWeek', 'Lead_Time', 'Day_Type', 'Day_of_Week', 'Nat_Group', 'Month_Label', 'Is_Zero_Rate']
-            db_sheet.append_row(cols)
-            load_data_from_sheet.clear()
+            store.clear()
+            ledger.clear()
+            pickup.clear()
+            netting.clear()
             st.success("초기화 완료!")
             time.sleep(1)
             st.rerun()
 
+    # 업로드: 4개 업로더(여러 파일 가능)의 파일을 한 번에 큐에 넣음
+    # 파싱은 프로세스 풀에서 병렬, 기록은 배치당 1회. 진행 상황은 아래 프래그먼트가 1초마다 갱신
     st.sidebar.header("📤 데이터 업로드")
     
     with st.sidebar.expander("📝 상세 리스트", expanded=False):
-        f1 = st.file_uploader("신규 예약 리스트", type=['xlsx','csv'], key="f1")
-        if f1 and st.button("신규 예약 반영"):
-            df = process_data(f1, "Booked")
-            if not df.empty:
-                db_sheet.append_rows(df.fillna('').astype(str).values.tolist())
-                load_data_from_sheet.clear()
-                st.success("반영 완료!")
-                time.sleep(2)
-                st.rerun()
-        
-        f2 = st.file_uploader("취소 리스트", type=['xlsx','csv'], key="f2")
-        if f2 and st.button("취소 반영"):
-            df = process_data(f2, "Cancelled")
-            if not df.empty:
-                db_sheet.append_rows(df.fillna('').astype(str).values.tolist())
-                load_data_from_sheet.clear()
-                st.success("반영 완료!")
-                time.sleep(2)
-                st.rerun()
+        f1 = st.file_uploader("신규 예약 리스트", type=['xlsx','csv'], key="f1", accept_multiple_files=True)
+        f2 = st.file_uploader("취소 리스트", type=['xlsx','csv'], key="f2", accept_multiple_files=True)
 
     with st.sidebar.expander("🎯 세일즈 온더북", expanded=True):
-        f3 = st.file_uploader("당월 OTB", type=['xlsx','csv'], key="f3")
-        if f3 and st.button("당월 OTB 반영"):
-            df = process_data(f3, "Booked", "Month")
-            if not df.empty:
-                db_sheet.append_rows(df.fillna('').astype(str).values.tolist())
-                load_data_from_sheet.clear()
-                st.success("반영 완료!")
-                time.sleep(2)
-                st.rerun()
-        
-        f4 = st.file_uploader("전체 OTB", type=['xlsx','csv'], key="f4")
-        if f4 and st.button("전체 OTB 반영"):
-            df = process_data(f4, "Booked", "Total")
-            if not df.empty:
-                db_sheet.append_rows(df.fillna('').astype(str).values.tolist())
-                load_data_from_sheet.clear()
-                st.success("반영 완료!")
-                time.sleep(2)
-                st.rerun()
+        f3 = st.file_uploader("당월 OTB", type=['xlsx','csv'], key="f3", accept_multiple_files=True)
+        f4 = st.file_uploader("전체 OTB", type=['xlsx','csv'], key="f4", accept_multiple_files=True)
+
+    uploads = [(f, "Booked", "General") for f in f1 or []] + [(f, "Cancelled", "General") for f in f2 or []] \
+            + [(f, "Booked", "Month") for f in f3 or []] + [(f, "Booked", "Total") for f in f4 or []]
+    if st.sidebar.button(f"📥 일괄 반영 ({len(uploads)}개 파일)", disabled=not uploads):
+        ingest_queue.submit([(f.name, f.getvalue(), status, sub) for f, status, sub in uploads])
+
+    st.session_state.setdefault('ingest_seen', ingest_queue.finished)
+
+    @st.fragment(run_every=1.0 if ingest_queue.busy else None)
+    def ingest_progress():
+        p = ingest_queue.progress()
+        if p is None:
+            return
+        st.progress(p['done'] / max(p['total'], 1), text=f"{p['state']} ({p['done']}/{p['total']})" + (f" · 대기 배치 {p['queued']}" if p['queued'] else ""))
+        for f in p['files']:
+            line = f"{f['name']} · {f['state']}" + (f" · {f['rows']:,}행" if f['rows'] else "")
+            if f['error']:
+                st.caption(f"⚠️ {line} · {f['error']}")
+            else:
+                st.caption(line)
+        if p['error']:
+            st.warning(f"⚠️ {p['error']}")
+        elif p['state'] == '완료':
+            st.success(f"반영 완료! (신규 {p['new']:,}행)")
+        if p['mirror']:
+            st.info(f"ℹ️ {p['mirror']}")
+        # 배치가 끝나면 전체 화면을 1회 다시 그림 (저장소 버전이 올라가 준비 데이터는 새로 계산됨)
+        if ingest_queue.finished != st.session_state['ingest_seen']:
+            st.session_state['ingest_seen'] = ingest_queue.finished
+            st.rerun()
+
+    with st.sidebar:
+        ingest_progress()
+
+    # 조회 기간 (입실월)
+    stay_range = None
+    with PERF.timer('store.months'):
+        months = store.months()
+    if months:
+        stay_range = st.sidebar.select_slider("📆 조회 기간 (입실월)", options=months, value=default_stay_range(months))
 
-    # 데이터 로드
-    raw_data = load_data_from_sheet(db_sheet)
-    if len(raw_data) <= 1:
+    # 데이터 로드: 버전이 같으면 저장소 조회/변환/분리/집계 없이 공유 객체 재사용
+    with PERF.timer('prepare'):
+        prep = get_prepared_cache().get(store, stay_range)
+    if prep.empty:
         st.warning("⚠️ 데이터가 없습니다. 파일을 업로드해주세요.")
     else:
-        df = pd.DataFrame(raw_data[1:], columns=raw_data[0])
-        
-        # 수치 변환
-        for col in ['RN', 'Room_Revenue', 'Total_Revenue', 'ADR', 'Lead_Time']:
-            if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        if 'Booking_Date' not in df.columns: df['Booking_Date'] = df['CheckIn']
-        df['Booking_dt'] = pd.to_datetime(df['Booking_Date'], errors='coerce')
-        df['CheckIn_dt'] = pd.to_datetime(df['CheckIn'], errors='coerce')
-        df.loc[df['Booking_dt'].isna(), 'Booking_dt'] = df.loc[df['Booking_dt'].isna(), 'CheckIn_dt']
-        
-        # 리드타임: 계산 안함. 파일에 있는 값 그대로 사용
-        df['Lead_Time'] = df['Lead_Time'].astype(int)
-        
-        df['Is_Zero_Rate'] = df['Total_Revenue'] <= 0
-        df['Booking_Month'] = df['Booking_dt'].dt.strftime('%Y-%m') # 필터링용
-        df['Stay_Month'] = df['CheckIn_dt'].dt.strftime('%Y-%m')
-        
-        # 데이터 분리
-        df_otb_m = df[df['Segment'] == 'OTB_Month']
-        df_otb_t = df[df['Segment'] == 'OTB_Total']
-        
-        df_list = df[~df['Segment'].str.contains('OTB')]
-        df_paid_bk = df_list[(df_list['Status'] == 'Booked') & (df_list['Is_Zero_Rate'] == False)]
-        df_zero_bk = df_list[(df_list['Status'] == 'Booked') & (df_list['Is_Zero_Rate'] == True)]
-        df_list_cn = df_list[df_list['Status'] == 'Cancelled']
-        df_total_paid = pd.concat([df_paid_bk, df_list_cn])
+        # 공유 객체 -> 아래에서 프레임을 수정하지 않음
+        df_otb_m, df_otb_t = prep.otb_month, prep.otb_total
+        df_list, df_zero_bk = prep.df_list, prep.zero_bk
+        cube_paid_bk, cube_list_cn, cube_total_paid = prep.cube_paid_bk, prep.cube_list_cn, prep.cube_total_paid
 
         curr_month = datetime.now().strftime('%Y-%m')
 
-        # [NEW] GM 요약 탭
-        main_tab0, main_tab1, main_tab2, main_tab3, main_tab4 = st.tabs([
-            "👑 총지배인(GM) 요약", "✅ 예약 상세", "❌ 취소 상세", "📈 종합 합계", "🆓 0원 예약"
-        ])
+        # 화면 캐시 키: 데이터 버전 + 조회 기간
+        view_version = (prep.version, stay_range)
 
-        with main_tab0:
-            st.header("👑 Executive Summary")
-            
-            # 1. 예약 유입 속도
-            st.subheader("🚀 최근 예약 유입 속도 (Booking Velocity)")
-            if not df_paid_bk.empty:
-                recent_bk = df_paid_bk.groupby('Booking_Month').agg({'RN':'sum', 'Room_Revenue':'sum'}).reset_index()
-                recent_bk = recent_bk.sort_values('Booking_Month').tail(12)
-                c1, c2 = st.columns(2)
-                c1.plotly_chart(px.line(recent_bk, x='Booking_Month', y='RN', title="월별 예약 생성량 (RN)", markers=True), use_container_width=True)
-                c2.plotly_chart(px.bar(recent_bk, x='Booking_Month', y='Room_Revenue', title="월별 예약 생성액 (매출)", text_auto='.2s'), use_container_width=True)
-            else:
-                st.info("예약 데이터가 없습니다.")
+        # [NEW] GM 요약 탭 (선택된 탭만 실행)
+        (main_tab0, open0), (main_tab1, open1), (main_tab2, open2), (main_tab3, open3), (main_tab4, open4), (main_tab5, open5), (main_tab6, open6), (main_tab7, open7) = lazy_tabs([
+            "👑 총지배인(GM) 요약", "✅ 예약 상세", "❌ 취소 상세", "📈 종합 합계", "🆓 0원 예약", "📊 픽업", "📉 부킹 커브", "🧾 순 OTB"
+        ], key="main_tabs")
 
-            st.divider()
-            
-            # 2. Top 5 거래처
-            st.subheader("🏆 Top 5 효자 거래처")
-            if not df_paid_bk.empty:
-                top_acc = df_paid_bk.groupby('Account').agg({'Room_Revenue':'sum', 'RN':'sum'}).reset_index()
-                top_acc['ADR'] = top_acc['Room_Revenue'] / top_acc['RN']
-                top_acc = top_acc.sort_values('Room_Revenue', ascending=False).head(5)
-                st.dataframe(top_acc, column_config={"Room_Revenue": st.column_config.NumberColumn("매출", format="%d원"), "ADR": st.column_config.NumberColumn(format="%d원")}, use_container_width=True, hide_index=True)
+        with main_tab0:
+            if open0:
+                with PERF.timer('render.gm'):
+                    st.header("👑 Executive Summary")
+                
+                    # 1. 예약 유입 속도
+                    st.subheader("🚀 최근 예약 유입 속도 (Booking Velocity)")
+                    if not cube_paid_bk.empty:
+                        recent_bk = table_data(view_version, "gm_velocity", lambda: rollup(cube_paid_bk, ['Booking_Month'], with_adr=False).sort_values('Booking_Month').tail(12))
+                        c1, c2 = st.columns(2)
+                        c1.plotly_chart(figure_spec(view_version, "gm_velocity_rn", None, lambda: px.line(recent_bk, x='Booking_Month', y='RN', title="월별 예약 생성량 (RN)", markers=True)), use_container_width=True)
+                        c2.plotly_chart(figure_spec(view_version, "gm_velocity_rev", None, lambda: px.bar(recent_bk, x='Booking_Month', y='Room_Revenue', title="월별 예약 생성액 (매출)", text_auto='.2s')), use_container_width=True)
+                    else:
+                        st.info("예약 데이터가 없습니다.")
+
+                    st.divider()
+                
+                    # 2. Top 5 거래처
+                    st.subheader("🏆 Top 5 효자 거래처")
+                    if not cube_paid_bk.empty:
+                        top_acc = rollup(cube_paid_bk, ['Account'], with_adr=False)[['Account', 'Room_Revenue', 'RN']]
+                        top_acc['ADR'] = top_acc['Room_Revenue'] / top_acc['RN']
+                        top_acc = top_acc.sort_values('Room_Revenue', ascending=False).head(5)
+                        st.dataframe(top_acc, column_config={"Room_Revenue": st.column_config.NumberColumn("매출", format="%d원"), "ADR": st.column_config.NumberColumn(format="%d원")}, use_container_width=True, hide_index=True)
+
+                    st.divider()
+
+                    # 3. 예산 대비 실적 (조회 기간 안의 예산 월만)
+                    st.subheader("💰 월별 예산 대비 실적 (객실매출)")
+                    budget_in = budget_df if stay_range is None else budget_df[budget_df['Month'].between(*stay_range)]
+                    budget_key = int(pd.util.hash_pandas_object(budget_in, index=False).sum())
+                    if budget_in.empty:
+                        st.info("조회 기간의 예산이 없습니다. (Budget 시트: Month / Budget)")
+                    else:
+                        bva = table_data(view_version, f"gm_budget_{budget_key}", lambda: budget_vs_actual(cube_paid_bk, budget_in))
+                        this_month = bva[bva['Stay_Month'] == curr_month]
+                        if not this_month.empty:
+                            r = this_month.iloc[0]
+                            m1, m2, m3 = st.columns(3)
+                            m1.metric(f"{curr_month} 예산", f"{r['Budget']:,.0f}원")
+                            m2.metric("실적 (OTB)", f"{r['Room_Revenue']:,.0f}원")
+                            m3.metric("달성률", f"{r['Achievement']:.1f}%" if pd.notna(r['Achievement']) else "-")
+                        def budget_figure():
+                            fig = go.Figure()
+                            fig.add_trace(go.Bar(x=bva['Stay_Month'], y=bva['Budget'], name='예산', marker_color='lightgray'))
+                            fig.add_trace(go.Bar(x=bva['Stay_Month'], y=bva['Room_Revenue'], name='실적', marker_color='navy'))
+                            fig.add_trace(go.Scatter(x=bva['Stay_Month'], y=bva['Achievement'], name='달성률(%)', yaxis='y2', mode='lines+markers', line=dict(color='orange')))
+                            fig.update_layout(barmode='group', yaxis2=dict(overlaying='y', side='right', title='달성률(%)'))
+                            return fig
+                        st.plotly_chart(figure_spec(view_version, "gm_budget", budget_key, budget_figure), use_container_width=True)
+
+                    st.divider()
+
+                    # 4. 정적 리포트 (위 요약 + 세그먼트/Pacing/거래처/리드타임, 조회 기간 기준)
+                    st.subheader("📄 정적 리포트 (Excel / PDF / HTML)")
+                    if not cube_paid_bk.empty:
+                        key = table_data(view_version, f"report_key_{budget_key}", lambda: report_key(cube_paid_bk, budget_in, stay_range))
+                        render_report(get_report_builder(), key, cube_paid_bk, budget_in, stay_range)
 
         with main_tab1:
-            render_rich_analysis(df_paid_bk, "유료 예약", "Blues")
+            if open1:
+                render_rich_analysis(cube_paid_bk, "유료 예약", "Blues", view_version)
         
         with main_tab2:
-            render_rich_analysis(df_list_cn, "취소 데이터", "Reds")
+            if open2:
+                render_rich_analysis(cube_list_cn, "취소 데이터", "Reds", view_version)
             
         with main_tab3:
-            render_rich_analysis(df_total_paid, "종합(예약+취소)", "Greens")
+            if open3:
+                render_rich_analysis(cube_total_paid, "종합(예약+취소)", "Greens", view_version)
             
         with main_tab4:
-            st.write(f"총 {len(df_zero_bk)}건")
-            st.dataframe(df_zero_bk[['Guest_Name', 'CheckIn', 'Account', 'Room_Type']], use_container_width=True)
+            if open4:
+                st.write(f"총 {len(df_zero_bk)}건")
+                st.dataframe(df_zero_bk[['Guest_Name', 'CheckIn', 'Account', 'Room_Type']], use_container_width=True)
+
+        with main_tab5:
+            if open5:
+                render_pickup(pickup, stay_range)
+
+        with main_tab6:
+            if open6:
+                render_booking_curve(store, stay_range)
+
+        with main_tab7:
+            if open7:
+                render_net(netting, stay_range)
 
 except Exception as e:
     st.error(f"🚨 시스템 오류: {e}")
+
+render_diagnostics(perf_run)
@@ -0,0 +1,215 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# ------------------------------------------------------------------------------
+# 오프라인 벤치마크 (구글 자격 증명 없이 업로드/대시보드 경로 단계별 시간 + 최대 메모리)
+# ------------------------------------------------------------------------------
+# python bench.py --rows 10000,100000 --formats csv,xlsx --mem --json bench.json
+# python bench.py --rows 100000 --compare bench.json     # 기준 대비 느려진 단계가 있으면 종료 코드 1
+#
+# 모든 저장소/캐시는 임시 디렉터리에 생성 (실제 .pickup_cache 는 건드리지 않음).
+# --mem 이면 tracemalloc 으로 단계별 최대 메모리를 측정 (이때 시간은 추적 비용만큼 늘어남).
+
+class Bench:
+    def __init__(self, mem=False):
+        self.mem = mem
+        self.results = []
+
+    def run(self, stage, rows, fmt, fn):
+        gc.collect()
+        if self.mem:
+            tracemalloc.start()
+        t = time.perf_counter()
+        try:
+            out = fn()
+        finally:
+            seconds = time.perf_counter() - t
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if self.mem else None
+            if self.mem:
+                tracemalloc.stop()
+        self.results.append({'stage': stage, 'rows': rows, 'format': fmt, 'seconds': round(seconds, 4),
+                             'peak_mb': None if peak is None else round(peak, 1)})
+        mem = f"{peak:9.1f} MB" if peak is not None else ""
+        print(f"{stage:<24}{rows:>10,} {fmt:<5}{seconds:10.3f} s {mem}", flush=True)
+        return out
+
+
+def _patch_gspread(client):
+    # app.py 가 부르는 인증/연결 함수를 가짜 클라이언트로 교체
+    import gspread
+    from google.oauth2 import service_account
+
+    gspread.authorize = lambda creds: client
+    service_account.Credentials.from_service_account_info = staticmethod(lambda info, scopes=None: None)
+
+
+def bench_ingest(b, rows, fmt, lang):
+    import pandas as pd
+
+    from bulk_writer import IngestLedger
+    from ingest import find_valid_header_row, ingest_file, iter_process, normalize_and_map_columns, process_data
+    from storage import SQLiteStore
+    from synthdata import as_upload, file_name, reservation_list
+
+    raw = b.run('generate', rows, fmt, lambda: reservation_list(rows, seed=rows, lang=lang))
+    upload = as_upload(raw, file_name('list', fmt, lang))
+    del raw
+
+    def read_raw():
+        upload.seek(0)
+        return pd.read_csv(upload, header=None) if fmt == 'csv' else pd.read_excel(upload, header=None)
+
+    df_raw = b.run('read_raw', rows, fmt, read_raw)
+    df_h = b.run('find_header', rows, fmt, lambda: find_valid_header_row(df_raw))
+    b.run('normalize_columns', rows, fmt, lambda: normalize_and_map_columns(df_h))
+    del df_raw, df_h
+
+    def whole():
+        upload.seek(0)
+        return process_data(upload, 'Booked')
+
+    b.run('process_data', rows, fmt, whole)
+
+    def streaming():
+        upload.seek(0)
+        return sum(len(c) for c in iter_process(upload, 'Booked'))
+
+    b.run('iter_process', rows, fmt, streaming)
+
+    store = SQLiteStore(os.path.join(os.environ['PICKUP_CACHE_DIR'], f'bench_{rows}_{fmt}.db'))
+    ledger = IngestLedger(os.path.join(os.environ['PICKUP_CACHE_DIR'], f'ledger_{rows}_{fmt}.db'))
+    b.run('ingest_sqlite', rows, fmt, lambda: ingest_file(store, ledger, upload, 'Booked'))
+    return store
+
+
+def bench_sheet(b, rows, store):
+    from fake_sheets import FakeWorksheet
+    from schema import FACT_COLUMNS, to_storage
+    from sheet_sync import SheetSync
+
+    facts = to_storage(store.read()).fillna('').astype(str)
+    values = [FACT_COLUMNS] + facts.values.tolist()
+    ws = FakeWorksheet(values)
+    cache = tempfile.mkdtemp(dir=os.environ['PICKUP_CACHE_DIR'])
+    sync = SheetSync(ws, cache_dir=cache)
+    b.run('sheet_full_load', rows, 'sheet', sync.refresh)
+    ws.rows.extend(values[1:max(rows // 100, 1) + 1])
+    b.run('sheet_incremental', rows, 'sheet', sync.refresh)
+
+
+def bench_dashboard(b, rows, store):
+    from streamlit.testing.v1 import AppTest
+
+    from fake_sheets import FakeClient, FakeSpreadsheet, FakeWorksheet
+    from prepared import PreparedCache
+    from report import ReportBuilder, default_stay_range
+
+    b.run('prepare', rows, 'db', lambda: PreparedCache().get(store))
+
+    # 정적 리포트: 화면 기본 조회 기간 기준으로 미리 생성 (GM 탭이 백그라운드 생성 없이 캐시를 쓰도록)
+    stay_range = default_stay_range(store.months())
+    cube = PreparedCache().get(store, stay_range).cube_paid_bk
+    builder = ReportBuilder()
+    b.run('report_build', rows, 'db', lambda: builder.build(cube, None, stay_range))
+    b.run('report_cached', rows, 'db', lambda: builder.build(cube, None, stay_range))
+    builder.close()
+
+    # 앱이 이번 크기의 벤치 DB 를 열도록 (DB_PATH 는 import 시점 상수라 기본 인자를 교체), 이전 크기의 캐시 제거
+    import streamlit as st
+
+    import storage
+
+    storage.SQLiteStore.__init__.__defaults__ = (store.path,)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    _patch_gspread(FakeClient([FakeSpreadsheet(worksheets=[
+        FakeWorksheet([], 'DB'), FakeWorksheet([['Month', 'Budget']], 'Budget')])]))
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    at = AppTest.from_file(app, default_timeout=600)
+    at.secrets['gcp_service_account'] = {'type': 'service_account'}
+
+    def render(**state):
+        for k, v in state.items():
+            at.session_state[k] = v
+        at.run()
+        # 예외뿐 아니라 화면에 표시된 st.error (데이터 로드 실패 등)도 실패로 처리
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if at.error:
+            raise RuntimeError(at.error[0].value)
+        return at
+
+    b.run('dashboard_first_render', rows, 'ui', render)
+    b.run('analysis_tab_render', rows, 'ui', lambda: render(main_tabs="✅ 예약 상세"))
+    render(main_tabs="✅ 예약 상세", **{"유료 예약_tabs": "📅 예약패턴(Pacing)"})
+    at.radio[0].set_value("객실단가 (ADR)")
+    b.run('pacing_switch', rows, 'ui', lambda: render(main_tabs="✅ 예약 상세", **{"유료 예약_tabs": "📅 예약패턴(Pacing)"}))
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding='utf-8') as f:
+        base = {(r['stage'], r['rows'], r['format']): r for r in json.load(f)}
+    regressions = []
+    for r in results:
+        ref = base.get((r['stage'], r['rows'], r['format']))
+        if not ref or ref['seconds'] < 0.01:
+            continue
+        ratio = r['seconds'] / ref['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append((r, ref, ratio))
+    for r, ref, ratio in regressions:
+        print(f"⚠️ {r['stage']} ({r['rows']:,} {r['format']}): {ref['seconds']:.3f}s -> {r['seconds']:.3f}s (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="업로드/대시보드 경로 벤치마크")
+    ap.add_argument('--rows', default='10000,100000', help="쉼표 구분 행 수 (예: 10000,100000,1000000)")
+    ap.add_argument('--formats', default='csv,xlsx')
+    ap.add_argument('--lang', choices=['ko', 'en'], default='ko')
+    ap.add_argument('--mem', action='store_true', help="단계별 최대 메모리 측정 (tracemalloc)")
+    ap.add_argument('--no-ui', action='store_true', help="대시보드(AppTest) 단계 생략")
+    ap.add_argument('--json', help="결과 저장 경로")
+    ap.add_argument('--compare', help="기준 결과(JSON)와 비교")
+    ap.add_argument('--tolerance', type=float, default=0.25, help="허용 지연 비율 (기본 25%%)")
+    args = ap.parse_args(argv)
+
+    # 모듈 import 전에 캐시 경로를 임시 디렉터리로 (경로 상수는 import 시점에 정해짐)
+    tmp = tempfile.mkdtemp(prefix='pickup_bench_')
+    os.environ['PICKUP_CACHE_DIR'] = tmp
+    os.environ['PICKUP_LAYOUTS_PATH'] = os.path.join(tmp, 'layouts.json')
+    os.environ['PICKUP_LEDGER_PATH'] = os.path.join(tmp, 'ingest_ledger.db')
+    os.environ['PICKUP_INDEX_PATH'] = os.path.join(tmp, 'pickup_index.db')
+    os.environ.setdefault('PICKUP_INGEST_WORKERS', '1')
+    os.environ['PICKUP_STORAGE'] = 'sqlite'
+    os.environ['PICKUP_SHEET_MIRROR'] = '0'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    b = Bench(mem=args.mem)
+    print(f"{'stage':<24}{'rows':>10} {'fmt':<5}{'time':>12}" + ("   peak mem" if args.mem else ""))
+    sizes = [int(x) for x in args.rows.split(',')]
+    formats = args.formats.split(',')
+    for rows in sizes:
+        store = None
+        for fmt in formats:
+            store = bench_ingest(b, rows, fmt, args.lang)
+        bench_sheet(b, rows, store)
+        if not args.no_ui:
+            bench_dashboard(b, rows, store)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(b.results, f, ensure_ascii=False, indent=1)
+    if args.compare and compare(b.results, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from localdb import LocalDB
+from perf import PERF
+from schema import to_storage
+from sheet_sync import CACHE_DIR, api_status
+
+# ------------------------------------------------------------------------------
+# 시트 대량 쓰기 (청크 분할 + 공용 토큰 버킷 + 429 백오프/재개)
+# & 업로드 중복 방지 장부 (파일 해시 / 행 해시)
+# ------------------------------------------------------------------------------
+
+CHUNK_ROWS = 500
+RETRY_STATUS = (429, 500, 502, 503)
+LEDGER_PATH = os.environ.get("PICKUP_LEDGER_PATH", os.path.join(CACHE_DIR, "ingest_ledger.db"))
+
+# 행 해시에서 제외: 업로드 시점에 따라 달라지는 값
+# (OTB 행은 시점 스냅샷이므로 Snapshot_Date 를 포함)
+# + 나중에 추가된 Conf_No (기존 장부의 행 해시와 맞추기 위해. 내용이 같은 행은 파일 안 순번으로 구분됨)
+VOLATILE_COLUMNS = ['Snapshot_Date', 'Conf_No']
+# 행 해시 방식. 바뀌면 기존 장부의 행 해시는 저장소에서 다시 계산 (IngestLedger.rebuild)
+#   2: 저장 형식(to_storage) 기준 -> 업로드 변환 결과와 저장소/시트에서 읽은 행이 같은 해시
+HASH_VERSION = 2
+
+
+class TokenBucket:
+    # rate: 초당 보충 토큰, capacity: 최대 버스트
+    def __init__(self, rate=1.0, capacity=5, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            with PERF.timer('sheets.throttle'):
+                self.sleep(wait)
+
+
+# 구글 시트 쓰기 한도(분당 60회/사용자) 기준. 프로세스 내 모든 세션이 공유
+SHEETS_BUCKET = TokenBucket(rate=1.0, capacity=5)
+
+
+class PartialWriteError(Exception):
+    def __init__(self, written, cause):
+        super().__init__(f"{written}행 기록 후 중단: {cause}")
+        self.written = written
+        self.cause = cause
+
+
+def write_chunks(ws, rows, bucket=SHEETS_BUCKET, chunk_rows=CHUNK_ROWS, max_retries=6,
+                 sleep=time.sleep, on_chunk=None):
+    # 실패한 청크부터 재시도. 재시도 한도 초과 시 PartialWriteError(written=성공 행 수)
+    # 연결 끊김/시간 초과 등 API 응답이 없는 오류도 PartialWriteError 로 (호출 측이 남은 행을 보관하도록)
+    written = 0
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        for i in range(max_retries):
+            bucket.acquire()
+            try:
+                ws.append_rows(chunk, value_input_option='RAW')
+                break
+            except Exception as e:
+                status = api_status(e)
+                if status not in RETRY_STATUS or i == max_retries - 1:
+                    raise PartialWriteError(written, e) from e
+                PERF.count('sheets.retry', stage='write', status=status)
+                with PERF.timer('sheets.backoff'):
+                    sleep(min(2 ** i, 32) + np.random.random())
+        written += len(chunk)
+        if on_chunk:
+            on_chunk(start, start + len(chunk))
+    return written
+
+
+# ------------------------------------------------------------------------------
+# 업로드 장부
+# ------------------------------------------------------------------------------
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class Occurrences:
+    # 파일 안에서 같은 내용 행이 몇 번째로 나왔는지 (청크로 나눠 읽어도 이어서 셈)
+    # 단체 예약의 여러 객실처럼 내용이 똑같은 행도 각각 실제 예약이므로 순번으로 구분
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)   # 정렬된 내용 해시
+        self.counts = np.empty(0, dtype=np.int64)  # 지금까지 나온 횟수
+
+    def number(self, h):
+        s = pd.Series(h)
+        occ = s.groupby(s, sort=False).cumcount().to_numpy()
+        if len(self.keys):
+            pos = np.minimum(np.searchsorted(self.keys, h), len(self.keys) - 1)
+            occ = occ + np.where(self.keys[pos] == h, self.counts[pos], 0)
+        keys, inverse = np.unique(np.concatenate([self.keys, h]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, np.ones(len(h), dtype=np.int64)]),
+                                  minlength=len(keys)).astype(np.int64)
+        self.keys = keys
+        return occ
+
+
+def row_hashes(df, occurrences=None):
+    # 행 해시 = 내용 해시 + 파일 안 순번 (첫 번째 행은 내용 해시 그대로)
+    # occurrences: 같은 파일의 청크를 이어서 셀 때 전달 (생략하면 df 안에서만 셈)
+    # 내용은 저장 형식으로 맞춘 뒤 해시 (RN 3.0 / 3, 빈 투숙객 NaN / '' 가 같은 해시)
+    fact = to_storage(df)
+    cols = [c for c in fact.columns if c not in VOLATILE_COLUMNS]
+    values = fact[cols]
+    h = pd.util.hash_pandas_object(values.where(values.notna(), '').astype(str), index=False).to_numpy()
+    is_otb = fact['Segment'].astype(str).str.startswith('OTB').to_numpy()
+    if is_otb.any():
+        snap = pd.util.hash_pandas_object(fact['Snapshot_Date'].fillna('').astype(str), index=False).to_numpy()
+        h = np.where(is_otb, h ^ (snap * np.uint64(0x9E3779B97F4A7C15)), h)
+    occ = (occurrences or Occurrences()).number(h)
+    if occ.any():
+        h = np.where(occ > 0, h ^ ((occ.astype(np.uint64) + np.uint64(1)) * np.uint64(0xC2B2AE3D27D4EB4F)), h)
+    return h.view(np.int64)
+
+
+class IngestLedger(LocalDB):
+    def __init__(self, path=LEDGER_PATH):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS files (hash TEXT PRIMARY KEY, name TEXT, rows INTEGER, ts TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS rows (hash INTEGER PRIMARY KEY)")
+            # 'built': 행 해시가 현재 해시 방식으로 계산되어 있는지. 이전 방식의 장부는 rebuild 전까지 미구성
+            if self._meta('hashes') != HASH_VERSION:
+                self._set_built(conn, conn.execute("SELECT 1 FROM rows LIMIT 1").fetchone() is None)
+                self._set_meta(conn, 'hashes', HASH_VERSION)
+
+    def has_file(self, fhash):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM files WHERE hash = ?", (fhash,)).fetchone() is not None
+
+    def add_file(self, fhash, name, rows):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, datetime('now'))", (fhash, name, rows))
+
+    def new_mask(self, hashes):
+        # 이전 업로드에서 이미 기록된 행 제외
+        # (해시에 파일 안 순번이 들어 있어 같은 파일의 동일 행은 서로 다른 해시 -> 여기서 겹치는 해시는
+        #  같은 배치로 함께 올린 다른 파일의 같은 행뿐이므로 첫 번째만 남김)
+        mask = ~pd.Series(hashes).duplicated().to_numpy()
+        if not len(hashes):
+            return mask
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE probe (hash INTEGER)")
+            conn.executemany("INSERT INTO probe VALUES (?)", ((int(h),) for h in hashes))
+            seen = {r[0] for r in conn.execute("SELECT p.hash FROM probe p JOIN rows r ON r.hash = p.hash")}
+        if seen:
+            mask &= ~np.isin(hashes, np.fromiter(seen, dtype=np.int64))
+        return mask
+
+    def add_rows(self, hashes):
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO rows VALUES (?)", ((int(h),) for h in hashes))
+
+    def rebuild(self, store):
+        # 저장소 전체의 행 해시로 다시 채움 (파일 해시는 유지). 저장소 순서대로 순번을 이어서 셈
+        # (파일마다 셀 때와 같은 집합: 저장된 같은 내용 행이 k 개면 순번 0..k-1)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM rows")
+            self._set_built(conn, False)
+        occurrences = Occurrences()
+        n = 0
+        for chunk in store.iter_read():
+            self.add_rows(row_hashes(chunk, occurrences))
+            n += len(chunk)
+        with self._connect() as conn:
+            self._set_built(conn, True)
+        return n
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM rows")
+            self._set_built(conn, True)
+
+
+def new_rows(df, ledger, hashes=None):
+    # 이전 업로드에 없는 행과 그 행 해시
+    hashes = row_hashes(df) if hashes is None else hashes
+    mask = ledger.new_mask(hashes)
+    return df[mask], hashes[mask]
+
+
+def ingest_frame(store, df, ledger, fhash=None, name='', occurrences=None):
+    # 반환: 새로 기록된 행 수 (0 이면 이미 반영된 파일/행)
+    # occurrences: 한 파일을 청크로 나눠 넣을 때 청크 간에 이어서 셀 순번 (Occurrences)
+    if fhash and ledger.has_file(fhash):
+        return 0
+    new, new_hashes = new_rows(df, ledger, row_hashes(df, occurrences))
+    # 청크 단위로 장부에 기록 -> 중간 실패 후 같은 파일을 다시 올리면 남은 행만 기록
+    # (새 행이 없어도 호출: 미러에 남은 행이 있으면 이때 이어서 기록됨)
+    store.append(new, on_chunk=lambda a, b: ledger.add_rows(new_hashes[a:b]))
+    if fhash:
+        ledger.add_file(fhash, name, len(new))
+    return len(new)
+
+
+def ingest_chunks(store, ledger, chunks, pickup=None, netting=None):
+    # 파일 하나의 변환된 청크들을 하나씩 중복 제거 -> 기록 -> 픽업/취소 상계 인덱스 갱신 (메모리 = 청크 크기)
+    # 반환: (파싱 행 수, 신규 행 수). 기록이 중간에 실패하면 그 청크까지 인덱스를 갱신한 뒤
+    # PartialWriteError(written=이 파일에서 기록된 신규 행 수)
+    occurrences = Occurrences()
+    loaded = set()  # 픽업 인덱스에서 이 파일로 교체한 (세그먼트, 스냅샷)
+    parsed = new = 0
+    for chunk in chunks:
+        parsed += len(chunk)
+        rows, hashes = new_rows(chunk, ledger, row_hashes(chunk, occurrences))
+        error = None
+        try:
+            with PERF.timer('ingest.write', rows=len(rows)):
+                store.append(rows, on_chunk=lambda a, b: ledger.add_rows(hashes[a:b]))
+        except PartialWriteError as e:
+            error = e
+        if pickup is not None:
+            with PERF.timer('pickup.add'):
+                pickup.add(chunk, loaded)
+        if netting is not None:
+            # 장부에 기록된 행만 (실패 시 나머지는 같은 파일을 다시 반영할 때 장부와 함께 들어감)
+            written = len(rows) if error is None else error.written
+            with PERF.timer('netting.add'):
+                netting.add(rows.iloc[:written], hashes[:written])
+        if error is not None:
+            raise PartialWriteError(new + error.written, error.cause) from error
+        new += len(rows)
+    return parsed, new
@@ -0,0 +1,338 @@
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+# ------------------------------------------------------------------------------
+# 배치 CLI (화면/차트 라이브러리 없이 처리 엔진만 사용 - 야간 작업/cron 용)
+# ------------------------------------------------------------------------------
+# python cli.py ingest exports/ -r                 # 폴더의 csv/xlsx 를 로컬 DB 에 반영 (이미 반영된 파일/행은 건너뜀)
+# python cli.py aggregate --by Segment,Stay_Month --stay 2025-01:2025-12 --out seg.csv
+# python cli.py pickup --segment OTB_Month --out pickup.xlsx
+# python cli.py curve --month 2025-08 --out curve.csv
+# python cli.py net --by Stay_Month,Segment --out net.csv   # 취소를 원 예약에서 상계한 순 OTB
+# python cli.py report --budget budget.csv --out reports/   # 정적 GM 리포트 (Excel/PDF/HTML), 데이터가 그대로면 캐시 반환
+# python cli.py months
+# - 엔진 모듈(pandas 포함)은 하위 명령 안에서 import -> --help 는 바로 응답, streamlit/plotly/gspread 는 로드하지 않음
+# - 구글 시트 미러 없이 로컬 저장소만 사용 (--db 또는 PICKUP_DB_PATH, 장부/픽업 인덱스는 PICKUP_CACHE_DIR)
+#   --db 를 주면 장부/픽업/취소 상계 인덱스도 그 DB 옆 파일 사용 (pickup.db -> pickup.ledger.db 등. DB 마다 따로)
+# - 파일 구분: 이름에 "Sales on the Book"/"영업 현황" -> OTB (--otb), "cancel"/"취소" -> 취소 리스트, 나머지 -> 예약 리스트
+# - 스냅샷 기준일: 기본은 파일 이름의 날짜 (예: "Sales on the Book 20250801.xlsx"), 없으면 오늘
+#   (지난 리포트를 한꺼번에 넣어도 스냅샷이 하루로 합쳐지지 않도록)
+
+EXTENSIONS = ('.csv', '.xlsx')
+NAME_DATE = re.compile(r'(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})')
+
+
+def _store(args):
+    from storage import SQLiteStore
+
+    return SQLiteStore(args.db) if args.db else SQLiteStore()
+
+
+def _index_path(args, suffix):
+    # --db 옆 인덱스 파일 경로 (--db 가 없으면 None -> 각 인덱스 기본 경로)
+    return f"{os.path.splitext(args.db)[0]}.{suffix}.db" if args.db else None
+
+
+def _ledger(args):
+    from bulk_writer import IngestLedger
+
+    path = _index_path(args, 'ledger')
+    return IngestLedger(path) if path else IngestLedger()
+
+
+def _pickup(args):
+    from pickup import PickupIndex
+
+    path = _index_path(args, 'pickup')
+    return PickupIndex(path) if path else PickupIndex()
+
+
+def _netting(args):
+    from netting import NettingIndex
+
+    path = _index_path(args, 'netting')
+    return NettingIndex(path) if path else NettingIndex()
+
+
+def _month_range(value):
+    # "2025-01:2025-12" / "2025-03" -> (시작월, 끝월)
+    if not value:
+        return None
+    lo, _, hi = value.partition(':')
+    return (lo, hi or lo)
+
+
+def _output(df, out):
+    if out is None:
+        print(df.to_string(index=False) if len(df) else "(결과 없음)")
+        return
+    ext = os.path.splitext(out)[1].lower()
+    if ext == '.xlsx':
+        df.to_excel(out, index=False)
+    elif ext == '.parquet':
+        df.to_parquet(out, index=False)
+    elif ext == '.json':
+        df.to_json(out, orient='records', force_ascii=False, date_format='iso')
+    else:
+        df.to_csv(out, index=False, encoding='utf-8-sig')  # 엑셀에서 한글이 깨지지 않도록 BOM
+    print(f"{out} ({len(df):,}행)")
+
+
+def _collect(paths, recursive):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            walk = os.walk(p) if recursive else [(p, [], os.listdir(p))]
+            for root, _, names in walk:
+                files += [os.path.join(root, n) for n in sorted(names)
+                          if n.lower().endswith(EXTENSIONS) and not n.startswith('~$')]
+        elif p.lower().endswith(EXTENSIONS):
+            files.append(p)
+    return files
+
+
+def classify(name, otb="Month"):
+    # 파일 이름 -> (status, sub_segment)  (화면의 업로더 구분과 같은 값)
+    from ingest import is_otb_file
+
+    if is_otb_file(name):
+        return "Booked", otb
+    if 'cancel' in name.lower() or '취소' in name:
+        return "Cancelled", "General"
+    return "Booked", "General"
+
+
+def snapshot_date(name, mode="file"):
+    # mode: file(이름의 날짜, 없으면 오늘) / today / YYYY-MM-DD
+    if mode == "today":
+        return None
+    if mode != "file":
+        return mode
+    m = NAME_DATE.search(name)
+    if m is None:
+        return None
+    try:
+        return datetime(*map(int, m.groups())).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+# --- 하위 명령 -----------------------------------------------------------------
+def cmd_ingest(args):
+    from ingest_queue import IngestQueue, WORKERS
+
+    paths = _collect(args.paths, args.recursive)
+    if not paths:
+        print("반영할 파일(csv/xlsx)이 없습니다.")
+        return 1
+    store = _store(args)
+    ledger = _ledger(args)
+    pickup = _pickup(args)
+    netting = _netting(args)
+    if not ledger.built:
+        ledger.rebuild(store)
+    if not pickup.built:
+        pickup.rebuild(store)
+    if not netting.built:
+        netting.rebuild(store)
+
+    files = []
+    for p in paths:
+        with open(p, 'rb') as f:
+            data = f.read()
+        name = os.path.basename(p)
+        files.append((name, data, *classify(name, args.otb), snapshot_date(name, args.snapshot)))
+
+    queue = IngestQueue(store, ledger, pickup, workers=args.workers or WORKERS, netting=netting)
+    batch = queue.submit(files)
+    queue.wait()
+    queue.close()
+
+    for f in batch['files']:
+        line = f"{f['state']:<3} {f['rows']:>10,}행  {f['name']}"
+        print(line + (f"  ⚠️ {f['error'].strip()}" if f['error'] else ""))
+    print(f"신규 {batch['new']:,}행 반영")
+    if batch['error']:
+        print(f"⚠️ {batch['error']}")
+    if batch['mirror']:
+        print(f"ℹ️ {batch['mirror']}")
+    failed = batch['error'] or any(f['state'] == '오류' for f in batch['files'])
+    return 1 if failed else 0
+
+
+def cmd_aggregate(args):
+    from cube import CUBE_DIMS, CUBE_KEYS, build_cube, rollup, slice_cube
+
+    dims = args.by.split(',')
+    unknown = [d for d in dims if d not in CUBE_KEYS + CUBE_DIMS]
+    if unknown:
+        print(f"알 수 없는 차원: {', '.join(unknown)} (가능: {', '.join(CUBE_KEYS + CUBE_DIMS)})")
+        return 2
+    df = _store(args).read_filtered(stay_range=_month_range(args.stay))
+    if df.empty:
+        print("(데이터 없음)")
+        return 0
+    # 화면과 같은 기준: 예약 = 유료(0원 제외), 취소 = 전체, OTB 행 제외
+    cube = slice_cube(build_cube(df), status=args.status, zero_rate=False if args.status == 'Booked' else None)
+    _output(rollup(cube, dims), args.out)
+    return 0
+
+
+def cmd_pickup(args):
+    pickup = _pickup(args)
+    if not pickup.built:
+        pickup.rebuild(_store(args))
+    stay_range = _month_range(args.stay)
+    if args.start:
+        end = args.end or (pickup.snapshots(args.segment) or [None])[-1]
+        out = pickup.between(args.start, end, args.segment, stay_range)
+    else:
+        out = pickup.rolling(args.end, segment=args.segment, stay_range=stay_range)
+    _output(out, args.out)
+    return 0
+
+
+def cmd_curve(args):
+    import pandas as pd
+
+    from curve import booking_curves, period_curve
+    from schema import with_derived
+
+    month = pd.Period(args.month, freq='M')
+    # 작년 동기(52주 전) 입실일까지 함께 읽음
+    df = _store(args).read_filtered(stay_range=((month - 12).strftime('%Y-%m'), args.month))
+    df = df[(df['Status'] == 'Booked') & ~df['Segment'].astype(str).str.startswith('OTB')]
+    segments = args.segments.split(',') if args.segments else None
+    curves = booking_curves(with_derived(df, ['CheckIn_dt', 'Booking_dt']), segments)
+    out = period_curve(curves, month.start_time, month.end_time.normalize())
+    out = out.reset_index().rename(columns={'index': 'Days_Before'})
+    _output(out if args.all_days else out[out['Days_Before'].isin(args.days)], args.out)
+    return 0
+
+
+def cmd_net(args):
+    from netting import NET_DIMS
+
+    by = args.by.split(',') if args.by else []
+    unknown = [d for d in by if d not in NET_DIMS]
+    if unknown:
+        print(f"알 수 없는 차원: {', '.join(unknown)} (가능: {', '.join(NET_DIMS)})")
+        return 2
+    netting = _netting(args)
+    if not netting.built:
+        netting.rebuild(_store(args))
+    _output(netting.net(by, _month_range(args.stay)), args.out)
+    return 0
+
+
+def cmd_report(args):
+    import shutil
+
+    import pandas as pd
+
+    from prepared import PreparedCache
+    from report import ReportBuilder, default_stay_range
+    from sheets import budget_frame
+
+    store = _store(args)
+    # 기간을 생략하면 화면 기본 조회 기간과 같게 (같은 데이터/예산이면 화면과 캐시 공유)
+    stay_range = _month_range(args.stay) or default_stay_range(store.months())
+    prep = PreparedCache().get(store, stay_range)
+    if prep.empty:
+        print("(데이터 없음)")
+        return 0
+    budget = None
+    if args.budget:
+        raw = pd.read_excel(args.budget, dtype=str) if args.budget.lower().endswith('.xlsx') else pd.read_csv(args.budget, dtype=str)
+        budget = budget_frame([list(raw.columns)] + raw.fillna('').values.tolist())
+        if stay_range:
+            budget = budget[budget['Month'].between(*stay_range)]
+    builder = ReportBuilder(workers=args.workers) if args.workers else ReportBuilder()
+    try:
+        key, files = builder.build(prep.cube_paid_bk, budget, stay_range)
+    finally:
+        builder.close()
+    for fmt, path in files.items():
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            name = f"gm_report_{'_'.join(stay_range) if stay_range else 'all'}.{fmt}"
+            path = shutil.copyfile(path, os.path.join(args.out, name))
+        print(path)
+    return 0
+
+
+def cmd_months(args):
+    for m in _store(args).months():
+        print(m)
+    return 0
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="cli.py", description="픽업 엔진 배치 명령 (화면 없이 실행)")
+    ap.add_argument('--db', help="로컬 DB 경로 (기본: PICKUP_DB_PATH 또는 .pickup_cache/pickup.db). "
+                                 "장부/픽업·취소 상계 인덱스는 그 옆 <이름>.ledger.db / .pickup.db / .netting.db")
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('ingest', help="폴더/파일의 PMS 리포트를 DB 에 반영")
+    p.add_argument('paths', nargs='+')
+    p.add_argument('-r', '--recursive', action='store_true', help="하위 폴더 포함")
+    p.add_argument('--otb', choices=['Month', 'Total'], default='Month', help="OTB 파일 구분 (당월/전체)")
+    p.add_argument('--snapshot', default='file', help="스냅샷 기준일: file(파일 이름의 날짜, 기본) / today / YYYY-MM-DD")
+    p.add_argument('--workers', type=int, help="병렬 파싱 프로세스 수 (기본 PICKUP_INGEST_WORKERS)")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser('aggregate', help="차원별 RN/매출/ADR 집계")
+    p.add_argument('--by', default='Segment,Stay_Month', help="쉼표 구분 차원")
+    p.add_argument('--status', choices=['Booked', 'Cancelled'], default='Booked')
+    p.add_argument('--stay', help="입실월 범위 (예: 2025-01:2025-12)")
+    p.add_argument('--out', help="csv/xlsx/parquet/json (생략하면 화면 출력)")
+    p.set_defaults(func=cmd_aggregate)
+
+    p = sub.add_parser('pickup', help="OTB 스냅샷 픽업 (기본: 최근 1/7/30일)")
+    p.add_argument('--segment', help="OTB_Month / OTB_Total (생략하면 전체)")
+    p.add_argument('--start', help="비교 스냅샷 (지정하면 두 스냅샷 간 입실일별 픽업)")
+    p.add_argument('--end', help="기준 스냅샷 (기본: 최신)")
+    p.add_argument('--stay', help="입실월 범위")
+    p.add_argument('--out')
+    p.set_defaults(func=cmd_pickup)
+
+    p = sub.add_parser('curve', help="입실월 부킹 커브 + 작년 동기")
+    p.add_argument('--month', required=True, help="입실월 (YYYY-MM)")
+    p.add_argument('--segments', help="쉼표 구분 세그먼트 (생략하면 전체)")
+    p.add_argument('--days', type=int, nargs='+', default=[90, 60, 30, 14, 7, 0], help="출력할 도착 전 일수")
+    p.add_argument('--all-days', action='store_true', help="0~365일 전체 출력")
+    p.add_argument('--out')
+    p.set_defaults(func=cmd_curve)
+
+    p = sub.add_parser('net', help="순 OTB (취소를 원 예약에서 상계)")
+    p.add_argument('--by', default='Stay_Month,Segment', help="쉼표 구분 차원 (Stay_Month/Segment/Account/Room_Type, 비우면 합계)")
+    p.add_argument('--stay', help="입실월 범위")
+    p.add_argument('--out')
+    p.set_defaults(func=cmd_net)
+
+    p = sub.add_parser('report', help="정적 GM 리포트 (Excel/PDF/HTML)")
+    p.add_argument('--stay', help="입실월 범위 (기본: 화면 기본 조회 기간 = 최근 12개월)")
+    p.add_argument('--budget', help="예산 csv/xlsx (Month, Budget 열)")
+    p.add_argument('--out', help="복사할 폴더 (생략하면 캐시 경로만 출력)")
+    p.add_argument('--workers', type=int, help="차트 렌더링 프로세스 수 (기본 PICKUP_REPORT_WORKERS)")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser('months', help="저장된 입실월 목록")
+    p.set_defaults(func=cmd_months)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    t = time.perf_counter()
+    code = args.func(args)
+    print(f"({time.perf_counter() - t:.2f}s)", file=sys.stderr)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from schema import with_derived
+
+# ------------------------------------------------------------------------------
+# 집계 큐브 (RN / 객실매출 합계를 분석 차원 전체로 1회 집계)
+# ------------------------------------------------------------------------------
+# 탭/요약 화면은 원본 대신 큐브를 잘라(slice) 다시 합산(rollup)해서 사용.
+# 큐브 행 수 = 실제 존재하는 차원 조합 수 (원본 행 수보다 훨씬 작음)
+
+LEAD_BINS = [-1, 0, 3, 7, 14, 30, 60, 90, 999]
+LEAD_LABELS = ['당일', '1-3일', '4-7일', '8-14일', '15-30일', '31-60일', '61-90일', '90일+']
+
+CUBE_KEYS = ['Status', 'Is_Zero_Rate', 'Is_OTB']
+CUBE_DIMS = ['Segment', 'Stay_Month', 'Booking_Month', 'Account', 'Lead_Group', 'Room_Type', 'Day_Type']
+MEASURES = ['RN', 'Room_Revenue']
+
+
+def lead_group(lead_time):
+    return pd.cut(lead_time, bins=LEAD_BINS, labels=LEAD_LABELS)
+
+
+def build_cube(df):
+    df = with_derived(df, ['Stay_Month', 'Booking_Month', 'Day_Type', 'Is_Zero_Rate'])
+    base = df[['Status', 'Is_Zero_Rate', 'Segment', 'Stay_Month', 'Booking_Month', 'Account',
+               'Room_Type', 'Day_Type'] + MEASURES].copy()
+    base['Is_OTB'] = df['Segment'].astype(str).str.contains('OTB')
+    base['Lead_Group'] = lead_group(df['Lead_Time'])
+    return (base.groupby(CUBE_KEYS + CUBE_DIMS, observed=True, dropna=False)[MEASURES]
+                .sum().reset_index())
+
+
+def slice_cube(cube, status=None, zero_rate=None, otb=False):
+    mask = pd.Series(True, index=cube.index)
+    if status is not None:
+        mask &= cube['Status'] == status
+    if zero_rate is not None:
+        mask &= cube['Is_Zero_Rate'] == zero_rate
+    if otb is not None:
+        mask &= cube['Is_OTB'] == otb
+    return cube[mask]
+
+
+def rollup(cube, dims, with_adr=True, dropna=True):
+    out = cube.groupby(dims, observed=True, dropna=dropna)[MEASURES].sum().reset_index()
+    if with_adr:
+        out['ADR'] = (out['Room_Revenue'] / out['RN']).fillna(0)
+    return out
+
+
+def lead_rollup(cube):
+    out = rollup(cube, ['Lead_Group'], with_adr=False).set_index('Lead_Group')
+    out = out.reindex(pd.CategoricalIndex(LEAD_LABELS, categories=LEAD_LABELS, ordered=True, name='Lead_Group'), fill_value=0)
+    out = out.reset_index()
+    out['ADR'] = (out['Room_Revenue'] / out['RN']).fillna(0)
+    return out
+
+
+def pacing_matrix(cube, metric):
+    # metric: 'RN' / 'Room_Revenue' / 'ADR'  (index=Booking_Month, columns=Stay_Month)
+    # 이미 (예약월, 입실월) 단위로 줄인 프레임이라 pivot_table 비용이 작음
+    bm = rollup(cube, ['Booking_Month', 'Stay_Month'], with_adr=False)
+
+    def piv(values):
+        return bm.pivot_table(index='Booking_Month', columns='Stay_Month', values=values, aggfunc='sum', fill_value=0, observed=True)
+
+    if metric == 'ADR':
+        return piv('Room_Revenue').div(piv('RN')).fillna(0)
+    return piv(metric)
+
+
+def budget_vs_actual(cube, budget):
+    # 입실월별 객실매출 실적 vs 예산 (budget: [Month, Budget]). 예산 또는 실적이 있는 월만
+    actual = rollup(cube, ['Stay_Month'], with_adr=False)[['Stay_Month', 'Room_Revenue']]
+    actual['Stay_Month'] = actual['Stay_Month'].astype(str)
+    out = actual.merge(budget.rename(columns={'Month': 'Stay_Month'}), on='Stay_Month', how='outer')
+    out[['Room_Revenue', 'Budget']] = out[['Room_Revenue', 'Budget']].fillna(0)
+    out['Achievement'] = (out['Room_Revenue'] / out['Budget'].where(out['Budget'] > 0) * 100).round(1)
+    return out.sort_values('Stay_Month').reset_index(drop=True)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from transform import safe_ratio
+
+# ------------------------------------------------------------------------------
+# 일별 부킹 커브 (입실일 x 도착 전 일수)
+# ------------------------------------------------------------------------------
+# curve[입실일, d] = 도착 d일 전 시점의 누적 예약 (리드타임 >= d 인 예약 합계)
+# (입실일 오프셋, 리드 일수) 정수 좌표 하나로 bincount -> 리드 축 역방향 cumsum. groupby 없음.
+# 리드 일수 = 입실일 - 예약일. 예약일이 없던 행(예약일 = 입실일)은 파일의 Lead_Time 사용.
+# 아직 오지 않은 시점(입실일 - d > 기준일)은 NaN.
+
+MAX_LEAD = 365
+STLY_DAYS = 364  # 52주 전 (같은 요일)
+CURVE_MEASURES = ['RN', 'Room_Revenue']
+CHECKPOINTS = [90, 60, 30, 14, 7, 0]
+
+
+def lead_days(df):
+    stay = df['CheckIn_dt'].to_numpy('datetime64[D]')
+    book = df['Booking_dt'].to_numpy('datetime64[D]')
+    lead = (stay - book).astype('int64')
+    file_lead = pd.to_numeric(df['Lead_Time'], errors='coerce').fillna(0).to_numpy('int64')
+    return np.where(np.isnat(book) | (lead <= 0), np.maximum(file_lead, 0), lead)
+
+
+def booking_curves(df, segments=None, max_lead=MAX_LEAD, asof=None, measures=CURVE_MEASURES):
+    # 반환: {측정값: DataFrame(index=Stay_Date 일 단위 연속, columns=Days_Before 0..max_lead)}
+    if segments:
+        df = df[df['Segment'].isin(segments)]
+    stay = df['CheckIn_dt'].to_numpy('datetime64[D]')
+    valid = ~np.isnat(stay)
+    if not valid.any():
+        return {m: pd.DataFrame() for m in measures}
+    first, last = stay[valid].min(), stay[valid].max()
+    n_stays = int((last - first).astype('int64')) + 1
+    width = max_lead + 1
+
+    offset = (stay[valid] - first).astype('int64')
+    lead = np.minimum(lead_days(df[valid]), max_lead)
+    idx = offset * width + lead
+
+    index = pd.date_range(pd.Timestamp(first), periods=n_stays, freq='D', name='Stay_Date')
+    columns = pd.RangeIndex(width, name='Days_Before')
+    # 아직 관측되지 않은 칸: 입실일 - d > 기준일
+    asof = np.datetime64(pd.Timestamp(asof or pd.Timestamp.now()).normalize(), 'D')
+    future = (first + np.arange(n_stays))[:, None] - np.arange(width)[None, :] > asof
+
+    out = {}
+    for m in measures:
+        w = pd.to_numeric(df[m], errors='coerce').fillna(0).to_numpy('float64')[valid]
+        daily = np.bincount(idx, weights=w, minlength=n_stays * width).reshape(n_stays, width)
+        cum = daily[:, ::-1].cumsum(axis=1)[:, ::-1]
+        cum[future] = np.nan
+        out[m] = pd.DataFrame(cum, index=index, columns=columns)
+    return out
+
+
+def stly(matrix, days=STLY_DAYS):
+    # 같은 입실일 행에 52주 전 입실일의 커브를 맞춰 붙임 (없는 날은 NaN)
+    ly = matrix.reindex(matrix.index - pd.Timedelta(days=days))
+    ly.index = matrix.index
+    return ly
+
+
+def period_curve(curves, start, end, with_stly=True):
+    # 입실일 구간 합계 커브: index=Days_Before, columns=[RN, Room_Revenue, ADR] (+ _LY)
+    rows = {}
+    for m, matrix in curves.items():
+        if matrix.empty:
+            continue
+        sel = matrix.loc[start:end]
+        # 구간 안 모든 입실일이 관측된 시점만 합계 (일부만 관측된 합계는 추세를 왜곡)
+        rows[m] = sel.sum(axis=0, min_count=1).where(sel.notna().all(axis=0))
+        if with_stly:
+            ly = stly(matrix).loc[start:end]
+            rows[f'{m}_LY'] = ly.sum(axis=0, min_count=1)
+    out = pd.DataFrame(rows)
+    if 'RN' in out and 'Room_Revenue' in out:
+        out['ADR'] = safe_ratio(out['Room_Revenue'], out['RN']).where(out['RN'].notna())
+        if with_stly:
+            out['ADR_LY'] = safe_ratio(out['Room_Revenue_LY'], out['RN_LY']).where(out['RN_LY'].notna())
+    return out
@@ -0,0 +1,142 @@
+import re
+
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+
+# ------------------------------------------------------------------------------
+# 테스트/오프라인용 인메모리 워크시트 (gspread Worksheet 대체)
+# ------------------------------------------------------------------------------
+# SheetSync 등이 실제로 쓰는 메서드만 흉내냄. calls 에 API 호출 횟수를 기록.
+# fail_writes=N 이면 다음 N 번의 append_rows 가 429 로 실패.
+# FakeSpreadsheet / FakeClient 는 gspread.authorize() 결과 대체 (app.py 를 자격 증명 없이 실행)
+
+_A1 = re.compile(r"^(?:'?[^!]*'?!)?([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+class _Response:
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        self.text = message
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text, "status": "RESOURCE_EXHAUSTED"}}
+
+
+def rate_limit_error():
+    return APIError(_Response(429, "Quota exceeded"))
+
+
+def _col_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+class FakeWorksheet:
+    def __init__(self, rows=None, title="Sheet1", fail_writes=0):
+        self.title = title
+        self.rows = [list(map(str, r)) for r in (rows or [])]
+        self.fail_writes = fail_writes
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _trim(self, rows):
+        # 실제 API처럼 뒤쪽 빈 셀/빈 행은 잘라서 반환
+        out = []
+        for r in rows:
+            r = list(r)
+            while r and r[-1] == '':
+                r.pop()
+            out.append(r)
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def _range(self, a1):
+        m = _A1.match(a1)
+        if not m:
+            raise ValueError(f"bad range: {a1}")
+        c1, r1, c2, r2 = m.groups()
+        r1 = int(r1) if r1 else 1
+        r2 = int(r2) if r2 else (r1 if m.group(3) is None and m.group(4) is None else len(self.rows))
+        c1 = _col_index(c1) if c1 else 1
+        c2 = _col_index(c2) if c2 else None
+        block = []
+        for r in self.rows[r1 - 1:r2]:
+            block.append(r[c1 - 1:c2] if c2 else r[c1 - 1:])
+        return self._trim(block)
+
+    def get_all_values(self):
+        self._count("get_all_values")
+        width = max((len(r) for r in self.rows), default=0)
+        return [r + [''] * (width - len(r)) for r in self.rows]
+
+    def get(self, range_name=None):
+        self._count("get")
+        return self._range(range_name) if range_name else self._trim(self.rows)
+
+    def batch_get(self, ranges):
+        self._count("batch_get")
+        return [self._range(r) for r in ranges]
+
+    def append_row(self, values, **kwargs):
+        self._count("append_row")
+        self.rows.append([str(v) for v in values])
+
+    def append_rows(self, values, **kwargs):
+        self._count("append_rows")
+        if self.fail_writes > 0:
+            self.fail_writes -= 1
+            raise rate_limit_error()
+        self.rows.extend([str(v) for v in r] for r in values)
+
+    def clear(self):
+        self._count("clear")
+        self.rows = []
+
+
+class FakeSpreadsheet:
+    def __init__(self, title="Amber_Revenue_DB", worksheets=None):
+        self.title = title
+        self._worksheets = list(worksheets or [FakeWorksheet([], "Sheet1")])
+        self.calls = {}
+
+    def values_batch_get(self, ranges, params=None):
+        # "'시트명'!A1:B" 형식 범위들을 한 번에 조회 (values:batchGet 응답 형식)
+        self.calls["values_batch_get"] = self.calls.get("values_batch_get", 0) + 1
+        out = []
+        for r in ranges:
+            title, _, a1 = r.rpartition('!')
+            ws = self.worksheet(title.strip("'").replace("''", "'")) if title else self._worksheets[0]
+            values = ws._range(a1)
+            out.append({'range': r, 'values': values} if values else {'range': r})
+        return {'spreadsheetId': self.title, 'valueRanges': out}
+
+    def get_worksheet(self, index):
+        return self._worksheets[index] if index < len(self._worksheets) else None
+
+    def worksheet(self, title):
+        for ws in self._worksheets:
+            if ws.title == title:
+                return ws
+        raise WorksheetNotFound(title)
+
+    def worksheets(self):
+        return list(self._worksheets)
+
+    def add_worksheet(self, title, rows=0, cols=0, **kwargs):
+        ws = FakeWorksheet([], title)
+        self._worksheets.append(ws)
+        return ws
+
+
+class FakeClient:
+    def __init__(self, spreadsheets=None):
+        self.spreadsheets = {s.title: s for s in (spreadsheets or [FakeSpreadsheet()])}
+
+    def open(self, title):
+        if title not in self.spreadsheets:
+            raise SpreadsheetNotFound(title)
+        return self.spreadsheets[title]
@@ -0,0 +1,284 @@
+import hashlib
+import io
+import os
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from bulk_writer import ingest_chunks
+from layouts import apply_columns, get_registry, OTB_OFFSETS, SUBTOTAL_PATTERN
+from schema import FACT_COLUMNS
+from transform import conf_number, format_dates, nat_group, parse_dates, str_contains
+
+# ------------------------------------------------------------------------------
+# 2. 데이터 처리 엔진 (리드타임 계산 로직 삭제 -> 원본 사용)
+# ------------------------------------------------------------------------------
+# - process_data : 파일 전체를 한 번에 읽어 변환 (기존 방식)
+# - iter_process : CSV 는 청크 단위, 엑셀은 openpyxl read-only 로 행 묶음 단위로 읽어
+#                  헤더 탐지(앞쪽 HEADER_SCAN_ROWS 행만) -> 소계 제거 -> 변환을 청크마다 수행
+#                  (파싱된 프레임의 최대 메모리 = 청크 크기)
+# - parse_bytes  : 업로드 파일 바이트 -> 변환된 프레임 (한 번에 필요할 때)
+# - spool_bytes  : 업로드 파일 바이트 -> 변환된 청크 파일 목록 (병렬 파싱 워커 진입점, ingest_queue.py)
+# - 헤더 행 해시로 레이아웃 등록부(layouts.py)를 조회해, 아는 양식이면 저장된 plan
+#   (열 매핑/날짜 형식/OTB 열 위치)으로 바로 파싱하고 모르는 양식만 키워드 탐색
+
+HEADER_SCAN_ROWS = 50
+CHUNK_ROWS = 50_000
+HEADER_KEYWORDS = ['guest', 'name', 'check', 'date', 'room', '고객', '입실', '객실']
+
+
+def normalize_and_map_columns(df):
+    col_map = {}
+    rules = {
+        'Conf_No': ['conf', 'resno', 'reservationno', 'rsvno', 'bookingno', '예약번호', '확인번호'],
+        'CheckIn': ['checkin', 'check-in', 'arrival', '입실', '일자', 'date'],
+        'Guest_Name': ['guest', 'name', 'customer', '고객', '투숙객', '성명'],
+        'Booking_Date': ['booking', 'create', 'res', '예약', '생성'],
+        'Rooms': ['room', 'qty', 'rmws', '객실수', '수량'],
+        'Nights': ['night', 'los', '박수', '박'],
+        'Room_Revenue': ['room_rev', 'revenue', 'roomrate', '객실료', '매출'],
+        'Total_Revenue': ['total', 'amount', '총금액', '합계'],
+        'Segment': ['segment', '세그먼트'],
+        'Account': ['account', 'source', 'agent', '거래처', '에이전시'],
+        'Room_Type': ['type', 'cat', '객실타입', '룸타입'],
+        'Nat_Orig': ['nation', 'country', 'nat', '국적'],
+        'Lead_Time': ['lead', '리드', 'lt', 'l/t'] # 리드타임 컬럼 인식
+    }
+
+    for original_col in df.columns:
+        clean_col = str(original_col).lower().replace(" ", "").replace("_", "").replace("-", "")
+        mapped = False
+        for target_col, keywords in rules.items():
+            for kw in keywords:
+                if kw in clean_col:
+                    if target_col == 'Room_Revenue' and 'total' in clean_col: continue
+                    if target_col == 'Total_Revenue' and 'room' in clean_col and 'total' not in clean_col: continue
+                    if target_col == 'CheckIn' and ('book' in clean_col or 'res' in clean_col): continue
+                    if target_col == 'Conf_No' and ('date' in clean_col or '일' in clean_col): continue
+
+                    if target_col not in col_map.values():
+                        col_map[original_col] = target_col
+                        mapped = True
+                        break
+            if mapped: break
+    return df.rename(columns=col_map)
+
+def header_row_index(df, scan_rows=HEADER_SCAN_ROWS):
+    # 앞쪽 scan_rows 행만 검사 (헤더는 항상 리포트 상단에 있음)
+    head = df.head(scan_rows).astype(str)
+    for i, row_str in enumerate(head.agg(" ".join, axis=1).str.lower()):
+        if sum(1 for k in HEADER_KEYWORDS if k in row_str) >= 2:
+            return i
+    return None
+
+def find_valid_header_row(df):
+    i = header_row_index(df)
+    if i is None:
+        return df
+    df.columns = df.iloc[i]
+    return df.iloc[i+1:].reset_index(drop=True)
+
+def split_header(df, is_otb, registry=None, sample_rows=200):
+    # 반환: (헤더 셀 목록 | None, plan | None, 헤더 아래 본문)
+    i = header_row_index(df)
+    if i is None:
+        return None, None, df
+    header = list(df.iloc[i])
+    body = df.iloc[i+1:]
+    plan = (registry or get_registry()).resolve(header, body.head(sample_rows), 'otb' if is_otb else 'list')
+    return header, plan, body
+
+def is_otb_file(name):
+    return "Sales on the Book" in name or "영업 현황" in name
+
+def transform_frame(df_raw, status, sub_segment="General", is_otb=False, plan=None, snapshot=None):
+    # 헤더가 적용된 원본 프레임(또는 청크) -> FACT_COLUMNS 프레임
+    # snapshot: 리포트 기준일 (YYYY-MM-DD). 없으면 오늘 (화면 업로드 = 당일 리포트)
+    # plan 이 있으면 열 매핑/날짜 형식/OTB 열 위치를 plan 값으로 사용 (등록된 양식)
+    subtotal = plan['subtotal'] if plan else SUBTOTAL_PATTERN
+    date_formats = plan['date_formats'] if plan else {}
+    if is_otb:
+        # [OTB]
+        if '일자' in df_raw.columns:
+            df_raw = df_raw[~str_contains(df_raw['일자'], subtotal)]
+        elif df_raw.shape[1] > 0:
+            df_raw = df_raw[~str_contains(df_raw.iloc[:, 0], subtotal)]
+
+        df = pd.DataFrame()
+        df['Guest_Name'] = f'OTB_{sub_segment}_DATA'
+
+        if plan:
+            date_values = df_raw.iloc[:, plan['otb_date_col']]
+        else:
+            date_col = next((c for c in df_raw.columns if '일자' in str(c) or 'Date' in str(c)), df_raw.columns[0])
+            date_values = df_raw[date_col]
+        df['CheckIn'] = parse_dates(date_values, date_formats.get('CheckIn'))
+
+        pos = plan['otb_columns'] if plan else OTB_OFFSETS
+        try:
+            df['RN'] = pd.to_numeric(df_raw.iloc[:, pos['RN']], errors='coerce').fillna(0)
+            df['Room_Revenue'] = pd.to_numeric(df_raw.iloc[:, pos['Room_Revenue']], errors='coerce').fillna(0)
+            df['Total_Revenue'] = df['Room_Revenue']
+        except:
+            df['RN'] = 0; df['Room_Revenue'] = 0; df['Total_Revenue'] = 0
+
+        df['Booking_Date'] = df['CheckIn']
+        df['Segment'] = f'OTB_{sub_segment}'
+        df['Account'] = 'OTB_Summary'
+        df['Room_Type'] = 'Run of House'
+        df['Nat_Orig'] = 'KOR'
+        df['Lead_Time'] = 0
+
+    else:
+        # [리스트]
+        df_raw = df_raw[~str_contains(df_raw.iloc[:, 0], subtotal, case=False)]
+
+        df = apply_columns(df_raw, plan) if plan else normalize_and_map_columns(df_raw).copy()
+        if 'Guest_Name' in df.columns:
+            df = df[~str_contains(df['Guest_Name'], subtotal, case=False)]
+
+        if 'CheckIn' not in df.columns: return pd.DataFrame()
+        if 'Booking_Date' not in df.columns: df['Booking_Date'] = df['CheckIn']
+
+        req_cols = ['Rooms', 'Nights', 'Room_Revenue', 'Total_Revenue', 'Guest_Name', 'Segment', 'Account', 'Room_Type', 'Nat_Orig', 'Lead_Time']
+        for c in req_cols:
+            if c not in df.columns:
+                if c in ['Rooms', 'Nights', 'Room_Revenue', 'Total_Revenue', 'Lead_Time']: df[c] = 0
+                else: df[c] = 'Unknown'
+
+        # plan 이 있으면 원본에 실제로 있는 숫자 컬럼만 변환 (없는 컬럼은 위에서 0 으로 채움)
+        for col in (plan['numeric'] if plan else ['Room_Revenue', 'Total_Revenue', 'Rooms', 'Nights', 'Lead_Time']):
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+        df['Total_Revenue'] = np.where(df['Total_Revenue'] == 0, df['Room_Revenue'], df['Total_Revenue'])
+        df['RN'] = df['Rooms'] * df['Nights'].replace(0, 1)
+        if 'Conf_No' in df.columns: df['Conf_No'] = conf_number(df['Conf_No'])
+
+    # 공통
+    df['Snapshot_Date'] = snapshot or datetime.now().strftime('%Y-%m-%d')
+    df['Status'] = status
+
+    df['CheckIn_dt'] = parse_dates(df['CheckIn'], date_formats.get('CheckIn'))
+    df['Booking_dt'] = parse_dates(df['Booking_Date'], date_formats.get('Booking_Date', date_formats.get('CheckIn')))
+    df.loc[df['Booking_dt'].isna(), 'Booking_dt'] = df.loc[df['Booking_dt'].isna(), 'CheckIn_dt']
+
+    df = df.dropna(subset=['CheckIn_dt'])
+
+    # 저장은 원본 사실만 (월/요일 등 파생 컬럼은 조회 시 schema.with_derived 로 계산)
+    # [지배인님 요청] 리드타임은 엑셀 값 그대로 사용
+    df['Lead_Time'] = df['Lead_Time'].fillna(0).astype(int)
+    df['Nat_Group'] = nat_group(df['Guest_Name'], df['Nat_Orig'])
+    df['CheckIn'] = format_dates(df['CheckIn_dt'], '%Y-%m-%d')
+    df['Booking_Date'] = format_dates(df['Booking_dt'], '%Y-%m-%d')
+
+    final_df = pd.DataFrame()
+    for c in FACT_COLUMNS:
+        final_df[c] = df[c] if c in df.columns else ''
+    return final_df
+
+def process_data(uploaded_file, status, sub_segment="General", registry=None):
+    try:
+        is_otb = is_otb_file(uploaded_file.name)
+
+        if uploaded_file.name.endswith('.csv'):
+            df_raw = pd.read_csv(uploaded_file, header=None)
+        else:
+            df_raw = pd.read_excel(uploaded_file, header=None)
+
+        header, plan, df_raw = split_header(df_raw, is_otb, registry)
+        if header is not None:
+            df_raw = df_raw.reset_index(drop=True)
+            df_raw.columns = header
+        return transform_frame(df_raw, status, sub_segment, is_otb, plan)
+
+    except Exception as e:
+        return pd.DataFrame()
+
+# ------------------------------------------------------------------------------
+# 스트리밍 읽기
+# ------------------------------------------------------------------------------
+def _iter_excel_chunks(uploaded_file, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        while True:
+            batch = list(islice(rows, chunk_rows))
+            if not batch:
+                break
+            yield pd.DataFrame(batch).replace({None: np.nan})
+    finally:
+        wb.close()
+
+def iter_raw_chunks(uploaded_file, chunk_rows=CHUNK_ROWS):
+    # header=None 상태의 원본 셀 프레임을 chunk_rows 행씩 반환
+    if uploaded_file.name.endswith('.csv'):
+        with pd.read_csv(uploaded_file, header=None, chunksize=chunk_rows) as reader:
+            yield from reader
+    else:
+        yield from _iter_excel_chunks(uploaded_file, chunk_rows)
+
+def iter_process(uploaded_file, status, sub_segment="General", chunk_rows=CHUNK_ROWS, registry=None, snapshot=None):
+    is_otb = is_otb_file(uploaded_file.name)
+    header = plan = None
+    for raw in iter_raw_chunks(uploaded_file, chunk_rows):
+        if header is None:
+            header, plan, raw = split_header(raw, is_otb, registry)
+            if header is None:
+                header = list(raw.columns)
+        if raw.empty:
+            continue
+        # 엑셀 행 길이가 들쭉날쭉할 수 있어 헤더 폭에 맞춤
+        raw = raw.reindex(columns=range(len(header))).reset_index(drop=True)
+        raw.columns = header
+        out = transform_frame(raw, status, sub_segment, is_otb, plan, snapshot)
+        if not out.empty:
+            yield out
+
+def _file_hash(uploaded_file, block=1 << 20):
+    h = hashlib.sha256()
+    uploaded_file.seek(0)
+    for b in iter(lambda: uploaded_file.read(block), b''):
+        h.update(b)
+    uploaded_file.seek(0)
+    return h.hexdigest()
+
+def ingest_file(store, ledger, uploaded_file, status, sub_segment="General", chunk_rows=CHUNK_ROWS, pickup=None):
+    # 청크마다 중복 제거 후 저장소에 바로 기록 (pickup 이 있으면 OTB 스냅샷 인덱스도 갱신)
+    # 반환: 신규 행 수 / 이미 반영된 파일이면 0 / 유효 데이터가 없으면 None
+    fhash = _file_hash(uploaded_file)
+    if ledger.has_file(fhash):
+        return 0
+    parsed, new = ingest_chunks(store, ledger, iter_process(uploaded_file, status, sub_segment, chunk_rows), pickup)
+    if not parsed:
+        return None
+    ledger.add_file(fhash, uploaded_file.name, new)
+    return new
+
+class _NamedBytes(io.BytesIO):
+    # 업로드 파일처럼 .name 을 가진 바이트 버퍼 (확장자로 CSV/엑셀 구분)
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+def parse_bytes(name, data, status, sub_segment="General", chunk_rows=CHUNK_ROWS, snapshot=None):
+    # 워커 프로세스에서 실행 (피클 가능한 인자만 받음). 유효 데이터가 없으면 빈 프레임
+    chunks = list(iter_process(_NamedBytes(data, name), status, sub_segment, chunk_rows, snapshot=snapshot))
+    if not chunks:
+        return pd.DataFrame(columns=FACT_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+def spool_bytes(name, data, spool_dir, status, sub_segment="General", chunk_rows=CHUNK_ROWS, snapshot=None):
+    # 워커 프로세스에서 실행: 변환된 청크를 spool_dir 에 하나씩 써 두고 경로 목록 반환
+    # (부모는 청크를 하나씩 읽어 기록 -> 파일이 커도 메모리는 청크 크기. 해시가 같도록 pickle 로 그대로 보관)
+    os.makedirs(spool_dir, exist_ok=True)
+    paths = []
+    for i, chunk in enumerate(iter_process(_NamedBytes(data, name), status, sub_segment, chunk_rows, snapshot=snapshot)):
+        path = os.path.join(spool_dir, f"{i:05d}.pkl")
+        chunk.to_pickle(path)
+        paths.append(path)
+    return paths
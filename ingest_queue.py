@@ -0,0 +1,169 @@
+import hashlib
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from bulk_writer import PartialWriteError, ingest_chunks
+from ingest import spool_bytes
+from perf import PERF
+from procpool import SpawnPool
+
+# ------------------------------------------------------------------------------
+# 백그라운드 업로드 큐 (여러 파일 병렬 파싱 -> 청크 단위 기록)
+# ------------------------------------------------------------------------------
+# - 파일 파싱/변환은 프로세스 풀에서 병렬 실행. 워커는 변환된 청크를 임시 파일로 넘김 (ingest.spool_bytes)
+# - 파싱이 끝난 파일부터 청크를 하나씩 읽어 중복 제거 -> 저장소/미러/픽업·취소 상계 인덱스에 기록
+#   (bulk_writer.ingest_chunks. 메모리는 파일/배치 크기와 무관하게 청크 크기)
+# - 전체 작업은 백그라운드 스레드에서 실행. 화면은 progress() 로 진행 상황만 조회
+# - 시트 미러 기록 실패는 배치를 멈추지 않음 (로컬 DB/장부는 기록됨). 미반영 행 수만 'mirror' 로 알림
+# PICKUP_INGEST_WORKERS=1 이면 프로세스 풀 없이 백그라운드 스레드에서 순서대로 파싱
+
+WORKERS = int(os.environ.get("PICKUP_INGEST_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+class IngestQueue:
+    def __init__(self, store, ledger, pickup=None, workers=WORKERS, netting=None):
+        self.store = store
+        self.ledger = ledger
+        self.pickup = pickup
+        self.netting = netting
+        self.workers = workers
+        self.pool = SpawnPool(workers)
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._batch = None
+        self.finished = 0  # 완료된 배치 수 (화면 새로고침 판단용)
+
+    # --- 제출 -----------------------------------------------------------------
+    def submit(self, files):
+        # files: [(파일명, 바이트, status, sub_segment[, 기준일]), ...]  기준일 생략 시 오늘
+        batch = {
+            'state': '대기',
+            'files': [{'name': n, 'data': d, 'status': st, 'sub_segment': sub, 'snapshot': rest[0] if rest else None,
+                       'hash': hashlib.sha256(d).hexdigest(), 'state': '대기', 'rows': 0, 'error': None}
+                      for n, d, st, sub, *rest in files],
+            'new': 0,
+            'error': None,
+            'mirror': None,
+        }
+        with self._lock:
+            self._jobs.put(batch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ingest-queue", daemon=True)
+                self._thread.start()
+        return batch
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._thread is not None
+
+    def wait(self, poll=0.2):
+        # 큐가 빌 때까지 대기 (CLI/배치 작업용)
+        while self.busy:
+            time.sleep(poll)
+
+    def close(self):
+        self.pool.close()
+
+    def progress(self):
+        # 화면 표시용 사본 (바이트 데이터 제외)
+        with self._lock:
+            b = self._batch
+            if b is None:
+                return None
+            files = [{k: f[k] for k in ('name', 'state', 'rows', 'error')} for f in b['files']]
+            done = sum(f['state'] in ('완료', '중복', '오류', '없음') for f in files)
+            return {'state': b['state'], 'files': files, 'done': done, 'total': len(files),
+                    'new': b['new'], 'error': b['error'], 'mirror': b['mirror'], 'queued': self._jobs.qsize()}
+
+    # --- 실행 -----------------------------------------------------------------
+    def _set(self, f, **kw):
+        with self._lock:
+            f.update(kw)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._jobs.empty():
+                    self._thread = None
+                    return
+                batch = self._jobs.get_nowait()
+                self._batch = batch
+            try:
+                self._process(batch)
+            except Exception as e:
+                self._set(batch, state='오류', error=str(e))
+            finally:
+                for f in batch['files']:
+                    f['data'] = None
+                with self._lock:
+                    self.finished += 1
+
+    def _process(self, batch):
+        files = batch['files']
+        todo = []
+        for f in files:
+            if self.ledger.has_file(f['hash']):
+                self._set(f, state='중복')
+            else:
+                todo.append(f)
+        if not todo:
+            self._set(batch, state='완료')
+            return
+        self._set(batch, state='파싱 중')
+        for f in todo:
+            self._set(f, state='파싱')
+        # 파싱이 끝난 파일부터 청크 단위로 기록 (나머지 파일은 그동안 워커에서 계속 파싱)
+        spool = tempfile.mkdtemp(prefix='pickup-ingest-')
+        jobs = {i: ((f['name'], f['data'], os.path.join(spool, str(i)), f['status'], f['sub_segment']),
+                    {'snapshot': f['snapshot']}) for i, f in enumerate(todo)}
+        try:
+            with PERF.timer('ingest.process', files=len(todo), workers=self.workers):
+                for i, paths, error in self.pool.run(spool_bytes, jobs):
+                    self._write_file(batch, todo[i], paths, error)
+        finally:
+            shutil.rmtree(spool, ignore_errors=True)
+        self._set(batch, state='오류' if batch['error'] else '완료')
+
+    def _write_file(self, batch, f, paths, error):
+        if error is not None:
+            self._set(f, state='오류', error=str(error))
+            return
+        if not paths:
+            self._set(f, state='없음', error='유효한 데이터가 없습니다.')
+            return
+        if batch['error'] is not None:
+            # 앞 파일의 저장소(시트 저장소) 기록이 실패하면 나머지는 기록하지 않음 (다시 반영하면 이어서 기록)
+            self._set(f, state='오류', error='앞 파일 기록 실패로 중단')
+            return
+        self._set(batch, state='기록 중')
+        self._set(f, state='기록')
+        # 행 해시의 순번은 파일별로 셈 (파일 안 동일 행은 유지). 같은 배치의 다른 파일과 겹치는 행은
+        # 앞 파일이 장부에 먼저 기록되므로 자동으로 제외
+        chunks = (pd.read_pickle(p) for p in paths)
+        try:
+            rows, new = ingest_chunks(self.store, self.ledger, chunks, self.pickup, self.netting)
+        except PartialWriteError as e:
+            self._set(batch, new=batch['new'] + e.written,
+                      error=(f"구글 시트 일부 미반영 ({e.written:,}행 기록). "
+                             "같은 파일을 다시 반영하면 남은 행만 이어서 기록됩니다."))
+            self._set(f, state='오류', error=str(e))
+            return
+        self.ledger.add_file(f['hash'], f['name'], new)
+        self._set(batch, new=batch['new'] + new, mirror=self._mirror_state())
+        self._set(f, rows=rows, state='완료')
+
+    def _mirror_state(self):
+        # 시트 미러가 있는 저장소(MirroredStore)에서 미러에 남은 행이 있으면 안내 문구
+        pending = getattr(self.store, 'pending', 0)
+        if not pending:
+            return None
+        return (f"구글 시트 미러 {pending:,}행 미반영 (로컬 DB 에는 반영됨: {self.store.mirror_error}). "
+                "다음 업로드 때 이어서 기록됩니다.")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from sheet_sync import CACHE_DIR
+
+# ------------------------------------------------------------------------------
+# 리포트 레이아웃 등록부 (헤더 행 해시 -> 컴파일된 파싱 계획)
+# ------------------------------------------------------------------------------
+# PMS 리포트는 매일 같은 양식으로 들어오므로, 처음 보는 양식만 키워드 탐색/날짜 형식
+# 추론을 하고 결과(plan)를 JSON 으로 저장. 다음부터는 plan 으로 바로 파싱.
+#
+# plan = {
+#   'kind': 'list' | 'otb',
+#   'columns': {열 위치: 표준 컬럼명},          # normalize_and_map_columns 결과 (리스트)
+#   'date_formats': {표준 컬럼명: strftime 형식 | None},
+#   'numeric': [표준 컬럼명, ...],
+#   'otb_date_col': 열 위치, 'otb_columns': {'RN': 위치, 'Room_Revenue': 위치},
+#   'subtotal': 정규식,
+#   'version': PLAN_VERSION,
+# }
+# 저장된 JSON 을 직접 고쳐서 OTB 열 위치 등을 조정할 수 있음.
+# 컬럼 매핑 규칙이 바뀌면 PLAN_VERSION 을 올림 -> 버전이 다른 plan 은 다시 컴파일
+
+PLAN_VERSION = 3  # 2: 확인번호(Conf_No) 열 매핑, 3: OTB ADR 열 제외 (ADR 은 조회 시 매출/RN)
+LAYOUTS_PATH = os.environ.get("PICKUP_LAYOUTS_PATH", os.path.join(CACHE_DIR, "layouts.json"))
+
+DATE_FORMATS = ['%Y-%m-%d', '%Y.%m.%d', '%Y/%m/%d', '%Y%m%d', '%Y-%m-%d %H:%M:%S',
+                '%Y-%m-%d %H:%M', '%Y.%m.%d %H:%M', '%m/%d/%Y', '%d/%m/%Y', '%d.%m.%Y']
+SUBTOTAL_PATTERN = '합계|Total|소계|Subtotal'
+OTB_OFFSETS = {'RN': -5, 'Room_Revenue': -1}
+NUMERIC_COLUMNS = ['Room_Revenue', 'Total_Revenue', 'Rooms', 'Nights', 'Lead_Time']
+TARGET_COLUMNS = ['Conf_No', 'CheckIn', 'Guest_Name', 'Booking_Date', 'Rooms', 'Nights', 'Room_Revenue',
+                  'Total_Revenue', 'Segment', 'Account', 'Room_Type', 'Nat_Orig', 'Lead_Time']
+
+
+def fingerprint(header, kind):
+    cells = [str(c).strip().lower() for c in header]
+    return hashlib.sha1((kind + '\x1e' + '\x1f'.join(cells)).encode('utf-8')).hexdigest()[:16]
+
+
+def infer_date_format(values, sample=200):
+    # 샘플 값이 모두 같은 형식이면 그 형식, 이미 datetime 이거나 불명확하면 None
+    s = pd.Series(values).dropna()
+    s = s[s.astype(str).str.strip() != ''].head(sample)
+    if s.empty or pd.api.types.is_datetime64_any_dtype(s) or all(isinstance(v, datetime) for v in s):
+        return None
+    s = s.astype(str).str.strip()
+    s = s[s.str.contains(r'\d')]  # 소계/합계 같은 라벨 행 제외
+    if s.empty:
+        return None
+    for fmt in DATE_FORMATS:
+        if pd.to_datetime(s, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+
+def compile_plan(header, sample, kind):
+    # header: 헤더 셀 목록, sample: 헤더 아래 원본 행들 (열 위치 기준)
+    from ingest import normalize_and_map_columns
+
+    plan = {'kind': kind, 'subtotal': SUBTOTAL_PATTERN, 'date_formats': {}, 'version': PLAN_VERSION}
+    sample = sample.reset_index(drop=True)
+    sample.columns = range(sample.shape[1])
+
+    if kind == 'otb':
+        width = len(header)
+        date_col = next((i for i, c in enumerate(header) if '일자' in str(c) or 'Date' in str(c)), 0)
+        plan['otb_date_col'] = date_col
+        plan['otb_columns'] = {k: width + off for k, off in OTB_OFFSETS.items() if width + off >= 0}
+        plan['date_formats']['CheckIn'] = infer_date_format(sample[date_col]) if date_col < sample.shape[1] else None
+        return plan
+
+    mapped = normalize_and_map_columns(pd.DataFrame(columns=header)).columns
+    plan['columns'] = {i: t for i, t in enumerate(mapped) if t in TARGET_COLUMNS}
+    plan['numeric'] = [t for t in plan['columns'].values() if t in NUMERIC_COLUMNS]
+    for pos, target in plan['columns'].items():
+        if target in ('CheckIn', 'Booking_Date') and pos < sample.shape[1]:
+            plan['date_formats'][target] = infer_date_format(sample[pos])
+    return plan
+
+
+def apply_columns(df_raw, plan):
+    # 키워드 탐색 없이 열 위치로 표준 컬럼명 적용
+    cols = list(df_raw.columns)
+    for pos, target in plan['columns'].items():
+        if pos < len(cols):
+            cols[pos] = target
+    out = df_raw.copy()
+    out.columns = cols
+    return out
+
+
+class LayoutRegistry:
+    def __init__(self, path=LAYOUTS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.plans = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                for fp, plan in json.load(f).items():
+                    self.plans[fp] = self._decode(plan)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _decode(plan):
+        # JSON 키는 문자열이므로 열 위치를 int 로 복원
+        if 'columns' in plan:
+            plan['columns'] = {int(k): v for k, v in plan['columns'].items()}
+        return plan
+
+    def _save(self):
+        # 병렬 파싱 워커(프로세스)가 각자 등록할 수 있으므로 디스크의 최신 목록과 합쳐서 저장
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for fp, plan in json.load(f).items():
+                    self.plans.setdefault(fp, self._decode(plan))
+        except (OSError, ValueError):
+            pass
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.plans, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def get(self, fp):
+        return self.plans.get(fp)
+
+    def resolve(self, header, sample, kind):
+        # 등록된 양식이면 저장된 plan, 아니면(또는 이전 버전 plan 이면) 새로 컴파일 후 등록
+        fp = fingerprint(header, kind)
+        plan = self.plans.get(fp)
+        if plan is None or plan.get('version') != PLAN_VERSION:
+            plan = compile_plan(header, sample, kind)
+            plan['header'] = [str(c) for c in header]
+            plan['created'] = datetime.now().strftime('%Y-%m-%d %H:%M')
+            with self._lock:
+                self.plans[fp] = plan
+                self._save()
+        return plan
+
+
+_default = None
+
+
+def get_registry():
+    global _default
+    if _default is None:
+        _default = LayoutRegistry()
+    return _default
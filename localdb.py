@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# ------------------------------------------------------------------------------
+# 로컬 SQLite 파일 공통 부분 (저장소 / 업로드 장부 / 픽업·취소 상계 인덱스)
+# ------------------------------------------------------------------------------
+# - 폴더 생성 + meta 테이블 (key -> 정수 값. 'version' 은 내용이 바뀔 때마다 +1)
+# - 스트림릿 세션(스레드)마다 접근하므로 호출 시점에 연결하고 바로 닫음
+# - 쓰기는 self._lock 으로 프로세스 안에서 직렬화 (프로세스 간은 SQLite 잠금 + timeout)
+# - 'built' : 저장소에서 구성하는 인덱스(픽업/취소 상계)가 구성을 마쳤는지. 비어 있어도 구성된 상태일 수 있으므로
+#             (OTB/리스트 행이 없는 저장소) 시작할 때 '비었는지'가 아니라 이 표시로 재구성 여부를 판단
+
+
+class LocalDB:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _bump(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def _meta(self, key, default=None):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set_meta(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    @property
+    def version(self):
+        return self._meta('version', 0)
+
+    @property
+    def built(self):
+        return self._meta('built', 0) == 1
+
+    def _set_built(self, conn, value):
+        self._set_meta(conn, 'built', int(value))
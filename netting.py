@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bulk_writer import Occurrences, row_hashes
+from localdb import LocalDB
+from schema import month_bounds, to_storage
+from sheet_sync import CACHE_DIR
+from transform import safe_ratio
+
+# ------------------------------------------------------------------------------
+# 취소 상계 엔진 (예약 키 인덱스: 취소 리스트 행을 원래 예약 행과 매칭)
+# ------------------------------------------------------------------------------
+# 예약 키 = 확인번호(Conf_No) 가 있으면 확인번호 해시. 취소 리스트가 취소 시점의 거래처/객실타입으로
+#   출력되어도 원래 예약과 매칭됨
+# 확인번호가 없는 행(해당 열이 없는 리스트/구 데이터) = (투숙객, 입실일, 거래처, 객실타입, RN) 해시
+#   (박수는 따로 저장하지 않으므로 RN = 객실수 x 박수 로 대신함)
+#   예약/취소 리스트 중 한쪽에만 확인번호가 있으면 서로 매칭되지 않음
+# - rows : 리스트 행 (업로드 장부와 같은 행 해시 -> 같은 파일/행을 다시 넣어도 결과 동일.
+#          해시에 파일 안 순번이 들어 있어 단체 예약처럼 내용이 같은 행도 각각 집계)
+# - res  : 예약 키별 집계 (예약 건수/RN/매출, 취소 건수/RN/매출). 새 행이 들어온 키만 다시 계산
+# 같은 키의 취소는 예약을 1건씩 상계 (취소 건수 > 예약 건수면 나머지는 예약 이력 없는 취소).
+# 순 OTB = 예약 - 상계된 취소. 조회는 키 집계 테이블 1회 스캔 (행 수에 선형).
+
+NETTING_INDEX_PATH = os.environ.get("PICKUP_NETTING_PATH", os.path.join(CACHE_DIR, "netting.db"))
+KEY_COLUMNS = ['Guest_Name', 'CheckIn', 'Account', 'Room_Type', 'RN']
+NET_DIMS = {'Stay_Month': "substr(stay, 1, 7)", 'Segment': "segment", 'Account': "account", 'Room_Type': "room_type"}
+
+
+def _normalize_name(s):
+    return s.astype(str).str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+
+
+def reservation_keys(df):
+    # df: 저장용 프레임 (to_storage). 반환: int64 예약 키
+    parts = df[KEY_COLUMNS].astype(str)
+    parts['Guest_Name'] = _normalize_name(df['Guest_Name'])
+    keys = pd.util.hash_pandas_object(parts, index=False).to_numpy()
+    if 'Conf_No' in df.columns:
+        conf = df['Conf_No'].fillna('').astype(str).str.strip()
+        has = (conf != '').to_numpy()
+        if has.any():
+            keys = np.where(has, pd.util.hash_pandas_object('#' + conf, index=False).to_numpy(), keys)
+    return keys.view(np.int64)
+
+
+class NettingIndex(LocalDB):
+    def __init__(self, path=NETTING_INDEX_PATH):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rows (hash INTEGER PRIMARY KEY, key INTEGER, status TEXT, stay TEXT, "
+                         "booked_on TEXT, segment TEXT, account TEXT, room_type TEXT, rn REAL, rev REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS rows_key ON rows (key)")
+            conn.execute("CREATE TABLE IF NOT EXISTS res (key INTEGER PRIMARY KEY, stay TEXT, segment TEXT, account TEXT, "
+                         "room_type TEXT, booked INTEGER, rn REAL, rev REAL, cancelled INTEGER, cn_rn REAL, cn_rev REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS res_stay ON res (stay)")
+            # 'built' 표시 이전에 만든 인덱스는 내용이 있으면 구성된 것으로 봄
+            if self._meta('built') is None and conn.execute("SELECT 1 FROM rows LIMIT 1").fetchone():
+                self._set_built(conn, True)
+
+    # --- 적재 -----------------------------------------------------------------
+    def add(self, df, hashes=None, occurrences=None):
+        # df: 팩트 프레임 (OTB 행은 무시). 반환: 다시 계산한 예약 키 수
+        # hashes: 업로드 장부의 행 해시 (생략하면 df 안에서 계산). 내용이 같은 행도 순번으로 구분되어 모두 집계
+        # occurrences: hashes 없이 청크로 나눠 넣을 때 청크 간에 이어서 셀 순번 (bulk_writer.Occurrences)
+        if df.empty:
+            return 0
+        is_list = (~df['Segment'].astype(str).str.startswith('OTB') & df['Status'].isin(['Booked', 'Cancelled'])).to_numpy()
+        lst = df[is_list]
+        if lst.empty:
+            return 0
+        fact = to_storage(lst)
+        rows = pd.DataFrame({
+            'hash': row_hashes(fact, occurrences) if hashes is None else np.asarray(hashes)[is_list],
+            'key': reservation_keys(fact),
+            'status': fact['Status'],
+            'stay': fact['CheckIn'],
+            'booked_on': fact['Booking_Date'],
+            'segment': fact['Segment'],
+            'account': fact['Account'],
+            'room_type': fact['Room_Type'],
+            'rn': fact['RN'].astype('float64'),
+            'rev': fact['Room_Revenue'],
+        })
+        keys = np.unique(rows['key'].to_numpy())
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             rows.astype(object).itertuples(index=False))
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched (key INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM touched")
+            conn.executemany("INSERT OR IGNORE INTO touched VALUES (?)", ((int(k),) for k in keys))
+            # 키 단위 재집계 (예약 행의 차원 우선, 예약이 없는 취소만 있으면 취소 행의 차원)
+            conn.execute("""
+                INSERT OR REPLACE INTO res
+                SELECT r.key, MIN(r.stay),
+                       COALESCE(MAX(CASE WHEN r.status = 'Booked' THEN r.segment END), MAX(r.segment)),
+                       MAX(r.account), MAX(r.room_type),
+                       SUM(r.status = 'Booked'),
+                       SUM(CASE WHEN r.status = 'Booked' THEN r.rn ELSE 0 END),
+                       SUM(CASE WHEN r.status = 'Booked' THEN r.rev ELSE 0 END),
+                       SUM(r.status = 'Cancelled'),
+                       SUM(CASE WHEN r.status = 'Cancelled' THEN r.rn ELSE 0 END),
+                       SUM(CASE WHEN r.status = 'Cancelled' THEN r.rev ELSE 0 END)
+                FROM rows r JOIN touched t ON r.key = t.key
+                GROUP BY r.key
+            """)
+            self._bump(conn)
+        return len(keys)
+
+    def rebuild(self, store):
+        # 저장소 전체에서 다시 만들기 (최초 1회). 이력은 청크로 나눠 읽고, 끝까지 마쳐야 built 표시
+        self.clear(built=False)
+        occurrences = Occurrences()
+        n = 0
+        for chunk in store.iter_read():
+            n += self.add(chunk, occurrences=occurrences)
+        with self._lock, self._connect() as conn:
+            self._set_built(conn, True)
+        return n
+
+    def clear(self, built=True):
+        # 저장소와 함께 비울 때는 built 유지 (빈 저장소와 일치)
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM rows")
+            conn.execute("DELETE FROM res")
+            self._set_built(conn, built)
+            self._bump(conn)
+
+    # --- 조회 -----------------------------------------------------------------
+    def net(self, by=('Stay_Month', 'Segment'), stay_range=None):
+        # 차원별 총 예약 / 상계된 취소 / 순 OTB (RN, 매출, ADR) + 예약 이력 없는 취소
+        # 같은 키에 예약이 여러 건이면 건당 평균 RN/매출로 상계
+        dims = [NET_DIMS[d] + f" AS {d}" for d in by]
+        where, params = [], []
+        if stay_range:
+            where.append("stay >= ? AND stay < ?"); params += list(month_bounds(stay_range))
+        sql = (
+            "SELECT " + ", ".join(dims + [
+                "SUM(booked) AS Bookings",
+                "SUM(MIN(cancelled, booked)) AS Cancellations",
+                "SUM(MAX(cancelled - booked, 0)) AS Unmatched_Cancellations",
+                "SUM(rn) AS Gross_RN",
+                "SUM(rev) AS Gross_Revenue",
+                "SUM(CASE WHEN booked > 0 THEN rn * MIN(cancelled, booked) / booked ELSE 0 END) AS Cancelled_RN",
+                "SUM(CASE WHEN booked > 0 THEN rev * MIN(cancelled, booked) / booked ELSE 0 END) AS Cancelled_Revenue",
+                "SUM(CASE WHEN cancelled > booked THEN cn_rn * (cancelled - booked) / cancelled ELSE 0 END) AS Unmatched_Cancel_RN",
+            ]) + " FROM res" + (" WHERE " + " AND ".join(where) if where else "")
+            + (" GROUP BY " + ", ".join(str(i + 1) for i in range(len(by))) + " ORDER BY " + ", ".join(str(i + 1) for i in range(len(by))) if by else "")
+        )
+        with self._connect() as conn:
+            out = pd.read_sql_query(sql, conn, params=params)
+        out = out.fillna({c: 0 for c in out.columns if c not in by})
+        out['Net_RN'] = out['Gross_RN'] - out['Cancelled_RN']
+        out['Net_Revenue'] = out['Gross_Revenue'] - out['Cancelled_Revenue']
+        out['Net_ADR'] = safe_ratio(out['Net_Revenue'], out['Net_RN'])
+        out['Cancel_Rate'] = (safe_ratio(out['Cancelled_RN'], out['Gross_RN']) * 100).round(1)
+        return out
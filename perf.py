@@ -0,0 +1,181 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+# ------------------------------------------------------------------------------
+# 성능 계측 (단계별 시간 / 구글 시트 API 호출·재시도·바이트 / 캐시 적중)
+# ------------------------------------------------------------------------------
+# - timer(단계) / @timed(단계): 구간 소요 시간.  count(이름, n): 카운터.  cache(이름, hit): 캐시 적중/실패
+# - watch_client(client): gspread HTTP 요청마다 시간, 상태 코드, 송수신 바이트 기록
+# - 화면 1회 실행 단위로 묶음: begin_run() 을 부른 스레드의 이후 이벤트에 같은 run id
+# - 최근 이벤트는 메모리(사이드바 진단 패널), 전체는 JSON Lines 로그 파일(회전)에 기록
+# PICKUP_PERF_LOG: 로그 경로 (0 이면 파일 로그 끔)
+
+PERF_LOG_PATH = os.environ.get("PICKUP_PERF_LOG", os.path.join(os.environ.get("PICKUP_CACHE_DIR", ".pickup_cache"), "perf.jsonl"))
+PERF_KEEP = 5000  # 메모리에 보관할 최근 이벤트 수
+PERF_LOG_MAX_MB = 5
+
+
+def _payload_bytes(kwargs):
+    data = kwargs.get('data')
+    if data is None and kwargs.get('json') is not None:
+        data = json.dumps(kwargs['json'], ensure_ascii=False, default=str)
+    if data is None:
+        return 0
+    return len(data.encode('utf-8') if isinstance(data, str) else data)
+
+
+class Perf:
+    def __init__(self, log_path=PERF_LOG_PATH, keep=PERF_KEEP):
+        self.events = deque(maxlen=keep)
+        self.stats = {}     # 단계 -> [횟수, 합계 초, 최대 초] (프로세스 누적)
+        self.counters = {}  # 이름 -> 누적 값
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._runs = itertools.count(1)
+        self.log = None
+        if log_path and log_path != "0":
+            d = os.path.dirname(log_path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self.log = logging.getLogger(f"pickup.perf.{log_path}")
+            self.log.propagate = False
+            self.log.setLevel(logging.INFO)
+            if not self.log.handlers:
+                handler = RotatingFileHandler(log_path, maxBytes=PERF_LOG_MAX_MB * 2 ** 20, backupCount=3, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self.log.addHandler(handler)
+
+    # --- 실행 단위 ------------------------------------------------------------
+    def begin_run(self, label=""):
+        run = next(self._runs)
+        self._local.run = run
+        self._local.depth = 0
+        self._local.started = time.perf_counter()
+        self._record({'kind': 'run', 'name': label or 'run'})
+        return run
+
+    @property
+    def current_run(self):
+        return getattr(self._local, 'run', None)
+
+    def elapsed(self):
+        # 이번 실행 시작 이후 경과 초 (begin_run 을 부른 스레드 기준)
+        started = getattr(self._local, 'started', None)
+        return None if started is None else time.perf_counter() - started
+
+    # --- 기록 -----------------------------------------------------------------
+    def _record(self, event):
+        event = {'ts': round(time.time(), 3), 'run': self.current_run, 'thread': threading.current_thread().name, **event}
+        with self._lock:
+            self.events.append(event)
+            if event['kind'] in ('time', 'api'):
+                s = self.stats.setdefault(event['name'], [0, 0.0, 0.0])
+                s[0] += 1
+                s[1] += event['seconds']
+                s[2] = max(s[2], event['seconds'])
+            elif event['kind'] == 'count':
+                self.counters[event['name']] = self.counters.get(event['name'], 0) + event['value']
+        if self.log is not None:
+            self.log.info(json.dumps(event, ensure_ascii=False, default=str))
+
+    @contextmanager
+    def timer(self, stage, **fields):
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        t = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._local.depth = depth
+            event = {'kind': 'time', 'name': stage, 'seconds': round(time.perf_counter() - t, 6), 'depth': depth, **fields}
+            if error:
+                event['error'] = error
+            self._record(event)
+
+    def timed(self, stage):
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def count(self, name, n=1, **fields):
+        self._record({'kind': 'count', 'name': name, 'value': n, **fields})
+
+    def cache(self, name, hit):
+        self.count(f"cache.{name}.{'hit' if hit else 'miss'}")
+
+    # --- 구글 시트 API --------------------------------------------------------
+    def watch_client(self, client):
+        # gspread 6: client.http_client.request 를 감쌈 (시트/워크시트의 모든 요청이 여기를 지남)
+        http = getattr(client, 'http_client', None)
+        if http is None or not hasattr(http, 'request') or getattr(http, '_perf_watched', False):
+            return client
+        request = http.request
+
+        def watched(method, endpoint, *args, **kwargs):
+            t = time.perf_counter()
+            status, received = None, 0
+            try:
+                response = request(method, endpoint, *args, **kwargs)
+                status, received = response.status_code, len(response.content or b'')
+                return response
+            except Exception as e:
+                # gspread APIError (응답 객체 포함)
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                raise
+            finally:
+                sent = _payload_bytes(kwargs)
+                self._record({'kind': 'api', 'name': f"sheets.{method.lower()}", 'seconds': round(time.perf_counter() - t, 6),
+                              'depth': getattr(self._local, 'depth', 0), 'status': status, 'sent': sent, 'received': received})
+                self.count('sheets.calls')
+                self.count('sheets.bytes_in', received)
+                self.count('sheets.bytes_out', sent)
+                if status == 429:
+                    self.count('sheets.429')
+
+        http.request = watched
+        http._perf_watched = True
+        return client
+
+    # --- 조회 -----------------------------------------------------------------
+    def run_events(self, run):
+        with self._lock:
+            return [e for e in self.events if e['run'] == run]
+
+    def run_counters(self, run):
+        out = {}
+        for e in self.run_events(run):
+            if e['kind'] == 'count':
+                out[e['name']] = out.get(e['name'], 0) + e['value']
+        return out
+
+    def summary(self):
+        with self._lock:
+            rows = [(name, n, total, total / n * 1000, mx * 1000) for name, (n, total, mx) in self.stats.items()]
+        return pd.DataFrame(rows, columns=['Stage', 'Calls', 'Total_s', 'Mean_ms', 'Max_ms']).sort_values('Total_s', ascending=False)
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.stats.clear()
+            self.counters.clear()
+
+
+PERF = Perf()
@@ -0,0 +1,204 @@
+import os
+
+import pandas as pd
+
+from localdb import LocalDB
+from schema import month_bounds
+from sheet_sync import CACHE_DIR
+from transform import safe_ratio
+
+# ------------------------------------------------------------------------------
+# 픽업 엔진 (OTB 스냅샷 인덱스: Snapshot_Date x 입실일 x 세그먼트)
+# ------------------------------------------------------------------------------
+# - otb    : 스냅샷별 온더북 잔량 (같은 스냅샷을 다시 올리면 그 스냅샷의 입실일 전체를 새 파일 값으로 교체)
+# - pickup : 스냅샷과 직전 스냅샷(같은 세그먼트)의 입실일별 차이
+# 새 스냅샷이 들어오면 그 스냅샷(과 바로 다음 스냅샷)의 차이만 다시 계산.
+# 두 스냅샷 간 픽업 = 잔량 차이, 최근 N일 픽업 = 기간 안 스냅샷들의 차이 합계.
+# 차이는 두 스냅샷의 입실일 범위가 겹치는 구간만 계산 (OTB 는 리포트 날짜부터 내보내므로
+# 한쪽 범위 밖 입실일은 '없음'이지 0 이 아님 -> 이미 지난 입실일이 음수 픽업이 되지 않도록).
+
+PICKUP_INDEX_PATH = os.environ.get("PICKUP_INDEX_PATH", os.path.join(CACHE_DIR, "pickup_index.db"))
+WINDOWS = [1, 7, 30]
+
+
+def _day(values):
+    # datetime / 문자열 모두 'YYYY-MM-DD' 로
+    return pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d')
+
+
+def _with_adr(df):
+    df['ADR'] = safe_ratio(df['Room_Revenue'], df['RN'])
+    return df
+
+
+class PickupIndex(LocalDB):
+    def __init__(self, path=PICKUP_INDEX_PATH):
+        super().__init__(path)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS otb (snapshot TEXT, stay TEXT, segment TEXT, rn REAL, rev REAL, "
+                         "PRIMARY KEY (segment, snapshot, stay))")
+            conn.execute("CREATE TABLE IF NOT EXISTS pickup (snapshot TEXT, prev TEXT, stay TEXT, segment TEXT, rn REAL, rev REAL, "
+                         "PRIMARY KEY (segment, snapshot, stay))")
+            # 'built' 표시 이전에 만든 인덱스는 내용이 있으면 구성된 것으로 봄
+            if self._meta('built') is None and conn.execute("SELECT 1 FROM otb LIMIT 1").fetchone():
+                self._set_built(conn, True)
+
+    # --- 적재 -----------------------------------------------------------------
+    def add(self, df, loaded=None):
+        # df: 팩트 프레임 (OTB 가 아닌 행은 무시). 반환: 갱신된 (스냅샷, 세그먼트) 수
+        # 이미 있는 (세그먼트, 스냅샷)은 기존 입실일을 지우고 새 값으로 교체 (다시 올린 리포트에서 빠진 입실일 제거)
+        # loaded: 한 파일을 청크로 나눠 넣을 때 청크 간에 공유하는 set (이 적재에서 이미 교체한 키는 지우지 않음)
+        loaded = set() if loaded is None else loaded
+        if df.empty:
+            return 0
+        otb = df[df['Segment'].astype(str).str.startswith('OTB')]
+        if otb.empty:
+            return 0
+        pos = pd.DataFrame({
+            'snapshot': _day(otb['Snapshot_Date']),
+            'stay': _day(otb['CheckIn']),
+            'segment': otb['Segment'].astype(str),
+            'rn': pd.to_numeric(otb['RN'], errors='coerce').fillna(0),
+            'rev': pd.to_numeric(otb['Room_Revenue'], errors='coerce').fillna(0),
+        }).dropna(subset=['snapshot', 'stay'])
+        # 같은 (스냅샷, 입실일, 세그먼트)가 여러 번 있으면 마지막 값이 현재 잔량
+        pos = pos.drop_duplicates(['snapshot', 'stay', 'segment'], keep='last')
+        keys = list(pos[['segment', 'snapshot']].drop_duplicates().itertuples(index=False, name=None))
+        stale = [k for k in keys if k not in loaded]
+        loaded.update(keys)
+        with self._lock, self._connect() as conn:
+            conn.executemany("DELETE FROM otb WHERE segment = ? AND snapshot = ?", stale)
+            conn.executemany("INSERT OR REPLACE INTO otb VALUES (?, ?, ?, ?, ?)",
+                             pos[['snapshot', 'stay', 'segment', 'rn', 'rev']].itertuples(index=False))
+            n = 0
+            for segment, snapshot in keys:
+                self._refresh_delta(conn, segment, snapshot)
+                nxt = conn.execute("SELECT MIN(snapshot) FROM otb WHERE segment = ? AND snapshot > ?",
+                                   (segment, snapshot)).fetchone()[0]
+                if nxt:
+                    self._refresh_delta(conn, segment, nxt)
+                n += 1
+            self._bump(conn)
+        return n
+
+    @staticmethod
+    def _horizons(conn, snapshots, segment=None):
+        # 세그먼트별 스냅샷 입실일 범위의 겹치는 구간 -> {segment: (lo, hi)}
+        marks = ", ".join("?" * len(snapshots))
+        where, params = f"snapshot IN ({marks})", list(snapshots)
+        if segment:
+            where += " AND segment = ?"; params.append(segment)
+        rows = conn.execute(f"SELECT segment, MAX(lo), MIN(hi) FROM (SELECT segment, MIN(stay) AS lo, MAX(stay) AS hi "
+                            f"FROM otb WHERE {where} GROUP BY segment, snapshot) GROUP BY segment", params).fetchall()
+        return {seg: (lo, hi) for seg, lo, hi in rows}
+
+    def _refresh_delta(self, conn, segment, snapshot):
+        prev = conn.execute("SELECT MAX(snapshot) FROM otb WHERE segment = ? AND snapshot < ?",
+                            (segment, snapshot)).fetchone()[0]
+        conn.execute("DELETE FROM pickup WHERE segment = ? AND snapshot = ?", (segment, snapshot))
+        # 첫 스냅샷(prev 없음)은 자기 범위 전체
+        lo, hi = self._horizons(conn, [snapshot, prev] if prev else [snapshot], segment).get(segment, (None, None))
+        if lo is None:
+            return
+        conn.execute("""
+            INSERT INTO pickup
+            SELECT ?, ?, stay, ?, SUM(rn), SUM(rev) FROM (
+                SELECT stay, rn, rev FROM otb WHERE segment = ? AND snapshot = ?
+                UNION ALL
+                SELECT stay, -rn, -rev FROM otb WHERE segment = ? AND snapshot = ?
+            ) WHERE stay BETWEEN ? AND ? GROUP BY stay
+        """, (snapshot, prev, segment, segment, snapshot, segment, prev, lo, hi))
+
+    def rebuild(self, store):
+        # 저장소 전체에서 다시 만들기 (최초 1회). 이력은 청크로 나눠 읽고, 끝까지 마쳐야 built 표시
+        self.clear(built=False)
+        loaded = set()
+        n = 0
+        for chunk in store.iter_read():
+            n += self.add(chunk, loaded)
+        with self._lock, self._connect() as conn:
+            self._set_built(conn, True)
+        return n
+
+    def clear(self, built=True):
+        # 저장소와 함께 비울 때는 built 유지 (빈 저장소와 일치)
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM otb")
+            conn.execute("DELETE FROM pickup")
+            self._set_built(conn, built)
+            self._bump(conn)
+
+    # --- 조회 -----------------------------------------------------------------
+    def _query(self, sql, params):
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    @staticmethod
+    def _where(segment, stay_range):
+        where, params = [], []
+        if segment:
+            where.append("segment = ?"); params.append(segment)
+        if stay_range:
+            where.append("stay >= ? AND stay < ?"); params += list(month_bounds(stay_range))
+        return where, params
+
+    def segments(self):
+        return list(self._query("SELECT DISTINCT segment FROM otb ORDER BY 1", [])['segment'])
+
+    def snapshots(self, segment=None):
+        where, params = self._where(segment, None)
+        sql = "SELECT DISTINCT snapshot FROM otb" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY 1"
+        return list(self._query(sql, params)['snapshot'])
+
+    def otb(self, snapshot, segment=None, stay_range=None):
+        where, params = self._where(segment, stay_range)
+        where.append("snapshot = ?"); params.append(snapshot)
+        df = self._query("SELECT stay AS Stay_Date, segment AS Segment, rn AS RN, rev AS Room_Revenue FROM otb WHERE "
+                         + " AND ".join(where), params)
+        df['Stay_Date'] = pd.to_datetime(df['Stay_Date'])
+        return _with_adr(df)
+
+    def between(self, start, end, segment=None, stay_range=None):
+        # start 스냅샷 -> end 스냅샷 입실일별 픽업 (RN/매출 차이, 픽업 ADR, ADR 변화)
+        # 두 스냅샷 범위가 겹치는 입실일만 (한쪽 범위 밖은 잔량 0 이 아니라 데이터 없음)
+        a = self.otb(start, segment, stay_range)
+        b = self.otb(end, segment, stay_range)
+        with self._connect() as conn:
+            horizons = self._horizons(conn, [start, end], segment)
+        m = b.merge(a, on=['Stay_Date', 'Segment'], how='outer', suffixes=('', '_prev')).fillna(0)
+        bounds = pd.DataFrame([(seg, lo, hi) for seg, (lo, hi) in horizons.items()], columns=['Segment', 'lo', 'hi'])
+        m = m.merge(bounds, on='Segment')
+        m = m[(m['Stay_Date'] >= pd.to_datetime(m['lo'])) & (m['Stay_Date'] <= pd.to_datetime(m['hi']))]
+        out = pd.DataFrame({
+            'Stay_Date': m['Stay_Date'],
+            'Segment': m['Segment'],
+            'RN': m['RN'] - m['RN_prev'],
+            'Room_Revenue': m['Room_Revenue'] - m['Room_Revenue_prev'],
+            'ADR_Change': m['ADR'] - m['ADR_prev'],
+        })
+        out = _with_adr(out)
+        return out.sort_values(['Segment', 'Stay_Date']).reset_index(drop=True)
+
+    def rolling(self, asof=None, windows=WINDOWS, segment=None, stay_range=None):
+        # 최근 N일 픽업 = (asof-N, asof] 안 스냅샷들의 직전 대비 차이 합계
+        #              (각 차이는 인접 두 스냅샷 범위가 겹치는 입실일만)
+        # 첫 스냅샷(직전 없음)은 픽업이 아니므로 제외
+        if asof is None:
+            snaps = self.snapshots(segment)
+            if not snaps:
+                return pd.DataFrame(columns=['Window', 'Stay_Date', 'Segment', 'RN', 'Room_Revenue', 'ADR'])
+            asof = snaps[-1]
+        end = pd.Timestamp(asof)
+        frames = []
+        for n in windows:
+            where, params = self._where(segment, stay_range)
+            where += ["snapshot > ?", "snapshot <= ?", "prev IS NOT NULL"]
+            params += [(end - pd.Timedelta(days=n)).strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')]
+            df = self._query("SELECT stay AS Stay_Date, segment AS Segment, SUM(rn) AS RN, SUM(rev) AS Room_Revenue "
+                             "FROM pickup WHERE " + " AND ".join(where) + " GROUP BY stay, segment", params)
+            df.insert(0, 'Window', f'{n}일')
+            frames.append(df)
+        out = pd.concat(frames, ignore_index=True)
+        out['Stay_Date'] = pd.to_datetime(out['Stay_Date'])
+        return _with_adr(out)
+
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from cube import build_cube, slice_cube
+from perf import PERF
+from schema import with_derived
+from sheet_sync import api_status
+
+# ------------------------------------------------------------------------------
+# 화면용 준비 데이터 캐시 (데이터 버전당 1회 계산, 모든 세션이 공유)
+# ------------------------------------------------------------------------------
+# 키 = (저장소 버전, 조회 기간). 업로드/삭제 시 저장소 버전이 올라가므로 자동으로 새로 계산.
+# 버전이 외부 변경까지 바로 반영하지 못하는 저장소(exact_version 이 아닌 시트 저장소)만 TTL 이 지나면 새로 계산.
+# 보관 한도는 메모리 크기 기준 (가장 오래 안 쓴 항목부터 제거). 최신 항목 1개는 항상 유지.
+# 공유 객체이므로 꺼내 쓴 프레임은 수정하지 말 것 (필요하면 복사 후 사용).
+
+PREPARED_MAX_MB = int(os.environ.get("PICKUP_PREPARED_MAX_MB", 512))
+PREPARED_TTL = 600  # 초. 시트 저장소처럼 외부 변경이 버전에 바로 안 잡히는 경우만 적용
+
+DERIVED_COLUMNS = ['CheckIn_dt', 'Booking_dt', 'Stay_Month', 'Booking_Month', 'Is_Zero_Rate', 'Day_Type']
+
+
+def frame_bytes(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    return 0
+
+
+class Prepared:
+    # df: 파생 컬럼 포함 전체 / 분리 프레임 / 큐브 조각
+    # ttl: 만료 시간(초). None 이면 버전이 바뀔 때까지 유지
+    def __init__(self, version, stay_range, df, ttl=None):
+        self.version = version
+        self.stay_range = stay_range
+        self.ttl = ttl
+        self.df = df
+        if df.empty:
+            self.cube = pd.DataFrame()
+            self.otb_month = self.otb_total = self.df_list = self.zero_bk = df
+            self.cube_paid_bk = self.cube_list_cn = self.cube_total_paid = self.cube
+        else:
+            is_otb = df['Segment'].astype(str).str.startswith('OTB')
+            self.otb_month = df[df['Segment'] == 'OTB_Month']
+            self.otb_total = df[df['Segment'] == 'OTB_Total']
+            self.df_list = df[~is_otb]
+            self.zero_bk = self.df_list[(self.df_list['Status'] == 'Booked') & self.df_list['Is_Zero_Rate']]
+            self.cube = build_cube(df)
+            self.cube_paid_bk = slice_cube(self.cube, status='Booked', zero_rate=False)
+            self.cube_list_cn = slice_cube(self.cube, status='Cancelled')
+            self.cube_total_paid = pd.concat([self.cube_paid_bk, self.cube_list_cn])
+        self.created = time.monotonic()
+        # 분리 프레임은 df 의 부분 복사본이라 각각 계산
+        self.nbytes = sum(frame_bytes(v) for v in vars(self).values())
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+
+def read_with_retry(store, stay_range=None, max_retries=5, sleep=time.sleep):
+    for i in range(max_retries):
+        try:
+            return store.read_filtered(stay_range=stay_range)
+        except Exception as e:
+            if api_status(e) == 429 and i < max_retries - 1:
+                PERF.count('sheets.retry', stage='read')
+                with PERF.timer('sheets.backoff'):
+                    sleep((2 ** i) + 1)
+                continue
+            raise
+
+
+class PreparedCache:
+    def __init__(self, max_bytes=PREPARED_MAX_MB * 2 ** 20, ttl=PREPARED_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}  # 키별 계산 잠금 (여러 세션이 같은 버전을 동시에 요청해도 1회만 계산)
+
+    @property
+    def nbytes(self):
+        return sum(e.nbytes for e in self.entries.values())
+
+    def get(self, store, stay_range=None):
+        version = store.version
+        key = (version, stay_range)
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                PERF.cache('prepared', hit=True)
+                return entry
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                entry = self._fresh(key)
+            PERF.cache('prepared', hit=entry is not None)
+            if entry is None:
+                with PERF.timer('prepared.read'):
+                    df = read_with_retry(store, stay_range)
+                with PERF.timer('prepared.derive'):
+                    df = with_derived(df, DERIVED_COLUMNS)
+                with PERF.timer('prepared.build', rows=len(df)):
+                    entry = Prepared(version, stay_range, df, None if getattr(store, 'exact_version', False) else self.ttl)
+                with self._lock:
+                    self.entries[key] = entry
+                    self._evict()
+        with self._lock:
+            self._building.pop(key, None)
+        return entry
+
+    def _fresh(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.ttl is not None and time.monotonic() - entry.created > entry.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _evict(self):
+        while len(self.entries) > 1 and self.nbytes > self.max_bytes:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
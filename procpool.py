@@ -0,0 +1,62 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# ------------------------------------------------------------------------------
+# 작업용 프로세스 풀 (업로드 파싱 / 리포트 차트 렌더링)
+# ------------------------------------------------------------------------------
+# - 스트림릿 서버는 스레드가 많으므로 fork 대신 spawn. 풀은 처음 쓸 때 만들고 계속 재사용
+# - workers <= 1 이면 풀 없이 호출한 스레드에서 순서대로 실행
+# - 워커 프로세스가 죽으면(BrokenProcessPool) 풀을 버리고(다음 작업 때 새로 생성) 남은 작업은 여기서 실행
+
+
+class SpawnPool:
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _call(fn, args, kwargs):
+        try:
+            return fn(*args, **kwargs), None
+        except Exception as e:
+            return None, e
+
+    def run(self, fn, jobs):
+        # jobs: {키: (args, kwargs)} -> 끝난 순서대로 (키, 결과, 예외) 반환
+        if self.workers <= 1:
+            for key, (args, kwargs) in jobs.items():
+                yield (key, *self._call(fn, args, kwargs))
+            return
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            pool = self._pool
+        futures = {pool.submit(fn, *args, **kwargs): key for key, (args, kwargs) in jobs.items()}
+        broken = []
+        for fut in as_completed(futures):
+            key = futures[fut]
+            try:
+                result = fut.result()
+            except BrokenProcessPool:
+                broken.append(key)
+                continue
+            except Exception as e:
+                yield key, None, e
+                continue
+            yield key, result, None
+        if broken:
+            with self._lock:
+                if self._pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+            for key in broken:
+                yield (key, *self._call(fn, *jobs[key]))
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -0,0 +1,423 @@
+import base64
+import hashlib
+import html
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from datetime import datetime
+
+import pandas as pd
+
+from cube import budget_vs_actual, lead_rollup, pacing_matrix, rollup
+from perf import PERF
+from procpool import SpawnPool
+from sheet_sync import CACHE_DIR
+
+# ------------------------------------------------------------------------------
+# 정적 GM 리포트 (Excel 통합 문서 + PDF / HTML 묶음, 데이터 내용별 캐시)
+# ------------------------------------------------------------------------------
+# - 섹션: Executive Summary / 세그먼트 / Pacing / 거래처 / 리드타임 (유료 예약 큐브, 화면과 같은 집계)
+# - 차트는 matplotlib PNG 로 렌더링 -> 프로세스 풀에서 병렬 (PICKUP_REPORT_WORKERS=1 이면 순서대로)
+# - 캐시 키 = 유료 예약 큐브 + 예산 + 조회 기간의 내용 해시 -> 업로드로 데이터가 바뀔 때만 새로 생성
+#   같은 키면 디스크의 파일을 그대로 반환 (화면/CLI 공용, 프로세스 재시작 후에도 유지)
+# - 임시 폴더에 모두 쓴 뒤 이름을 바꿔 공개 (만들다 만 리포트는 보이지 않음). 최근 REPORT_KEEP 개만 보관
+# matplotlib 은 리포트를 만들 때만 import (화면/CLI 시작 시간에 영향 없음)
+
+REPORT_DIR = os.environ.get("PICKUP_REPORT_DIR", os.path.join(CACHE_DIR, "reports"))
+REPORT_WORKERS = int(os.environ.get("PICKUP_REPORT_WORKERS", min(4, os.cpu_count() or 1)))
+REPORT_KEEP = 8
+REPORT_FILES = {'xlsx': "gm_report.xlsx", 'pdf': "gm_report.pdf", 'html': "gm_report.html"}
+REPORT_TITLE = "앰버 호텔 경영 리포트"
+FONT_CANDIDATES = ['Malgun Gothic', 'AppleGothic', 'NanumGothic', 'NanumBarunGothic', 'Noto Sans CJK KR', 'Noto Sans KR']
+TOP_ACCOUNTS = 15
+PDF_TABLE_ROWS = 30   # PDF 표는 앞부분만 (전체는 Excel)
+PDF_TABLE_COLS = 12   # 이보다 넓은 표(Pacing 행렬)는 PDF 에서 차트로만
+HTML_TABLE_ROWS = 500
+STALE_TMP_SECONDS = 3600
+
+
+def default_stay_range(months, now=None):
+    # 화면 기본 조회 기간: 최근 12개월 ~ 마지막 입실월
+    if not months:
+        return None
+    lo = (pd.Timestamp(now) if now else pd.Timestamp.now()) - pd.DateOffset(months=12)
+    lo = lo.strftime('%Y-%m')
+    return (next((m for m in months if m >= lo), months[0]), months[-1])
+
+
+def _frame_digest(df):
+    df = df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    return int(pd.util.hash_pandas_object(df, index=False).sum()) & (2 ** 64 - 1)
+
+
+def report_key(cube, budget=None, stay_range=None):
+    parts = [str(len(cube)), f"{_frame_digest(cube):016x}", repr(stay_range)]
+    if budget is not None and not budget.empty:
+        parts.append(f"{_frame_digest(budget):016x}")
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:20]
+
+
+# --- 섹션 구성 (표 + 차트 사양) --------------------------------------------------
+def _plain(df):
+    # 범주형 -> 문자열 (워커 전달/엑셀 기록용)
+    return df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+
+def _matrix(cube, metric):
+    m = pacing_matrix(cube, metric)
+    m.index = m.index.astype(str)
+    m.columns = m.columns.astype(str)
+    return m
+
+
+def report_sections(cube, budget=None):
+    # [{'title', 'sheet', 'tables': [(이름, 프레임)], 'charts': [(이름, 종류, 제목, 프레임, 옵션)]}]
+    totals = cube[['RN', 'Room_Revenue']].sum()
+    kpi = pd.DataFrame([{'RN': totals['RN'], 'Room_Revenue': totals['Room_Revenue'],
+                         'ADR': totals['Room_Revenue'] / totals['RN'] if totals['RN'] else 0}])
+    velocity = _plain(rollup(cube, ['Booking_Month'], with_adr=False).sort_values('Booking_Month').tail(12))
+    top = rollup(cube, ['Account']).sort_values('Room_Revenue', ascending=False)
+    summary = {'title': "Executive Summary", 'sheet': "Summary",
+               'tables': [("KPI", kpi), ("Booking Velocity", velocity), ("Top 5 Accounts", _plain(top.head(5)))],
+               'charts': [("velocity_rn", 'line', "Monthly Bookings Created (RN)", velocity, {'x': 'Booking_Month', 'y': 'RN'}),
+                          ("velocity_rev", 'bar', "Monthly Bookings Created (Revenue)", velocity, {'x': 'Booking_Month', 'y': 'Room_Revenue'})]}
+    if budget is not None and not budget.empty:
+        bva = budget_vs_actual(cube, budget)
+        summary['tables'].append(("Budget vs Actual", bva))
+        summary['charts'].append(("budget", 'budget', "Budget vs Actual (Room Revenue)", bva, {}))
+
+    seg = _plain(rollup(cube, ['Segment']).sort_values('Room_Revenue', ascending=False))
+    segment = {'title': "Segment", 'sheet': "Segment",
+               'tables': [("Segment", seg),
+                          ("Segment x Month", _plain(rollup(cube, ['Segment', 'Stay_Month']).sort_values(['Stay_Month', 'Segment'])))],
+               'charts': [("seg_share", 'pie', "Revenue Share by Segment", seg, {'x': 'Segment', 'y': 'Room_Revenue'}),
+                          ("seg_adr", 'bar', "ADR by Segment", seg, {'x': 'Segment', 'y': 'ADR'})]}
+
+    mats = {m: _matrix(cube, m) for m in ('RN', 'Room_Revenue', 'ADR')}
+    pacing = {'title': "Pacing (Booking Month x Stay Month)", 'sheet': "Pacing",
+              'tables': [(f"Pacing {m}", mat.reset_index()) for m, mat in mats.items()],
+              'charts': [("pacing_rn", 'heatmap', "Booking Pattern (RN)", mats['RN'], {'fmt': "{:,.0f}"}),
+                         ("pacing_adr", 'heatmap', "Booking Pattern (ADR)", mats['ADR'], {'fmt': "{:,.0f}"})]}
+
+    acc = _plain(top.sort_values('RN', ascending=False))
+    account = {'title': "Account", 'sheet': "Account",
+               'tables': [("Account", acc)],
+               'charts': [("acc_top", 'barh', f"Top {TOP_ACCOUNTS} Accounts (Revenue)", _plain(top.head(TOP_ACCOUNTS)),
+                           {'x': 'Account', 'y': 'Room_Revenue'})]}
+
+    lead = _plain(lead_rollup(cube))
+    lead_time = {'title': "Lead Time", 'sheet': "Lead_Time",
+                 'tables': [("Lead Time", lead)],
+                 'charts': [("lead", 'bar_line', "RN vs ADR by Lead Time", lead, {'x': 'Lead_Group', 'y': 'RN', 'y2': 'ADR'})]}
+    return [summary, segment, pacing, account, lead_time]
+
+
+# --- 차트 렌더링 (워커 프로세스에서 실행) ----------------------------------------
+def _setup_matplotlib():
+    import matplotlib
+
+    matplotlib.use('Agg')
+    from matplotlib import font_manager, rcParams
+
+    names = {f.name for f in font_manager.fontManager.ttflist}
+    font = next((f for f in FONT_CANDIDATES if f in names), None)
+    if font:
+        rcParams['font.family'] = [font, 'DejaVu Sans']
+    rcParams['axes.unicode_minus'] = False
+    # 한글 글꼴이 없는 서버: 글리프 누락 경고만 숨김 (네모로 표시)
+    warnings.filterwarnings('ignore', message='Glyph .* missing')
+
+
+def render_chart(kind, title, data, opts):
+    # 차트 1개 -> PNG 바이트
+    _setup_matplotlib()
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import StrMethodFormatter
+
+    money = StrMethodFormatter('{x:,.0f}')
+    fig, ax = plt.subplots(figsize=(9, 4.8), dpi=110)
+    try:
+        if kind in ('line', 'bar', 'barh', 'pie', 'bar_line'):
+            x = data[opts['x']].astype(str).tolist()
+            y = data[opts['y']].astype('float64')
+        if kind == 'line':
+            ax.plot(x, y, marker='o', color='#1f77b4')
+            ax.yaxis.set_major_formatter(money)
+        elif kind == 'bar':
+            bars = ax.bar(x, y, color='#1f77b4')
+            ax.bar_label(bars, labels=[f"{v:,.0f}" for v in y], fontsize=8)
+            ax.yaxis.set_major_formatter(money)
+        elif kind == 'barh':
+            ax.barh(x[::-1], y[::-1], color='#1f77b4')
+            ax.xaxis.set_major_formatter(money)
+        elif kind == 'pie':
+            ax.pie(y, labels=x, autopct='%1.0f%%', startangle=90, counterclock=False)
+            ax.axis('equal')
+        elif kind == 'bar_line':
+            ax.bar(x, y, color='#1f77b4', label=opts['y'])
+            ax.yaxis.set_major_formatter(money)
+            ax2 = ax.twinx()
+            ax2.plot(x, data[opts['y2']].astype('float64'), color='black', marker='o', label=opts['y2'])
+            ax2.yaxis.set_major_formatter(money)
+            ax2.set_ylabel(opts['y2'])
+            ax.set_ylabel(opts['y'])
+        elif kind == 'budget':
+            months = data['Stay_Month'].astype(str).tolist()
+            pos = range(len(months))
+            ax.bar([p - 0.2 for p in pos], data['Budget'], width=0.4, color='lightgray', label='Budget')
+            ax.bar([p + 0.2 for p in pos], data['Room_Revenue'], width=0.4, color='navy', label='Actual')
+            ax.set_xticks(list(pos), months)
+            ax.yaxis.set_major_formatter(money)
+            ax2 = ax.twinx()
+            ax2.plot(list(pos), data['Achievement'], color='orange', marker='o', label='Achievement (%)')
+            ax2.set_ylabel('Achievement (%)')
+            ax.legend(loc='upper left')
+        elif kind == 'heatmap':
+            im = ax.imshow(data.to_numpy(dtype='float64'), aspect='auto', cmap=opts.get('cmap', 'Blues'))
+            ax.set_xticks(range(data.shape[1]), data.columns, rotation=90, fontsize=7)
+            ax.set_yticks(range(data.shape[0]), data.index, fontsize=7)
+            ax.set_xlabel('Stay_Month')
+            ax.set_ylabel('Booking_Month')
+            if data.size <= 400:
+                hi = data.to_numpy().max() or 1
+                for (i, j), v in pd.DataFrame(data.to_numpy()).stack().items():
+                    if v:
+                        ax.text(j, i, opts.get('fmt', "{:,.0f}").format(v), ha='center', va='center', fontsize=6,
+                                color='white' if v > hi * 0.6 else 'black')
+            fig.colorbar(im, ax=ax, format=money)
+        else:
+            raise ValueError(f"알 수 없는 차트 종류: {kind}")
+        if kind in ('line', 'bar', 'bar_line', 'budget') and len(ax.get_xticklabels()) > 6:
+            plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        ax.set_title(title)
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight')
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+# --- 파일 쓰기 -----------------------------------------------------------------
+def _format_cell(v):
+    if isinstance(v, float):
+        return f"{v:,.1f}" if abs(v) < 100 and v != int(v) else f"{v:,.0f}"
+    if isinstance(v, int):
+        return f"{v:,}"
+    return str(v)
+
+
+def write_excel(path, sections, images, meta):
+    from openpyxl.drawing.image import Image
+    from openpyxl.utils import get_column_letter
+
+    with pd.ExcelWriter(path, engine='openpyxl') as xw:
+        pd.DataFrame(list(meta.items()), columns=['항목', '값']).to_excel(xw, sheet_name='Info', index=False)
+        xw.sheets['Info'].column_dimensions['A'].width = 16
+        xw.sheets['Info'].column_dimensions['B'].width = 40
+        for sec in sections:
+            row, width = 0, 1
+            for name, frame in sec['tables']:
+                pd.DataFrame([[name]]).to_excel(xw, sheet_name=sec['sheet'], startrow=row, index=False, header=False)
+                frame.to_excel(xw, sheet_name=sec['sheet'], startrow=row + 1, index=False)
+                row += len(frame) + 4
+                width = max(width, frame.shape[1])
+            ws = xw.sheets[sec['sheet']]
+            for cells in ws.iter_rows():
+                for c in cells:
+                    if isinstance(c.value, float):
+                        c.number_format = '#,##0' if abs(c.value) >= 100 or c.value == int(c.value) else '#,##0.0'
+            for i in range(1, width + 1):
+                ws.column_dimensions[get_column_letter(i)].width = 14
+            # 차트는 표 오른쪽에 세로로
+            col = get_column_letter(width + 2)
+            for i, (name, *_) in enumerate(sec['charts']):
+                img = Image(io.BytesIO(images[name]))
+                img.width, img.height = img.width * 0.7, img.height * 0.7
+                ws.add_image(img, f"{col}{1 + i * 28}")
+
+
+def write_html(path, sections, images, meta):
+    esc = html.escape
+    out = ["<!DOCTYPE html><html lang='ko'><head><meta charset='utf-8'>",
+           f"<title>{esc(meta['title'])}</title><style>",
+           "body{font-family:'Malgun Gothic','Apple SD Gothic Neo',sans-serif;margin:24px;color:#333}",
+           "h2{border-bottom:2px solid #333;padding-bottom:4px;margin-top:40px}",
+           "img{max-width:100%;margin:8px 0}",
+           "table{border-collapse:collapse;font-size:13px;margin:8px 0 24px}",
+           "th,td{border:1px solid #ccc;padding:4px 8px;text-align:right}th{background:#f3f3f3}",
+           "</style></head><body>",
+           f"<h1>🏛️ {esc(meta['title'])}</h1>",
+           "<p>" + " · ".join(f"{esc(k)}: {esc(str(v))}" for k, v in meta.items() if k != 'title') + "</p>"]
+    for sec in sections:
+        out.append(f"<h2>{esc(sec['title'])}</h2>")
+        for name, *_ in sec['charts']:
+            out.append(f"<img alt='{esc(name)}' src='data:image/png;base64,{base64.b64encode(images[name]).decode('ascii')}'>")
+        for name, frame in sec['tables']:
+            out.append(f"<h3>{esc(name)}</h3>")
+            out.append(frame.head(HTML_TABLE_ROWS).to_html(index=False, border=0, formatters={c: _format_cell for c in frame.columns}))
+            if len(frame) > HTML_TABLE_ROWS:
+                out.append(f"<p>… 외 {len(frame) - HTML_TABLE_ROWS:,}행 (전체는 Excel)</p>")
+    out.append("</body></html>")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(out))
+
+
+def write_pdf(path, sections, images, meta):
+    _setup_matplotlib()
+    import matplotlib.image as mpimg
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    a4 = (11.69, 8.27)  # 가로
+    with PdfPages(path) as pdf:
+        fig = plt.figure(figsize=a4)
+        fig.text(0.5, 0.62, meta['title'], ha='center', fontsize=26, weight='bold')
+        for i, (k, v) in enumerate((k, v) for k, v in meta.items() if k != 'title'):
+            fig.text(0.5, 0.5 - i * 0.04, f"{k}: {v}", ha='center', fontsize=12)
+        pdf.savefig(fig)
+        plt.close(fig)
+        for sec in sections:
+            for name, *_ in sec['charts']:
+                fig = plt.figure(figsize=a4)
+                fig.suptitle(sec['title'], fontsize=14, weight='bold')
+                ax = fig.add_axes([0.04, 0.04, 0.92, 0.86])
+                ax.imshow(mpimg.imread(io.BytesIO(images[name]), format='png'))
+                ax.axis('off')
+                pdf.savefig(fig)
+                plt.close(fig)
+            for name, frame in sec['tables']:
+                if frame.empty or frame.shape[1] > PDF_TABLE_COLS:
+                    continue
+                part = frame.head(PDF_TABLE_ROWS)
+                fig = plt.figure(figsize=a4)
+                fig.suptitle(f"{sec['title']} · {name}" + (f" (상위 {PDF_TABLE_ROWS}행)" if len(frame) > PDF_TABLE_ROWS else ""),
+                             fontsize=13, weight='bold')
+                ax = fig.add_axes([0.04, 0.04, 0.92, 0.86])
+                ax.axis('off')
+                table = ax.table(cellText=[[_format_cell(v) for v in r] for r in part.itertuples(index=False)],
+                                 colLabels=list(part.columns), loc='upper center', cellLoc='right')
+                table.auto_set_font_size(False)
+                table.set_fontsize(8)
+                pdf.savefig(fig)
+                plt.close(fig)
+
+
+# --- 빌더 (캐시 + 워커 풀 + 백그라운드 생성) ---------------------------------------
+class ReportBuilder:
+    def __init__(self, root=REPORT_DIR, workers=REPORT_WORKERS, keep=REPORT_KEEP):
+        self.root = root
+        self.workers = workers
+        self.keep = keep
+        self.pool = SpawnPool(workers)
+        self._lock = threading.Lock()
+        self._jobs = {}  # 키 -> '생성 중' / '오류: ...' (백그라운드 생성 상태)
+        os.makedirs(root, exist_ok=True)
+
+    def files(self, key):
+        # 완성된 리포트 경로 {형식: 경로}. 없으면 None
+        d = os.path.join(self.root, key)
+        if not os.path.exists(os.path.join(d, 'manifest.json')):
+            return None
+        return {fmt: os.path.join(d, name) for fmt, name in REPORT_FILES.items()}
+
+    def status(self, key):
+        # '완료' / '생성 중' / '오류: ...' / None(아직 없음)
+        if self.files(key) is not None:
+            return '완료'
+        with self._lock:
+            return self._jobs.get(key)
+
+    def build(self, cube, budget=None, stay_range=None, key=None):
+        # 캐시에 있으면 바로 반환, 없으면 생성. 반환: (키, {형식: 경로})
+        key = key or report_key(cube, budget, stay_range)
+        files = self.files(key)
+        PERF.cache('report', hit=files is not None)
+        if files is not None:
+            return key, files
+        with PERF.timer('report.build', rows=len(cube)):
+            sections = report_sections(cube, budget)
+            charts = [c for sec in sections for c in sec['charts']]
+            with PERF.timer('report.charts', charts=len(charts), workers=self.workers):
+                images = self._render_all(charts)
+            meta = {'title': REPORT_TITLE,
+                    '조회 기간': " ~ ".join(stay_range) if stay_range else "전체",
+                    '생성 시각': datetime.now().strftime('%Y-%m-%d %H:%M'),
+                    '기준': "유료 예약 (0원/OTB 제외)",
+                    '키': key}
+            tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=self.root)
+            try:
+                paths = {fmt: os.path.join(tmp, name) for fmt, name in REPORT_FILES.items()}
+                with PERF.timer('report.xlsx'):
+                    write_excel(paths['xlsx'], sections, images, meta)
+                with PERF.timer('report.pdf'):
+                    write_pdf(paths['pdf'], sections, images, meta)
+                with PERF.timer('report.html'):
+                    write_html(paths['html'], sections, images, meta)
+                with open(os.path.join(tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+                    json.dump({**meta, 'stay_range': stay_range, 'files': REPORT_FILES}, f, ensure_ascii=False)
+                try:
+                    os.rename(tmp, os.path.join(self.root, key))
+                except OSError:
+                    # 다른 프로세스(CLI/다른 서버)가 같은 키를 먼저 완성함
+                    shutil.rmtree(tmp, ignore_errors=True)
+            except Exception:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+        self._prune(key)
+        return key, self.files(key)
+
+    def build_async(self, cube, budget=None, stay_range=None, key=None):
+        # 백그라운드 스레드에서 생성 (같은 키가 이미 있거나 생성 중이면 아무것도 안 함). 반환: 키
+        key = key or report_key(cube, budget, stay_range)
+        with self._lock:
+            if self._jobs.get(key) == '생성 중' or self.files(key) is not None:
+                return key
+            self._jobs[key] = '생성 중'
+
+        def run():
+            error = None
+            try:
+                self.build(cube, budget, stay_range, key=key)
+            except Exception as e:
+                error = f"오류: {e}"
+            with self._lock:
+                if error:
+                    self._jobs[key] = error
+                else:
+                    self._jobs.pop(key, None)
+
+        threading.Thread(target=run, name="report-builder", daemon=True).start()
+        return key
+
+    def close(self):
+        self.pool.close()
+
+    def _render_all(self, charts):
+        images = {}
+        jobs = {name: (spec, {}) for name, *spec in charts}
+        for name, png, error in self.pool.run(render_chart, jobs):
+            if error is not None:
+                raise error
+            images[name] = png
+        return images
+
+    def _prune(self, keep_key):
+        now = time.time()
+        done = []
+        for name in os.listdir(self.root):
+            p = os.path.join(self.root, name)
+            if not os.path.isdir(p):
+                continue
+            if name.startswith('.'):
+                # 중단된 생성의 임시 폴더
+                if now - os.path.getmtime(p) > STALE_TMP_SECONDS:
+                    shutil.rmtree(p, ignore_errors=True)
+            elif name != keep_key:
+                done.append((os.path.getmtime(p), p))
+        for _, p in sorted(done, reverse=True)[max(self.keep - 1, 0):]:
+            shutil.rmtree(p, ignore_errors=True)
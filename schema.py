@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from perf import PERF
+from transform import day_type, month_label, safe_ratio
+
+# ------------------------------------------------------------------------------
+# 팩트 스키마 (저장: 원본 사실만 / 조회: 타입 지정 프레임 + 파생 컬럼은 필요할 때 계산)
+# ------------------------------------------------------------------------------
+# 저장 컬럼에서 제외한 값 (조회 시 CheckIn / Booking_Date / 금액으로 계산):
+#   Stay_Month, Booking_Month, Stay_YearWeek, Day_of_Week, Day_Type, Month_Label, ADR, Is_Zero_Rate
+# Month_Label 은 조회 시점 기준으로 계산되므로 업로드 날짜에 고정되지 않음.
+# ADR 은 OTB 행도 Room_Revenue / RN (OTB 파일의 ADR 열은 읽지 않음. RN 이 0 인 날은 0)
+# Conf_No: PMS 확인(예약)번호. 리스트에 해당 열이 없거나 OTB 행이면 빈 값
+
+FACT_COLUMNS = ['Guest_Name', 'CheckIn', 'Booking_Date', 'RN', 'Room_Revenue', 'Total_Revenue', 'Segment', 'Account', 'Room_Type', 'Nat_Group', 'Lead_Time', 'Status', 'Snapshot_Date', 'Conf_No']
+
+CATEGORY_COLUMNS = ['Segment', 'Account', 'Room_Type', 'Status', 'Nat_Group']
+INT_COLUMNS = ['RN', 'Lead_Time']
+FLOAT_COLUMNS = ['Room_Revenue', 'Total_Revenue']
+DATE_COLUMNS = ['CheckIn', 'Booking_Date', 'Snapshot_Date']
+
+
+def _blank_to_nan(s):
+    if s.dtype == object:
+        return s.replace('', np.nan)
+    return s
+
+
+@PERF.timed('schema.to_typed')
+def to_typed(df):
+    # 저장소에서 읽은 프레임(문자열/구 스키마 포함) -> 타입 지정 프레임 (FACT_COLUMNS 만)
+    out = pd.DataFrame(index=df.index)
+    for c in FACT_COLUMNS:
+        s = df[c] if c in df.columns else pd.Series(np.nan, index=df.index)
+        if c in DATE_COLUMNS:
+            out[c] = pd.to_datetime(_blank_to_nan(s), errors='coerce')
+        elif c in INT_COLUMNS:
+            out[c] = pd.to_numeric(s, errors='coerce').fillna(0).round().astype('int32')
+        elif c in FLOAT_COLUMNS:
+            out[c] = pd.to_numeric(s, errors='coerce').fillna(0).astype('float64')
+        elif c in CATEGORY_COLUMNS:
+            out[c] = s.fillna('').astype(str).astype('category')
+        else:
+            out[c] = s.fillna('').astype(str)
+    # 예약일이 없는 행(구 스키마/OTB)은 입실일로 대체
+    out['Booking_Date'] = out['Booking_Date'].fillna(out['CheckIn'])
+    return out
+
+
+def to_storage(df):
+    # 저장용 프레임: FACT_COLUMNS 순서, 날짜는 'YYYY-MM-DD' 문자열
+    out = pd.DataFrame(index=df.index)
+    for c in FACT_COLUMNS:
+        s = df[c] if c in df.columns else pd.Series('', index=df.index)
+        if c in DATE_COLUMNS and pd.api.types.is_datetime64_any_dtype(s):
+            s = s.dt.strftime('%Y-%m-%d')
+        elif c in INT_COLUMNS:
+            s = pd.to_numeric(s, errors='coerce').fillna(0).round().astype('int64')
+        elif c in FLOAT_COLUMNS:
+            s = pd.to_numeric(s, errors='coerce').fillna(0)
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(str)
+        out[c] = s
+    if 'Booking_Date' not in df.columns:
+        out['Booking_Date'] = out['CheckIn']
+    return out
+
+
+def month_bounds(month_range):
+    # ('2025-01', '2025-03') -> ('2025-01-01', '2025-04-01')  [시작, 끝) 날짜 문자열
+    lo, hi = month_range
+    end = (pd.Period(hi, freq='M') + 1).strftime('%Y-%m-01')
+    return f"{lo}-01", end
+
+
+def date_category(dt, fmt):
+    # 고유 날짜만 strftime -> 정렬된 카테고리 (월/주 라벨이 시간순으로 정렬됨)
+    codes, uniques = pd.factorize(dt, sort=True)
+    labels = pd.DatetimeIndex(uniques).strftime(fmt)
+    cats = pd.Index(labels).unique()
+    remap = cats.get_indexer(labels)
+    codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=cats), index=dt.index)
+
+
+DERIVED = {
+    'CheckIn_dt': lambda df: df['CheckIn'],
+    'Booking_dt': lambda df: df['Booking_Date'],
+    'Stay_Month': lambda df: date_category(df['CheckIn'], '%Y-%m'),
+    'Booking_Month': lambda df: date_category(df['Booking_Date'], '%Y-%m'),
+    'Stay_YearWeek': lambda df: date_category(df['CheckIn'], '%Y-%U주'),
+    'Day_of_Week': lambda df: date_category(df['CheckIn'], '%A'),
+    'Weekday_Num': lambda df: df['CheckIn'].dt.weekday.astype('int8'),
+    'Day_Type': lambda df: day_type(df['CheckIn'].dt.weekday).astype('category'),
+    'Month_Label': lambda df: month_label(df['CheckIn']).astype('category'),
+    'Is_Zero_Rate': lambda df: df['Total_Revenue'] <= 0,
+    'ADR': lambda df: safe_ratio(df['Room_Revenue'], df['RN']),
+}
+
+
+def with_derived(df, columns):
+    # 요청된 파생 컬럼만 계산해서 프레임에 붙임 (이미 있으면 재사용)
+    for c in columns:
+        if c not in df.columns:
+            df[c] = DERIVED[c](df)
+    return df
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+from perf import PERF
+
+# ------------------------------------------------------------------------------
+# 구글 시트 증분 동기화 (로컬 Parquet 캐시 + 행 수 워터마크)
+# ------------------------------------------------------------------------------
+# - 로컬에 DB 사본(parquet)과 메타(json)를 보관
+# - 새로고침 시 워터마크 이후 행만 가져옴 (헤더/마지막 행 검증을 같은 batch_get 한 번에)
+# - 헤더가 비었거나(전체 삭제) 마지막 행이 달라졌으면(재작성) 전체 재로딩
+
+CACHE_DIR = os.environ.get("PICKUP_CACHE_DIR", ".pickup_cache")
+
+
+def api_status(e):
+    # gspread APIError 면 HTTP 상태 코드, 아니면 None
+    # gspread 를 import 하지 않고 판별 (APIError 가 발생했다면 gspread 는 이미 로드된 상태)
+    exc = sys.modules.get('gspread.exceptions')
+    if exc is not None and isinstance(e, exc.APIError):
+        return e.response.status_code
+    return None
+
+
+def _col_letter(n):
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def _row_hash(row):
+    return hashlib.sha1("\x1f".join(str(v) for v in row).encode("utf-8")).hexdigest()
+
+
+def _pad(rows, width):
+    return [list(r[:width]) + [''] * (width - len(r)) for r in rows]
+
+
+class SheetSync:
+    def __init__(self, worksheet, cache_dir=CACHE_DIR, name="db"):
+        self.ws = worksheet
+        self.cache_dir = cache_dir
+        self.data_path = os.path.join(cache_dir, f"{name}.parquet")
+        self.meta_path = os.path.join(cache_dir, f"{name}.meta.json")
+
+    # --- 로컬 캐시 -----------------------------------------------------------
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, df, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df.to_parquet(self.data_path, index=False)
+        self._write_meta(meta)
+
+    def _write_meta(self, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self.meta_path)
+
+    def _read_local(self, meta):
+        if meta is None or not os.path.exists(self.data_path):
+            return None
+        try:
+            return pd.read_parquet(self.data_path)
+        except Exception:
+            return None
+
+    def invalidate(self):
+        # "전체 데이터 삭제" 등 시트를 직접 비울 때 호출
+        # 버전은 이어서 올림 (0 으로 돌아가면 버전을 키로 쓰는 캐시가 삭제 전 결과를 돌려줌)
+        meta = self._read_meta()
+        if os.path.exists(self.data_path):
+            os.remove(self.data_path)
+        self._write_meta({"rows": 0, "header": [], "tail_hash": "", "version": (meta["version"] if meta else 0) + 1})
+
+    @property
+    def version(self):
+        meta = self._read_meta()
+        return meta["version"] if meta else 0
+
+    # --- 동기화 -------------------------------------------------------------
+    @PERF.timed('sheet_sync.full_reload')
+    def full_reload(self, prev_version=0):
+        values = self.ws.get_all_values()
+        header = list(values[0]) if values else []
+        rows = _pad(values[1:], len(header))
+        df = pd.DataFrame(rows, columns=header, dtype=str)
+        meta = {
+            "rows": len(values),
+            "header": header,
+            "tail_hash": _row_hash(_pad(values[-1:], len(header))[0]) if values else "",
+            "version": prev_version + 1,
+        }
+        self._write(df, meta)
+        return df
+
+    @staticmethod
+    def _ranges(meta):
+        # 헤더 / 워터마크 행 / 이후 새 행
+        n = meta["rows"]
+        last_col = _col_letter(len(meta["header"]))
+        return [f"A1:{last_col}1", f"A{n}:{last_col}{n}", f"A{n + 1}:{last_col}"]
+
+    def check_ranges(self):
+        # 증분 확인에 필요한 범위 (다른 시트 범위와 한 번에 batchGet 할 때 사용)
+        # 로컬 사본이 없으면 [] -> refresh() 가 전체 재로딩
+        meta = self._read_meta()
+        if not meta or meta["rows"] <= 0 or not meta["header"] or not os.path.exists(self.data_path):
+            return []
+        return self._ranges(meta)
+
+    def refresh(self, prefetched=None):
+        # prefetched: (check_ranges() 결과, 그 범위의 값 목록). 그 사이 워터마크가 바뀌었으면 무시하고 직접 조회
+        meta = self._read_meta()
+        local = self._read_local(meta)
+        if local is None:
+            return self.full_reload(meta["version"] if meta else 0)
+
+        n = meta["rows"]
+        header = meta["header"]
+        if n <= 0 or not header:
+            return self.full_reload(meta["version"])
+
+        ranges = self._ranges(meta)
+        if prefetched is not None and prefetched[0] == ranges:
+            head_rng, tail_rng, new_rng = prefetched[1]
+        else:
+            head_rng, tail_rng, new_rng = self.ws.batch_get(ranges)
+
+        head_row = _pad(head_rng, len(header))[0] if head_rng else []
+        tail_row = _pad(tail_rng, len(header))[0] if tail_rng else []
+        if head_row != header or _row_hash(tail_row) != meta["tail_hash"]:
+            # 전체 삭제 / 재작성 감지
+            return self.full_reload(meta["version"])
+
+        if not new_rng:
+            PERF.cache('sheet_sync', hit=True)
+            return local
+
+        new_rows = _pad(new_rng, len(header))
+        PERF.count('sheet_sync.new_rows', len(new_rows))
+        delta = pd.DataFrame(new_rows, columns=header, dtype=str)
+        df = pd.concat([local, delta], ignore_index=True)
+        meta = {
+            "rows": n + len(new_rows),
+            "header": header,
+            "tail_hash": _row_hash(new_rows[-1]),
+            "version": meta["version"] + 1,
+        }
+        self._write(df, meta)
+        return df
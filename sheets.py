@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pandas as pd
+
+from perf import PERF
+from sheet_sync import SheetSync
+
+# ------------------------------------------------------------------------------
+# 구글 시트 연결 (프로세스당 1회 인증/열기, 모든 세션이 공유) + 일괄 읽기
+# ------------------------------------------------------------------------------
+# - 스프레드시트/워크시트 핸들과 시트 목록은 처음 열 때 1회만 조회
+# - 예산(Budget) 시트와 DB 시트 증분 확인(시트 저장소일 때)을 values:batchGet 한 번으로 읽음
+# - 예산 프레임은 저장소 버전 + BUDGET_TTL 단위로 캐시 (재실행마다 API 호출 없음)
+# 인증 토큰 갱신은 gspread/google-auth 세션이 처리
+
+SPREADSHEET = "Amber_Revenue_DB"
+BUDGET_SHEET = "Budget"
+BUDGET_COLUMNS = ['Month', 'Budget']
+BUDGET_TTL = 600  # 초. 예산 시트는 저장소 버전에 안 잡히므로 주기적으로 다시 읽음
+
+
+def _qualified(title, a1):
+    return "'" + title.replace("'", "''") + "'!" + a1
+
+
+def budget_frame(values):
+    # 예산 시트 값 -> [Month(YYYY-MM), Budget(숫자)]
+    if not values or len(values) < 2 or not set(BUDGET_COLUMNS) <= set(values[0]):
+        return pd.DataFrame(columns=BUDGET_COLUMNS)
+    width = len(values[0])
+    df = pd.DataFrame([list(r[:width]) + [''] * (width - len(r)) for r in values[1:]], columns=values[0])[BUDGET_COLUMNS]
+    month = pd.to_datetime(df['Month'], errors='coerce', format='mixed')
+    df['Month'] = month.dt.strftime('%Y-%m').where(month.notna(), df['Month'].astype(str).str.strip())
+    df['Budget'] = pd.to_numeric(df['Budget'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
+    return df[df['Month'] != ''].groupby('Month', as_index=False)['Budget'].sum()
+
+
+class SheetsHandle:
+    def __init__(self, client, title=SPREADSHEET):
+        self.client = client
+        self.spreadsheet = client.open(title)
+        self.titles = [ws.title for ws in self.spreadsheet.worksheets()]
+        self.db = self.spreadsheet.get_worksheet(0)
+        self._lock = threading.Lock()
+        self._budget = None  # (저장소 버전, 읽은 시각, 프레임)
+
+    def batch_read(self, sheet_ranges):
+        # [(시트명, A1 범위), ...] -> 범위별 값 목록 (API 1회)
+        if not sheet_ranges:
+            return []
+        resp = self.spreadsheet.values_batch_get([_qualified(t, a1) for t, a1 in sheet_ranges])
+        return [vr.get('values', []) for vr in resp.get('valueRanges', [])]
+
+    def budget(self, store, ttl=BUDGET_TTL):
+        with self._lock:
+            cached = self._budget
+        if cached is not None and cached[0] == store.version and time.monotonic() - cached[1] < ttl:
+            PERF.cache('budget', hit=True)
+            return cached[2]
+        PERF.cache('budget', hit=False)
+        with PERF.timer('sheets.batch_read'):
+            frame = self._read(store)
+        with self._lock:
+            self._budget = (store.version, time.monotonic(), frame)
+        return frame
+
+    def _read(self, store):
+        # 예산 + (시트 저장소면) DB 증분 확인 범위를 한 요청으로
+        sync = getattr(store, 'sync', None)
+        db_ranges = sync.check_ranges() if isinstance(sync, SheetSync) and sync.ws is self.db else []
+        requests = [(self.db.title, r) for r in db_ranges]
+        if BUDGET_SHEET in self.titles:
+            requests.append((BUDGET_SHEET, "A:Z"))
+        values = self.batch_read(requests)
+        if db_ranges:
+            sync.refresh(prefetched=(db_ranges, values[:len(db_ranges)]))
+        return budget_frame(values[len(db_ranges)] if BUDGET_SHEET in self.titles else [])
+
+    def invalidate(self):
+        with self._lock:
+            self._budget = None
@@ -0,0 +1,286 @@
+import os
+import time
+
+import pandas as pd
+
+from bulk_writer import Occurrences, PartialWriteError, row_hashes, write_chunks
+from localdb import LocalDB
+from perf import PERF
+from schema import FACT_COLUMNS, month_bounds, to_storage, to_typed
+from sheet_sync import CACHE_DIR, SheetSync
+
+# ------------------------------------------------------------------------------
+# 저장소 인터페이스 (append / read / iter_read / read_filtered / clear / version)
+# ------------------------------------------------------------------------------
+# - SQLiteStore : 로컬 내장 DB (기본 저장소, 타입 보존 + 월 범위 필터를 SQL 로 처리)
+#                 구 스키마(파생 컬럼 포함 20열) 테이블은 열 때 자동으로 슬림 스키마로 변환
+# - SheetStore  : 기존 구글 시트 (Amber_Revenue_DB 0번 시트)
+# - MirroredStore: 주 저장소 + 시트 미러 (시트는 선택 사항)
+
+REAL_COLUMNS = ['Room_Revenue', 'Total_Revenue']
+INT_COLUMNS = ['RN', 'Lead_Time']
+# 월 필터 -> 실제 저장된 날짜 컬럼
+MONTH_SOURCE = {'Stay_Month': 'CheckIn', 'Booking_Month': 'Booking_Date'}
+
+READ_CHUNK_ROWS = 100_000  # iter_read 기본 청크 (인덱스 재구성 등 전체 이력을 훑을 때)
+DB_PATH = os.environ.get("PICKUP_DB_PATH", os.path.join(CACHE_DIR, "pickup.db"))
+MIRROR_PENDING_PATH = os.path.join(CACHE_DIR, "mirror_pending.parquet")
+MIRROR_RETRY_SECONDS = 60  # 미러 기록 실패 후 이 시간 동안은 시도하지 않고 보관만 (업로드 지연 방지)
+
+
+def _sql_type(col):
+    if col in REAL_COLUMNS: return "REAL"
+    if col in INT_COLUMNS: return "INTEGER"
+    return "TEXT"
+
+
+def filter_months(df, stay_range=None, booking_range=None):
+    # 타입 지정 프레임(to_typed) 기준 입실월/예약월 범위 필터
+    mask = pd.Series(True, index=df.index)
+    for col, rng in (('CheckIn', stay_range), ('Booking_Date', booking_range)):
+        if rng:
+            lo, hi = month_bounds(rng)
+            mask &= (df[col] >= lo) & (df[col] < hi)
+    return df[mask]
+
+
+class SQLiteStore(LocalDB):
+    exact_version = True  # 모든 쓰기가 이 객체를 거치므로 version 이 내용 변경을 바로 반영
+
+    def __init__(self, path=DB_PATH):
+        super().__init__(path)
+        with self._connect() as conn:
+            existing = [r[1] for r in conn.execute("PRAGMA table_info(facts)")]
+            if existing and existing != FACT_COLUMNS:
+                self._migrate(conn, existing)
+            cols = ", ".join(f'"{c}" {_sql_type(c)}' for c in FACT_COLUMNS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS facts ({cols})")
+            conn.execute("DROP INDEX IF EXISTS ix_facts_stay")
+            conn.execute("DROP INDEX IF EXISTS ix_facts_booking")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_facts_checkin ON facts (CheckIn)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_facts_booking_date ON facts (Booking_Date)")
+
+    def _migrate(self, conn, existing):
+        conn.execute("ALTER TABLE facts RENAME TO facts_old")
+        cols = ", ".join(f'"{c}" {_sql_type(c)}' for c in FACT_COLUMNS)
+        conn.execute(f"CREATE TABLE facts ({cols})")
+        select = ", ".join(
+            f'"{c}"' if c in existing else ('"CheckIn"' if c == 'Booking_Date' else "NULL")
+            for c in FACT_COLUMNS
+        )
+        conn.execute(f"INSERT INTO facts SELECT {select} FROM facts_old")
+        conn.execute("DROP TABLE facts_old")
+        self._bump(conn)
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+
+    def append(self, df, on_chunk=None):
+        if df.empty:
+            return 0
+        out = to_storage(df)
+        with self._lock, self._connect() as conn:
+            out.to_sql("facts", conn, if_exists="append", index=False, chunksize=5000)
+            self._bump(conn)
+        if on_chunk:
+            on_chunk(0, len(out))
+        return len(out)
+
+    def read_filtered(self, stay_range=None, booking_range=None, columns=None):
+        cols = ", ".join(f'"{c}"' for c in FACT_COLUMNS)
+        where, params = [], []
+        for col, rng in (('CheckIn', stay_range), ('Booking_Date', booking_range)):
+            if rng:
+                where.append(f"{col} >= ? AND {col} < ?"); params += list(month_bounds(rng))
+        sql = f"SELECT {cols} FROM facts" + (" WHERE " + " AND ".join(where) if where else "")
+        with self._connect() as conn, PERF.timer('store.query'):
+            raw = pd.read_sql_query(sql, conn, params=params)
+        df = to_typed(raw)
+        return df[columns] if columns else df
+
+    def read(self):
+        return self.read_filtered()
+
+    def iter_read(self, chunk_rows=READ_CHUNK_ROWS):
+        # 전체 이력을 chunk_rows 행씩 (타입 지정 프레임). 저장 순서 그대로
+        cols = ", ".join(f'"{c}"' for c in FACT_COLUMNS)
+        with self._connect() as conn:
+            for raw in pd.read_sql_query(f"SELECT {cols} FROM facts ORDER BY rowid", conn, chunksize=chunk_rows):
+                yield to_typed(raw)
+
+    def months(self, column='Stay_Month'):
+        src = MONTH_SOURCE[column]
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT DISTINCT substr({src}, 1, 7) FROM facts WHERE {src} IS NOT NULL AND {src} != '' ORDER BY 1").fetchall()
+        return [r[0] for r in rows]
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM facts")
+            self._bump(conn)
+
+
+class SheetStore:
+    exact_version = False  # 시트를 직접 고친 변경은 다음 증분 확인(refresh) 때 버전에 잡힘
+
+    def __init__(self, worksheet):
+        self.ws = worksheet
+        self.sync = SheetSync(worksheet)
+
+    @property
+    def version(self):
+        return self.sync.version
+
+    def count(self):
+        return len(self.sync.refresh())
+
+    def append(self, df, on_chunk=None):
+        # 청크 분할 + 토큰 버킷 + 429 백오프 (bulk_writer.write_chunks)
+        # 시트의 기존 헤더 순서에 맞춰 기록 (구 스키마 시트면 없는 파생 컬럼은 빈 값)
+        if df.empty:
+            return 0
+        header = list(self.sync.refresh().columns)
+        if not header:
+            self.ws.append_row(FACT_COLUMNS)
+            header = FACT_COLUMNS
+        out = to_storage(df).reindex(columns=header)
+        return write_chunks(self.ws, out.fillna('').astype(str).values.tolist(), on_chunk=on_chunk)
+
+    def read(self):
+        return to_typed(self.sync.refresh())
+
+    def iter_read(self, chunk_rows=READ_CHUNK_ROWS):
+        raw = self.sync.refresh()
+        for start in range(0, len(raw), chunk_rows):
+            yield to_typed(raw.iloc[start:start + chunk_rows])
+
+    def read_filtered(self, stay_range=None, booking_range=None, columns=None):
+        df = self.read()
+        if df.empty:
+            return df
+        df = filter_months(df, stay_range, booking_range)
+        return df[columns] if columns else df
+
+    def months(self, column='Stay_Month'):
+        df = self.read()
+        dates = df[MONTH_SOURCE[column]].dropna()
+        return sorted(dates.dt.strftime('%Y-%m').unique())
+
+    def clear(self):
+        self.ws.clear()
+        self.ws.append_row(FACT_COLUMNS)
+        self.sync.invalidate()
+
+
+class MirroredStore:
+    # 읽기는 primary, 쓰기/삭제는 primary + mirror
+    # 미러 쓰기가 실패하면 남은 행을 보관했다가 다음 쓰기 때 이어서 기록. primary/장부는 이미 기록되었으므로
+    # 오류를 올리지 않고 미반영 상태(pending / mirror_error)로만 알림
+    def __init__(self, primary, mirror=None, pending_path=MIRROR_PENDING_PATH, retry_seconds=MIRROR_RETRY_SECONDS):
+        self.primary = primary
+        self.mirror = mirror
+        self.pending_path = pending_path
+        self.retry_seconds = retry_seconds
+        self.mirror_error = None  # 마지막 미러 기록 실패 내용 (성공하면 None)
+        self._retry_at = 0.0
+
+    @property
+    def version(self):
+        return self.primary.version
+
+    @property
+    def exact_version(self):
+        return getattr(self.primary, 'exact_version', False)
+
+    def bootstrap(self, ledger=None):
+        # 로컬 DB 가 비어 있으면 시트에 쌓인 기존 데이터를 1회 가져옴
+        # ledger: 가져온 행의 행 해시도 장부에 기록 (시트에 이미 있는 파일을 다시 올려도 중복 적재 안 됨)
+        if self.mirror is None or self.primary.count() > 0:
+            return 0
+        occurrences = Occurrences()
+        n = 0
+        for df in self.mirror.iter_read():
+            if df.empty:
+                continue
+            on_chunk = None
+            if ledger is not None:
+                hashes = row_hashes(df, occurrences)
+                on_chunk = lambda a, b: ledger.add_rows(hashes[a:b])
+            self.primary.append(df, on_chunk=on_chunk)
+            n += len(df)
+        return n
+
+    def count(self):
+        return self.primary.count()
+
+    @property
+    def pending(self):
+        # 미러에 아직 기록하지 못한 행 수
+        return len(pd.read_parquet(self.pending_path)) if os.path.exists(self.pending_path) else 0
+
+    def append(self, df, on_chunk=None):
+        n = self.primary.append(df, on_chunk=on_chunk)
+        if self.mirror is not None and (n or os.path.exists(self.pending_path)):
+            self._mirror_append(df.iloc[:n])
+        return n
+
+    def _mirror_append(self, df):
+        if os.path.exists(self.pending_path):
+            df = pd.concat([pd.read_parquet(self.pending_path), df.fillna('').astype(str)], ignore_index=True)
+        if time.monotonic() < self._retry_at:
+            self._keep_pending(df)
+            return
+        try:
+            self.mirror.append(df)
+        except Exception as e:
+            # PartialWriteError 면 기록된 행 다음부터, 그 밖의 오류(헤더 조회 실패 등)는 전부 보관
+            written = e.written if isinstance(e, PartialWriteError) else 0
+            self._keep_pending(df.iloc[written:])
+            self.mirror_error = str(e)
+            self._retry_at = time.monotonic() + self.retry_seconds
+            return
+        self.mirror_error = None
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+
+    def _keep_pending(self, df):
+        df.fillna('').astype(str).to_parquet(self.pending_path, index=False)
+
+    def read(self):
+        return self.primary.read()
+
+    def iter_read(self, chunk_rows=READ_CHUNK_ROWS):
+        return self.primary.iter_read(chunk_rows)
+
+    def read_filtered(self, stay_range=None, booking_range=None, columns=None):
+        return self.primary.read_filtered(stay_range, booking_range, columns)
+
+    def months(self, column='Stay_Month'):
+        return self.primary.months(column)
+
+    def clear(self):
+        self.primary.clear()
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+        self.mirror_error = None
+        self._retry_at = 0.0
+        if self.mirror is not None:
+            self.mirror.clear()
+
+
+def open_store(worksheet=None, backend=None, mirror=None, ledger=None):
+    # PICKUP_STORAGE: sqlite(기본) / sheet,  PICKUP_SHEET_MIRROR: 1(기본) / 0
+    # ledger: 업로드 장부. 시트에서 가져온 행을 기록하고, 이전 해시 방식의 장부면 저장소에서 다시 계산
+    backend = backend or os.environ.get("PICKUP_STORAGE", "sqlite")
+    if mirror is None:
+        mirror = os.environ.get("PICKUP_SHEET_MIRROR", "1") != "0"
+
+    if backend == "sheet":
+        store = SheetStore(worksheet)
+    else:
+        store = MirroredStore(SQLiteStore(), SheetStore(worksheet) if (mirror and worksheet is not None) else None)
+        store.bootstrap(ledger)
+    if ledger is not None and not ledger.built:
+        ledger.rebuild(store)
+    return store
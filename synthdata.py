@@ -0,0 +1,172 @@
+import argparse
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------------------
+# 합성 PMS 리포트 생성기 (벤치마크/오프라인 점검용)
+# ------------------------------------------------------------------------------
+# - reservation_list : 예약/취소 리스트 (리포트 제목 행 + 헤더 + 본문 + 날짜별 소계 + 합계)
+#                      취소 리스트는 같은 seed 의 예약 중 일부 (확인번호 동일, 일부는 거래처가 바뀐 채 출력)
+# - otb_export       : "Sales on the Book" 일자별 OTB (RN/ADR/매출이 오른쪽 끝 열)
+# 반환은 header=None 으로 읽은 것과 같은 원본 셀 프레임. write() 로 csv/xlsx 저장.
+
+LIST_HEADERS = {
+    'ko': ['투숙객', '입실일자', '예약일', '객실수', '박수', '객실료', '총금액', '세그먼트', '거래처', '객실타입', '국적', '리드타임', '예약번호'],
+    'en': ['Guest Name', 'Arrival Date', 'Booking Date', 'Rooms', 'Nights', 'Room Revenue', 'Total Amount', 'Segment', 'Source', 'Room Type', 'Nationality', 'Lead Time', 'Conf No'],
+}
+OTB_HEADERS = {
+    'ko': ['일자', '요일', '가용객실', '판매객실', '객실수(RN)', '점유율(%)', 'ADR', 'RevPAR', '객실매출'],
+    'en': ['Date', 'Day', 'Available Rooms', 'Sold Rooms', 'Room Nights', 'Occ(%)', 'ADR', 'RevPAR', 'Room Revenue'],
+}
+TITLES = {'list': 'Reservation List', 'cancel': 'Cancellation List', 'otb': 'Sales on the Book'}
+
+SEGMENTS = ['OTA', 'FIT', 'GRP', 'CORP', 'PKG']
+SEGMENT_P = [0.45, 0.2, 0.1, 0.15, 0.1]
+ACCOUNTS = ['Agoda', 'Booking.com', 'Expedia', 'Trip.com', 'Direct', 'Samsung', 'Hanatour', 'Yanolja']
+ROOM_TYPES = ['STD', 'DLX', 'STE', 'FAM']
+ROOM_RATE = {'STD': 90000, 'DLX': 130000, 'STE': 260000, 'FAM': 170000}
+NATIONS = ['KOR', 'KOR', 'KOR', 'CHN', 'chn', 'HKG', 'TWN', 'JPN', 'USA', '']
+NAMES = ['김민수', '이서연', '박지훈', '최유진', 'John Smith', 'Emily Chen', '王伟', '李娜', 'Tanaka Yuki', 'Maria Garcia']
+TOTAL_ROOMS = 200
+
+
+def reservation_list(n, seed=0, lang='ko', kind='list', start='2025-01-01', days=730, subtotals=True, cancel_rate=0.1):
+    # kind='cancel': n 건 예약 중 cancel_rate 만큼을 취소 리스트로 (같은 seed 의 'list' 와 확인번호로 상계됨)
+    rng = np.random.default_rng(seed)
+    stay = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n)), unit='D')
+    lead = np.minimum(rng.gamma(1.6, 25, n).astype(int), 400)
+    booked = stay - pd.to_timedelta(lead, unit='D')
+    room_type = rng.choice(ROOM_TYPES, n, p=[0.5, 0.3, 0.05, 0.15])
+    rooms = rng.choice([1, 1, 1, 2, 3], n)
+    nights = rng.choice([1, 1, 2, 2, 3, 4, 7], n)
+    base = pd.Series(room_type).map(ROOM_RATE).to_numpy()
+    weekend = (stay.weekday >= 4).astype(float)
+    rate = base * (1 + 0.25 * weekend) * rng.normal(1, 0.12, n)
+    rate = np.where(rng.random(n) < 0.03, 0, rate)  # 0원 예약 (컴프/하우스유즈)
+    room_rev = (rate * rooms * nights).round(-2)
+    total = np.where(rng.random(n) < 0.3, room_rev * 1.15, room_rev).round(-2)
+    date_fmt = '%Y-%m-%d' if lang == 'ko' else '%m/%d/%Y'
+
+    body = pd.DataFrame({
+        0: rng.choice(NAMES, n),
+        1: stay.strftime(date_fmt),
+        2: booked.strftime(date_fmt),
+        3: rooms, 4: nights, 5: room_rev, 6: total,
+        7: rng.choice(SEGMENTS, n, p=SEGMENT_P),
+        8: rng.choice(ACCOUNTS, n),
+        9: room_type,
+        10: rng.choice(NATIONS, n),
+        11: lead,
+        12: seed * 10_000_000 + 1_000_001 + np.arange(n),
+    })
+    if kind == 'cancel':
+        keep = rng.random(n) < cancel_rate
+        # PMS 취소 리스트는 취소 시점의 거래처로 출력되기도 함 (확인번호 외 키 열이 예약 리스트와 다름)
+        edited = keep & (rng.random(n) < 0.3)
+        body.loc[edited, 8] = rng.choice(ACCOUNTS, int(edited.sum()))
+        body, rooms, room_rev, total = body[keep].reset_index(drop=True), rooms[keep], room_rev[keep], total[keep]
+        n = len(body)
+    if subtotals and n:
+        # 입실일이 바뀌는 곳마다 소계 행 (PMS 출력 형식)
+        label = '소계' if lang == 'ko' else 'Subtotal'
+        ends = np.flatnonzero(np.r_[body[1].to_numpy()[1:] != body[1].to_numpy()[:-1], True])
+        sub = pd.DataFrame({0: label, 3: body[3].groupby(np.searchsorted(ends, np.arange(n))).sum().to_numpy()},
+                           index=ends + 0.5)
+        body = pd.concat([body, sub]).sort_index(kind='stable')
+    return _framed(body, LIST_HEADERS[lang], TITLES[kind], lang, totals={3: rooms.sum(), 5: room_rev.sum(), 6: total.sum()})
+
+
+def otb_export(snapshot=None, days=365, seed=0, lang='ko', pace=1.0):
+    # snapshot 기준 days 일 앞까지의 일자별 OTB. pace 로 물량 배율 조정 (스냅샷 간 픽업 흉내)
+    rng = np.random.default_rng(seed)
+    snap = pd.Timestamp(snapshot or pd.Timestamp.now()).normalize()
+    dates = pd.date_range(snap, periods=days, freq='D')
+    ahead = np.arange(days)
+    sold = np.clip((TOTAL_ROOMS * 0.85 * np.exp(-ahead / 60) * pace + rng.normal(0, 5, days)).round(), 0, TOTAL_ROOMS).astype(int)
+    adr = (110000 * (1 + 0.25 * (dates.weekday >= 4)) * rng.normal(1, 0.05, days)).round(-2)
+    rev = sold * adr
+    date_fmt = '%Y-%m-%d' if lang == 'ko' else '%m/%d/%Y'
+    body = pd.DataFrame({
+        0: dates.strftime(date_fmt),
+        1: dates.strftime('%a'),
+        2: TOTAL_ROOMS, 3: sold, 4: sold,
+        5: (sold / TOTAL_ROOMS * 100).round(1),
+        6: adr, 7: (rev / TOTAL_ROOMS).round(), 8: rev,
+    })
+    return _framed(body, OTB_HEADERS[lang], TITLES['otb'], lang, totals={4: sold.sum(), 8: rev.sum()})
+
+
+def _framed(body, header, title, lang, totals):
+    width = len(header)
+    body = body.reindex(columns=range(width))
+    top = pd.DataFrame([[title] + [None] * (width - 1),
+                        [f"Printed {pd.Timestamp.now():%Y-%m-%d %H:%M}"] + [None] * (width - 1),
+                        [None] * width,
+                        header])
+    total = pd.DataFrame([[('합계' if lang == 'ko' else 'Total')] + [totals.get(i) for i in range(1, width)]])
+    return pd.concat([top, body, total], ignore_index=True)
+
+
+def file_name(kind, fmt, lang='ko', snapshot=None):
+    if kind == 'otb':
+        stamp = pd.Timestamp(snapshot or pd.Timestamp.now()).strftime('%Y%m%d')
+        return f"{TITLES['otb']} {stamp}.{fmt}"
+    return f"{TITLES[kind].replace(' ', '_')}_{lang}.{fmt}"
+
+
+def write(raw, path_or_buffer, fmt=None):
+    fmt = fmt or os.path.splitext(str(getattr(path_or_buffer, 'name', path_or_buffer)))[1].lstrip('.')
+    if fmt == 'csv':
+        data = raw.to_csv(index=False, header=False).encode('utf-8')
+        if isinstance(path_or_buffer, (str, os.PathLike)):
+            with open(path_or_buffer, 'wb') as f:
+                f.write(data)
+        else:
+            path_or_buffer.write(data)
+        return
+    # 대용량도 빠르게: openpyxl write-only 모드
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in raw.itertuples(index=False):
+        ws.append([None if (v is None or (isinstance(v, float) and np.isnan(v))) else (v.item() if hasattr(v, 'item') else v)
+                   for v in row])
+    wb.save(path_or_buffer)
+
+
+def as_upload(raw, name):
+    # 업로드 파일처럼 .name 을 가진 바이트 버퍼
+    from ingest import _NamedBytes
+
+    buf = io.BytesIO()
+    write(raw, buf, os.path.splitext(name)[1].lstrip('.'))
+    return _NamedBytes(buf.getvalue(), name)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="합성 PMS 리포트 생성")
+    ap.add_argument('--rows', type=int, default=10_000)
+    ap.add_argument('--format', choices=['csv', 'xlsx'], default='xlsx')
+    ap.add_argument('--lang', choices=['ko', 'en'], default='ko')
+    ap.add_argument('--out', default='synthetic')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = [
+        ('list', reservation_list(args.rows, args.seed, args.lang, 'list')),
+        ('cancel', reservation_list(args.rows, args.seed, args.lang, 'cancel')),
+        ('otb', otb_export(seed=args.seed, lang=args.lang)),
+    ]
+    for kind, raw in jobs:
+        path = os.path.join(args.out, file_name(kind, args.format, args.lang))
+        write(raw, path)
+        print(f"{path}  ({len(raw):,}행)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# 모듈 경로 상수(PICKUP_CACHE_DIR 등)는 import 시점에 정해지므로 테스트 모듈 import 전에 임시 폴더로
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['PICKUP_CACHE_DIR'] = tempfile.mkdtemp(prefix='pickup_test_')
+os.environ['PICKUP_PERF_LOG'] = '0'
+os.environ['PICKUP_INGEST_WORKERS'] = '1'
+os.environ['PICKUP_REPORT_WORKERS'] = '1'
@@ -0,0 +1,173 @@
+import pytest
+
+from bulk_writer import (IngestLedger, Occurrences, PartialWriteError, TokenBucket, ingest_chunks, ingest_frame, row_hashes,
+                         write_chunks)
+from fake_sheets import FakeWorksheet
+from ingest import parse_bytes
+from netting import NettingIndex
+from sheet_sync import SheetSync
+from storage import MirroredStore, SheetStore, SQLiteStore
+
+HEADER = "투숙객,입실일자,예약일,객실수,박수,객실료,총금액,세그먼트,거래처,객실타입,국적,리드타임\n"
+GROUP = "GROUP ABC,2025-08-10,2025-07-01,1,2,200000,200000,GRP,Hanatour,STD,KOR,40\n"
+SINGLE = "김민수,2025-08-11,2025-07-02,1,1,90000,90000,FIT,Direct,STD,KOR,40\n"
+
+
+def _parse(body, name="Reservation_List.csv", status="Booked"):
+    return parse_bytes(name, (HEADER + body).encode('utf-8'), status)
+
+
+def _open(tmp_path):
+    return SQLiteStore(str(tmp_path / 'facts.db')), IngestLedger(str(tmp_path / 'ledger.db'))
+
+
+def test_identical_lines_in_one_file_are_kept(tmp_path):
+    store, ledger = _open(tmp_path)
+    df = _parse(GROUP * 3 + SINGLE)
+    assert df['RN'].sum() == 7
+
+    assert ingest_frame(store, df, ledger) == 4
+    assert store.read()['RN'].sum() == 7
+    # 같은 파일을 다시 넣으면 아무것도 추가되지 않음
+    assert ingest_frame(store, df, ledger) == 0
+    assert store.count() == 4
+
+
+def test_later_upload_only_adds_rows_beyond_earlier_ones(tmp_path):
+    store, ledger = _open(tmp_path)
+    assert ingest_frame(store, _parse(GROUP * 2), ledger) == 2
+    # 다음 리포트에 같은 객실이 1건 더 생김 -> 1행만 추가
+    assert ingest_frame(store, _parse(GROUP * 3 + SINGLE), ledger) == 2
+    assert store.count() == 4
+
+
+def test_occurrences_continue_across_chunks():
+    df = _parse(GROUP * 3 + SINGLE)
+    whole = row_hashes(df)
+    occ = Occurrences()
+    chunked = list(row_hashes(df.iloc[:2], occ)) + list(row_hashes(df.iloc[2:], occ))
+    assert chunked == list(whole)
+    assert len(set(whole)) == 4
+
+
+def test_netting_counts_identical_bookings(tmp_path):
+    netting = NettingIndex(str(tmp_path / 'netting.db'))
+    df = _parse(GROUP * 3)
+    netting.add(df, row_hashes(df))
+    netting.add(df, row_hashes(df))
+    out = netting.net([])
+    assert out.loc[0, 'Bookings'] == 3
+    assert out.loc[0, 'Gross_RN'] == 6
+
+
+# --- 시트 쓰기 (가짜 워크시트) ---------------------------------------------------
+class _Disconnecting(FakeWorksheet):
+    # 다음 N 번의 append_rows 가 연결 오류로 실패
+    def __init__(self, *args, drops=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.drops = drops
+
+    def append_rows(self, values, **kwargs):
+        if self.drops > 0:
+            self.drops -= 1
+            raise ConnectionError("connection reset")
+        super().append_rows(values, **kwargs)
+
+
+def _write(ws, rows, **kwargs):
+    return write_chunks(ws, rows, bucket=TokenBucket(rate=1e9, capacity=1e9), chunk_rows=2, sleep=lambda s: None, **kwargs)
+
+
+def test_write_chunks_retries_429():
+    ws = FakeWorksheet(fail_writes=3)
+    rows = [[str(i)] for i in range(5)]
+    assert _write(ws, rows) == 5
+    assert ws.rows == rows
+
+
+def test_write_chunks_resumes_after_429_limit():
+    ws = FakeWorksheet()
+    rows = [[str(i)] for i in range(5)]
+    done = []
+    _write(ws, rows[:2], on_chunk=lambda a, b: done.append(b))
+    ws.fail_writes = 10
+    with pytest.raises(PartialWriteError) as e:
+        _write(ws, rows[2:], max_retries=3)
+    assert e.value.written == 0
+    assert ws.fail_writes == 7
+    ws.fail_writes = 0
+    # 남은 행부터 다시 기록하면 빠짐/중복 없이 이어짐
+    assert _write(ws, rows[2 + e.value.written:]) == 3
+    assert ws.rows == rows
+    assert done == [2]
+
+
+def test_write_chunks_wraps_transport_errors():
+    ws = _Disconnecting(drops=1)
+    with pytest.raises(PartialWriteError) as e:
+        _write(ws, [['a'], ['b'], ['c']])
+    assert e.value.written == 0
+    assert isinstance(e.value.cause, ConnectionError)
+
+
+class _Interrupted(SQLiteStore):
+    # append 가 앞의 limit 행만 기록한 뒤 중단 (시트 저장소의 429 한도 초과와 같은 상황)
+    limit = None
+
+    def append(self, df, on_chunk=None):
+        if self.limit is None or len(df) <= self.limit:
+            return super().append(df, on_chunk=on_chunk)
+        super().append(df.iloc[:self.limit], on_chunk=on_chunk)
+        raise PartialWriteError(self.limit, RuntimeError("quota"))
+
+
+def test_partial_write_indexes_only_written_rows(tmp_path):
+    store = _Interrupted(str(tmp_path / 'facts.db'))
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    netting = NettingIndex(str(tmp_path / 'netting.db'))
+    df = _parse(GROUP * 3 + SINGLE)
+
+    store.limit = 2
+    with pytest.raises(PartialWriteError) as e:
+        ingest_chunks(store, ledger, [df], netting=netting)
+    assert e.value.written == 2
+    assert netting.net([])['Bookings'].sum() == 2
+
+    # 다시 반영하면 남은 행만 기록되고 상계 인덱스도 저장소와 같아짐
+    store.limit = None
+    assert ingest_chunks(store, ledger, [df], netting=netting) == (4, 2)
+    assert store.count() == 4
+    assert netting.net([])['Bookings'].sum() == 4
+
+
+def test_mirror_keeps_pending_rows_after_connection_error(tmp_path):
+    store, ledger = _open(tmp_path)
+    ws = _Disconnecting([], 'DB', drops=1)
+    mirror = SheetStore(ws)
+    mirror.sync = SheetSync(ws, cache_dir=str(tmp_path / 'sync'))
+    mirrored = MirroredStore(store, mirror, pending_path=str(tmp_path / 'pending.parquet'), retry_seconds=0)
+
+    # 로컬 DB/장부는 기록되었으므로 오류 없이 미반영 상태로만 남김
+    assert ingest_frame(mirrored, _parse(SINGLE), ledger) == 1
+    assert store.count() == 1
+    assert mirrored.pending == 1 and 'connection reset' in mirrored.mirror_error
+    # 다음 업로드 때 보관된 행을 먼저 이어서 기록
+    ingest_frame(mirrored, _parse(GROUP), ledger)
+    assert mirrored.pending == 0 and mirrored.mirror_error is None
+    assert [r[0] for r in ws.rows[1:]] == ['김민수', 'GROUP ABC']
+
+
+def test_netting_rebuild_in_chunks_keeps_identical_bookings(tmp_path):
+    store, ledger = _open(tmp_path)
+    ingest_frame(store, _parse(GROUP * 3 + SINGLE), ledger)
+
+    class Chunked:
+        def iter_read(self):
+            return store.iter_read(2)
+
+    netting = NettingIndex(str(tmp_path / 'netting.db'))
+    netting.rebuild(Chunked())
+    assert netting.built
+    out = netting.net([])
+    assert out['Bookings'].tolist() == [4]
+    assert out['Gross_RN'].tolist() == [7]
@@ -0,0 +1,24 @@
+import pandas as pd
+
+import cli
+
+HEADER = "투숙객,입실일자,예약일,객실수,박수,객실료,총금액,세그먼트,거래처,객실타입,국적,리드타임\n"
+BODY = ("GROUP ABC,2025-08-10,2025-07-01,1,2,200000,200000,GRP,Hanatour,STD,KOR,40\n"
+        "김민수,2025-08-11,2025-07-02,1,1,90000,90000,FIT,Direct,STD,KOR,40\n")
+
+
+def test_each_db_gets_its_own_ledger_and_indexes(tmp_path, capsys):
+    path = tmp_path / 'Reservation_List.csv'
+    path.write_text(HEADER + BODY, encoding='utf-8')
+    for name in ('a.db', 'b.db'):
+        db = str(tmp_path / name)
+        assert cli.main(['--db', db, 'ingest', str(path), '--workers', '1']) == 0
+        assert "신규 2행 반영" in capsys.readouterr().out
+        # 같은 DB 에 다시 넣으면 장부가 파일을 알아봄
+        assert cli.main(['--db', db, 'ingest', str(path), '--workers', '1']) == 0
+        assert "신규 0행 반영" in capsys.readouterr().out
+    assert (tmp_path / 'a.ledger.db').exists() and (tmp_path / 'b.netting.db').exists()
+
+    out = tmp_path / 'net.csv'
+    assert cli.main(['--db', str(tmp_path / 'b.db'), 'net', '--by', '', '--out', str(out)]) == 0
+    assert pd.read_csv(out)['Bookings'].tolist() == [2]
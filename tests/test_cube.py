@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import LEAD_BINS, LEAD_LABELS, budget_vs_actual, build_cube, lead_rollup, rollup, slice_cube
+from ingest import process_data
+from schema import to_storage, to_typed, with_derived
+from synthdata import as_upload, file_name, otb_export, reservation_list
+
+
+@pytest.fixture(scope='module')
+def facts():
+    # 예약/취소 리스트 + OTB (저장소에서 읽은 것과 같은 타입 지정 프레임)
+    frames = [
+        process_data(as_upload(reservation_list(1500, seed=11, start='2025-01-01', days=240), file_name('list', 'csv')), 'Booked'),
+        process_data(as_upload(reservation_list(1500, seed=11, kind='cancel', start='2025-01-01', days=240),
+                               file_name('cancel', 'csv')), 'Cancelled'),
+        process_data(as_upload(otb_export('2025-03-01', days=90, seed=11), file_name('otb', 'xlsx', snapshot='2025-03-01')),
+                     'Booked', 'Month'),
+    ]
+    df = to_typed(to_storage(pd.concat(frames, ignore_index=True)))
+    return with_derived(df, ['Stay_Month', 'Booking_Month', 'Day_Type', 'Is_Zero_Rate'])
+
+
+def _raw(df, status=None, zero_rate=None, otb=False):
+    # 큐브 없이 원본 행을 같은 조건으로 거름
+    mask = pd.Series(True, index=df.index)
+    if status is not None:
+        mask &= df['Status'] == status
+    if zero_rate is not None:
+        mask &= df['Is_Zero_Rate'] == zero_rate
+    if otb is not None:
+        mask &= df['Segment'].astype(str).str.contains('OTB') == otb
+    out = df[mask].copy()
+    out['Lead_Group'] = pd.cut(out['Lead_Time'], bins=LEAD_BINS, labels=LEAD_LABELS)
+    return out
+
+
+def _oracle(raw, dims):
+    out = raw.groupby(dims, observed=True)[['RN', 'Room_Revenue']].sum().reset_index()
+    out['ADR'] = (out['Room_Revenue'] / out['RN']).fillna(0)
+    return out
+
+
+def _same(got, expected, dims):
+    key = lambda d: d.assign(**{c: d[c].astype(str) for c in dims}).sort_values(dims).reset_index(drop=True)
+    got, expected = key(got), key(expected)
+    assert got[dims].values.tolist() == expected[dims].values.tolist()
+    for m in ('RN', 'Room_Revenue', 'ADR'):
+        np.testing.assert_allclose(got[m].to_numpy(dtype=float), expected[m].to_numpy(dtype=float), err_msg=m)
+
+
+SLICES = [
+    dict(status='Booked', zero_rate=False),
+    dict(status='Cancelled'),
+    dict(otb=True),
+    dict(otb=None),
+]
+DIMS = [['Segment'], ['Stay_Month', 'Segment'], ['Account', 'Room_Type'], ['Booking_Month', 'Stay_Month'], ['Day_Type', 'Lead_Group']]
+
+
+@pytest.mark.parametrize('where', SLICES)
+@pytest.mark.parametrize('dims', DIMS)
+def test_rollup_matches_groupby(facts, where, dims):
+    cube = slice_cube(build_cube(facts), **where)
+    _same(rollup(cube, dims), _oracle(_raw(facts, **where), dims), dims)
+
+
+def test_cube_is_smaller_than_rows(facts):
+    cube = build_cube(facts)
+    assert len(cube) < len(facts)
+    assert cube['RN'].sum() == facts['RN'].sum()
+
+
+@pytest.mark.parametrize('where', SLICES[:2])
+def test_lead_rollup_matches_groupby(facts, where):
+    got = lead_rollup(slice_cube(build_cube(facts), **where))
+    expected = _oracle(_raw(facts, **where), ['Lead_Group']).set_index('Lead_Group').reindex(LEAD_LABELS, fill_value=0)
+    assert got['Lead_Group'].astype(str).tolist() == LEAD_LABELS
+    np.testing.assert_allclose(got['RN'].to_numpy(dtype=float), expected['RN'].to_numpy(dtype=float))
+    np.testing.assert_allclose(got['ADR'].to_numpy(dtype=float), expected['ADR'].to_numpy(dtype=float))
+
+
+def test_budget_vs_actual_matches_groupby(facts):
+    cube = slice_cube(build_cube(facts), status='Booked', zero_rate=False)
+    actual = _raw(facts, status='Booked', zero_rate=False).groupby('Stay_Month', observed=True)['Room_Revenue'].sum()
+    months = [str(m) for m in actual.index]
+    budget = pd.DataFrame({'Month': [months[0], months[1], '2030-01'], 'Budget': [1e8, 0, 5e7]})
+    out = budget_vs_actual(cube, budget).set_index('Stay_Month')
+
+    assert list(out.index) == sorted(set(months) | {'2030-01'})
+    np.testing.assert_allclose(out.loc[months, 'Room_Revenue'].to_numpy(), actual.to_numpy())
+    assert out.loc['2030-01', 'Room_Revenue'] == 0
+    assert out.loc[months[0], 'Achievement'] == round(actual.iloc[0] / 1e8 * 100, 1)
+    # 예산 0 / 예산 없는 월은 달성률 없음
+    assert out.loc[months[1:], 'Achievement'].isna().all()
+
+
+def test_empty_slice(facts):
+    cube = slice_cube(build_cube(facts), status='No_Show')
+    assert cube.empty
+    for dims in DIMS:
+        out = rollup(cube, dims)
+        assert out.empty and list(out.columns) == dims + ['RN', 'Room_Revenue', 'ADR']
+    lead = lead_rollup(cube)
+    assert lead['Lead_Group'].astype(str).tolist() == LEAD_LABELS and (lead[['RN', 'Room_Revenue', 'ADR']] == 0).all().all()
+    out = budget_vs_actual(cube, pd.DataFrame({'Month': ['2025-01'], 'Budget': [1e8]}))
+    assert out['Stay_Month'].tolist() == ['2025-01'] and out['Room_Revenue'].tolist() == [0] and out['Achievement'].tolist() == [0]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from curve import STLY_DAYS, booking_curves, lead_days, period_curve, stly
+
+
+def _bookings(n=2000, seed=0, start='2024-01-01', days=500):
+    rng = np.random.default_rng(seed)
+    stay = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n), unit='D')
+    lead = rng.integers(0, 60, n)
+    booked = pd.Series(stay - pd.to_timedelta(lead, unit='D'))
+    # 예약일 없는 행(구 스키마/OTB 와 같은 형태) -> 파일 리드타임 사용
+    booked[rng.random(n) < 0.1] = pd.NaT
+    return pd.DataFrame({
+        'CheckIn_dt': stay,
+        'Booking_dt': booked,
+        'Lead_Time': rng.integers(0, 60, n),
+        'Segment': rng.choice(['OTA', 'FIT', 'GRP'], n),
+        'RN': rng.integers(1, 4, n),
+        'Room_Revenue': rng.integers(1, 40, n) * 10000.0,
+    })
+
+
+def _oracle(df, measure, max_lead):
+    # (입실일, 리드 일수) 합계 -> 리드 일수 d 이상 누적
+    g = df.assign(lead=np.minimum(lead_days(df), max_lead)).groupby(['CheckIn_dt', 'lead'])[measure].sum()
+    daily = g.unstack('lead').reindex(columns=range(max_lead + 1)).fillna(0)
+    return daily.iloc[:, ::-1].cumsum(axis=1).iloc[:, ::-1]
+
+
+def test_curve_matches_groupby():
+    df = _bookings()
+    curves = booking_curves(df, max_lead=30, asof='2030-01-01')
+    for m in ('RN', 'Room_Revenue'):
+        expected = _oracle(df, m, 30)
+        got = curves[m].loc[expected.index]
+        np.testing.assert_allclose(got.to_numpy(), expected.to_numpy())
+        # 예약이 없는 입실일은 0
+        assert (curves[m].drop(expected.index) == 0).all().all()
+
+
+def test_segment_filter_matches_groupby():
+    df = _bookings(seed=1)
+    got = booking_curves(df, ['GRP'], max_lead=20, asof='2030-01-01')['RN']
+    expected = _oracle(df[df['Segment'] == 'GRP'], 'RN', 20)
+    np.testing.assert_allclose(got.loc[expected.index].to_numpy(), expected.to_numpy())
+
+
+def test_future_lead_days_are_masked():
+    df = _bookings(seed=2, start='2025-03-01', days=60)
+    asof = pd.Timestamp('2025-03-20')
+    rn = booking_curves(df, max_lead=30, asof=asof)['RN']
+    seen = rn.index.to_numpy()[:, None] - pd.to_timedelta(rn.columns.to_numpy(), unit='D').to_numpy()[None, :] <= asof.to_datetime64()
+    assert rn.notna().to_numpy().tolist() == seen.tolist()
+    # 이미 지난 입실일은 전 구간 관측
+    assert rn.loc[:asof].notna().all().all()
+
+
+def test_stly_aligns_52_weeks_back():
+    df = _bookings(seed=3, start='2024-01-01', days=730)
+    rn = booking_curves(df, max_lead=30, asof='2030-01-01')['RN']
+    ly = stly(rn)
+    day = pd.Timestamp('2025-06-18')
+    pd.testing.assert_series_equal(ly.loc[day], rn.loc[day - pd.Timedelta(days=STLY_DAYS)], check_names=False)
+    assert day.weekday() == (day - pd.Timedelta(days=STLY_DAYS)).weekday()
+    # 52주 전 자료가 없는 입실일은 NaN
+    assert ly.loc[rn.index[0]].isna().all()
+
+    pc = period_curve({'RN': rn}, '2025-06-01', '2025-06-30')
+    shifted = rn.loc['2025-06-01':'2025-06-30'].index - pd.Timedelta(days=STLY_DAYS)
+    np.testing.assert_allclose(pc['RN_LY'].to_numpy(), rn.loc[shifted].sum().to_numpy())
@@ -0,0 +1,68 @@
+from bulk_writer import IngestLedger
+from fake_sheets import FakeWorksheet
+from ingest import _NamedBytes, ingest_file
+from ingest_queue import IngestQueue
+from netting import NettingIndex
+from sheet_sync import SheetSync
+from storage import MirroredStore, SheetStore, SQLiteStore
+
+HEADER = "투숙객,입실일자,예약일,객실수,박수,객실료,총금액,세그먼트,거래처,객실타입,국적,리드타임\n"
+GROUP = "GROUP ABC,2025-08-10,2025-07-01,1,2,200000,200000,GRP,Hanatour,STD,KOR,40\n"
+SINGLE = "김민수,2025-08-11,2025-07-02,1,1,90000,90000,FIT,Direct,STD,KOR,40\n"
+
+
+def _queue(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'facts.db'))
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    netting = NettingIndex(str(tmp_path / 'netting.db'))
+    return IngestQueue(store, ledger, workers=1, netting=netting)
+
+
+def _file(name, body, status='Booked'):
+    return name, (HEADER + body).encode('utf-8'), status, 'General'
+
+
+def test_batch_keeps_identical_lines_and_skips_rows_shared_across_files(tmp_path):
+    q = _queue(tmp_path)
+    batch = q.submit([_file('Reservation_List_a.csv', GROUP * 3), _file('Reservation_List_b.csv', GROUP * 3 + SINGLE)])
+    q.wait()
+    assert batch['error'] is None
+    assert [f['state'] for f in batch['files']] == ['완료', '완료']
+    # b 의 GROUP 3행은 a 와 같은 행 -> SINGLE 만 추가
+    assert batch['new'] == 4
+    assert q.store.read()['RN'].sum() == 7
+    assert q.netting.net([])['Bookings'].sum() == 4
+
+    again = q.submit([_file('Reservation_List_b.csv', GROUP * 3 + SINGLE)])
+    q.wait()
+    assert again['files'][0]['state'] == '중복' and again['new'] == 0
+
+
+def test_file_is_written_chunk_by_chunk(tmp_path):
+    q = _queue(tmp_path)
+    upload = _NamedBytes((HEADER + GROUP * 3 + SINGLE * 2).encode('utf-8'), 'Reservation_List_a.csv')
+    # 순번은 청크 사이에서도 이어서 셈 -> 청크 경계에 걸친 동일 행도 모두 유지
+    assert ingest_file(q.store, q.ledger, upload, 'Booked', chunk_rows=2) == 5
+    assert q.store.read()['RN'].sum() == 8
+    assert ingest_file(q.store, q.ledger, upload, 'Booked', chunk_rows=2) == 0
+
+
+class _Offline(FakeWorksheet):
+    # 시트 연결이 끊긴 상태 (append_rows 가 모두 실패)
+    def append_rows(self, values, **kwargs):
+        raise ConnectionError("connection reset")
+
+
+def test_mirror_failure_does_not_stop_the_batch(tmp_path):
+    q = _queue(tmp_path)
+    ws = _Offline([], 'DB')
+    mirror = SheetStore(ws)
+    mirror.sync = SheetSync(ws, cache_dir=str(tmp_path / 'sync'))
+    q.store = MirroredStore(q.store, mirror, pending_path=str(tmp_path / 'pending.parquet'))
+
+    batch = q.submit([_file('Reservation_List_a.csv', GROUP), _file('Reservation_List_b.csv', SINGLE)])
+    q.wait()
+    assert batch['error'] is None
+    assert [f['state'] for f in batch['files']] == ['완료', '완료']
+    assert batch['new'] == 2 and q.store.count() == 2
+    assert q.store.pending == 2 and '2행 미반영' in batch['mirror']
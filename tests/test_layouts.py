@@ -0,0 +1,104 @@
+import json
+
+import pandas as pd
+import pytest
+
+import layouts
+from ingest import header_row_index, process_data
+from layouts import PLAN_VERSION, LayoutRegistry, fingerprint
+from synthdata import as_upload, file_name, otb_export, reservation_list
+
+
+def _list(seed=1, n=200, **kw):
+    return reservation_list(n, seed=seed, start='2025-03-01', days=60, **kw)
+
+
+def _parse(raw, registry, kind='list'):
+    return process_data(as_upload(raw, file_name(kind, 'csv', snapshot='2025-03-01')), 'Booked', registry=registry)
+
+
+def _header(raw):
+    return list(raw.iloc[header_row_index(raw)])
+
+
+def test_known_layout_skips_compile(tmp_path, monkeypatch):
+    registry = LayoutRegistry(str(tmp_path / 'layouts.json'))
+    first = _parse(_list(), registry)
+    assert len(registry.plans) == 1
+
+    # 같은 양식(헤더 해시)이면 키워드 탐색/날짜 추론 없이 저장된 plan 사용
+    def _compile(*args):
+        raise AssertionError('compiled again')
+    monkeypatch.setattr(layouts, 'compile_plan', _compile)
+    again = _parse(_list(), registry)
+    pd.testing.assert_frame_equal(again, first)
+    # 디스크에서 다시 연 등록부도 같은 plan 으로 바로 파싱
+    reopened = LayoutRegistry(str(tmp_path / 'layouts.json'))
+    pd.testing.assert_frame_equal(_parse(_list(), reopened), first)
+    assert reopened.get(fingerprint(_header(_list()), 'list'))['date_formats']['CheckIn'] == '%Y-%m-%d'
+
+
+def test_fingerprint_depends_on_kind_and_header():
+    header = _header(_list())
+    assert fingerprint(header, 'list') == fingerprint([f' {c.upper()} ' for c in header], 'list')
+    assert fingerprint(header, 'list') != fingerprint(header, 'otb')
+    assert fingerprint(header, 'list') != fingerprint(_header(_list(lang='en')), 'list')
+
+
+def test_old_plan_version_is_recompiled(tmp_path):
+    path = tmp_path / 'layouts.json'
+    registry = LayoutRegistry(str(path))
+    _parse(_list(), registry)
+    fp, = registry.plans
+    stale = json.loads(path.read_text(encoding='utf-8'))
+    stale[fp]['version'] = PLAN_VERSION - 1
+    stale[fp]['columns'] = {}
+    path.write_text(json.dumps(stale), encoding='utf-8')
+
+    reopened = LayoutRegistry(str(path))
+    out = _parse(_list(), reopened)
+    assert reopened.get(fp)['version'] == PLAN_VERSION
+    assert 'Conf_No' in reopened.get(fp)['columns'].values()
+    assert (out['Conf_No'] != '').all()
+
+
+def test_save_merges_layouts_from_other_workers(tmp_path):
+    # 병렬 파싱 워커가 각자 등록부를 열고 서로 다른 양식을 등록
+    path = str(tmp_path / 'layouts.json')
+    a, b = LayoutRegistry(path), LayoutRegistry(path)
+    _parse(_list(), a)
+    _parse(_list(lang='en'), b)
+    otb = otb_export('2025-03-01', days=30)
+    b.resolve(list(otb.iloc[3]), otb.iloc[4:], 'otb')
+
+    saved = LayoutRegistry(path).plans
+    assert len(saved) == 3
+    assert sorted(p['kind'] for p in saved.values()) == ['list', 'list', 'otb']
+    assert set(a.plans) <= set(saved) and set(b.plans) <= set(saved)
+    # 열 위치 키는 int 로 복원
+    assert all(isinstance(k, int) for p in saved.values() if p['kind'] == 'list' for k in p['columns'])
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+@pytest.mark.parametrize('mixed', [False, True])
+def test_date_format_that_stops_parsing_falls_back(tmp_path, mixed):
+    registry = LayoutRegistry(str(tmp_path / 'layouts.json'))
+    _parse(_list(seed=1), registry)
+
+    # 같은 헤더인데 PMS 설정이 바뀌어 날짜가 'YYYY.MM.DD' 로 출력됨 (일부 행만일 수도 있음)
+    raw = _list(seed=2)
+    body = raw.index > header_row_index(raw)
+    if mixed:
+        body &= raw.index % 2 == 0
+    for c in (1, 2):
+        raw.loc[body, c] = raw.loc[body, c].str.replace(r'^(\d{4})-(\d{2})-(\d{2})$', r'\1.\2.\3', regex=True)
+    assert raw.loc[body, 1].str.match(r'^\d{4}\.').all()
+
+    out = _parse(raw, registry)
+    # 저장된 plan 은 그대로 (다시 컴파일하지 않음), 형식에 안 맞는 값은 추론 파싱으로 보완
+    assert len(registry.plans) == 1
+    fp, = registry.plans
+    assert registry.get(fp)['date_formats']['CheckIn'] == '%Y-%m-%d'
+    expected = _parse(_list(seed=2), LayoutRegistry(str(tmp_path / 'fresh.json')))
+    assert len(out) == len(expected) > 0
+    pd.testing.assert_frame_equal(out.drop(columns='Snapshot_Date'), expected.drop(columns='Snapshot_Date'))
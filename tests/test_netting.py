@@ -0,0 +1,40 @@
+import pytest
+
+from ingest import process_data
+from netting import NettingIndex
+from synthdata import as_upload, file_name, reservation_list
+
+
+def _lists(fmt, lang='ko', n=300, seed=5):
+    booked = process_data(as_upload(reservation_list(n, seed, lang, 'list'), file_name('list', fmt, lang)), 'Booked')
+    cancelled = process_data(as_upload(reservation_list(n, seed, lang, 'cancel'), file_name('cancel', fmt, lang)), 'Cancelled')
+    return booked, cancelled
+
+
+@pytest.mark.parametrize('fmt,lang', [('csv', 'ko'), ('xlsx', 'en')])
+def test_cancellation_nets_against_booking_by_conf_no(tmp_path, fmt, lang):
+    booked, cancelled = _lists(fmt, lang)
+    assert (booked['Conf_No'] != '').all() and not cancelled.empty
+    assert set(cancelled['Conf_No']) <= set(booked['Conf_No'])
+
+    netting = NettingIndex(str(tmp_path / 'netting.db'))
+    netting.add(booked)
+    netting.add(cancelled)
+    total = netting.net(by=()).iloc[0]
+    assert total['Bookings'] == len(booked)
+    assert total['Cancellations'] == len(cancelled)
+    assert total['Unmatched_Cancellations'] == 0
+    assert total['Net_RN'] == booked['RN'].sum() - cancelled['RN'].sum()
+
+
+def test_rows_without_conf_no_use_composite_key(tmp_path):
+    # 확인번호 열이 없으면 (투숙객, 입실일, 거래처, 객실타입, RN) 로 매칭 -> 거래처가 바뀐 취소는 미매칭
+    booked, cancelled = _lists('csv')
+    booked['Conf_No'] = ''
+    cancelled['Conf_No'] = ''
+    netting = NettingIndex(str(tmp_path / 'netting.db'))
+    netting.add(booked)
+    netting.add(cancelled)
+    total = netting.net(by=()).iloc[0]
+    assert 0 < total['Unmatched_Cancellations'] < len(cancelled)
+    assert total['Cancellations'] + total['Unmatched_Cancellations'] == len(cancelled)
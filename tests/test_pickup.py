@@ -0,0 +1,101 @@
+import pandas as pd
+
+from ingest import iter_process
+from pickup import PickupIndex
+from storage import SQLiteStore
+from synthdata import as_upload, file_name, otb_export
+
+
+def _snapshot(day, seed=1, days=30):
+    # 리포트 기준일부터 days 일치 OTB
+    upload = as_upload(otb_export(day, days=days, seed=seed), file_name('otb', 'csv', snapshot=day))
+    return pd.concat(iter_process(upload, '', snapshot=day), ignore_index=True)
+
+
+def _index(tmp_path, *days):
+    index = PickupIndex(str(tmp_path / 'pickup.db'))
+    for i, day in enumerate(days):
+        index.add(_snapshot(day, seed=i + 1))
+    return index
+
+
+def test_stays_before_later_snapshot_are_not_negative_pickup(tmp_path):
+    index = _index(tmp_path, '2025-08-01', '2025-08-08')
+    out = index.between('2025-08-01', '2025-08-08')
+    assert not out.empty
+    # 08-08 스냅샷에 없는 08-01~08-07 입실일은 픽업 계산에서 제외
+    assert out['Stay_Date'].min() >= pd.Timestamp('2025-08-08')
+    # 08-01 스냅샷 범위(30일) 밖 입실일도 제외
+    assert out['Stay_Date'].max() <= index.otb('2025-08-01')['Stay_Date'].max()
+
+    roll = index.rolling('2025-08-08', windows=[7])
+    assert roll['Stay_Date'].min() >= pd.Timestamp('2025-08-08')
+    merged = roll.merge(out, on=['Stay_Date', 'Segment'], suffixes=('', '_between'))
+    assert len(merged) == len(out)
+    assert (merged['RN'] - merged['RN_between']).abs().max() < 1e-9
+
+
+def test_first_snapshot_keeps_full_range(tmp_path):
+    index = _index(tmp_path, '2025-08-01')
+    with index._connect() as conn:
+        n = conn.execute("SELECT COUNT(*) FROM pickup").fetchone()[0]
+        m = conn.execute("SELECT COUNT(*) FROM otb").fetchone()[0]
+    assert n == m
+
+
+def test_reuploaded_snapshot_replaces_its_stay_dates(tmp_path):
+    index = _index(tmp_path, '2025-08-01', '2025-08-08')
+    # 08-01 리포트를 입실일 12일치로 다시 올림 -> 빠진 입실일은 인덱스에서도 사라짐
+    index.add(_snapshot('2025-08-01', seed=9, days=12))
+    stays = index.otb('2025-08-01')['Stay_Date']
+    assert len(stays) == 12 and stays.max() == pd.Timestamp('2025-08-12')
+
+    # 다음 스냅샷(08-08)의 픽업도 줄어든 범위(08-08 ~ 08-12)로 다시 계산
+    out = index.between('2025-08-01', '2025-08-08')
+    assert out['Stay_Date'].min() == pd.Timestamp('2025-08-08') and out['Stay_Date'].max() == pd.Timestamp('2025-08-12')
+    roll = index.rolling('2025-08-08', windows=[7])
+    assert sorted(roll['Stay_Date']) == sorted(out['Stay_Date'])
+
+
+def test_snapshot_split_across_chunks_is_kept_whole(tmp_path):
+    index = PickupIndex(str(tmp_path / 'pickup.db'))
+    df = _snapshot('2025-08-01')
+    loaded = set()
+    for start in range(0, len(df), 7):
+        index.add(df.iloc[start:start + 7], loaded)
+    assert len(index.otb('2025-08-01')) == len(df)
+
+
+# --- 저장소에서 재구성 -----------------------------------------------------------
+class _Chunked:
+    # iter_read 를 작은 청크로
+    def __init__(self, store, chunk_rows):
+        self.store = store
+        self.chunk_rows = chunk_rows
+
+    def iter_read(self):
+        return self.store.iter_read(self.chunk_rows)
+
+
+def test_rebuild_from_store_in_chunks_matches_incremental(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'facts.db'))
+    days = ['2025-08-01', '2025-08-08']
+    for i, day in enumerate(days):
+        store.append(_snapshot(day, seed=i + 1))
+    incremental = _index(tmp_path, *days)
+
+    rebuilt = PickupIndex(str(tmp_path / 'rebuilt.db'))
+    assert not rebuilt.built
+    rebuilt.rebuild(_Chunked(store, 7))
+    assert rebuilt.built
+    pd.testing.assert_frame_equal(rebuilt.between(*days), incremental.between(*days))
+
+
+def test_built_index_without_otb_is_not_rebuilt(tmp_path):
+    store = _Chunked(SQLiteStore(str(tmp_path / 'facts.db')), 100)
+    index = PickupIndex(str(tmp_path / 'pickup.db'))
+    index.rebuild(store)
+    # 다시 열어도 구성된 상태 (OTB 가 없어 비어 있어도 전체 이력을 다시 읽지 않음)
+    assert PickupIndex(str(tmp_path / 'pickup.db')).built
+    index.clear()
+    assert index.built
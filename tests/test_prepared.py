@@ -0,0 +1,46 @@
+from ingest import process_data
+from prepared import PreparedCache
+from storage import SQLiteStore
+from synthdata import as_upload, file_name, reservation_list
+
+
+class _Store:
+    # 버전을 직접 올리는 저장소 (내용은 그대로)
+    def __init__(self, tmp_path, exact_version=True):
+        db = SQLiteStore(str(tmp_path / 'facts.db'))
+        db.append(process_data(as_upload(reservation_list(300, seed=4), file_name('list', 'csv')), 'Booked'))
+        self.df = db.read()
+        self.version = 0
+        self.exact_version = exact_version
+
+    def read_filtered(self, stay_range=None):
+        return self.df.copy()
+
+
+def _get(cache, store, version):
+    store.version = version
+    return cache.get(store)
+
+
+def test_evicts_least_recently_used_by_bytes(tmp_path):
+    store = _Store(tmp_path)
+    cache = PreparedCache()
+    size = _get(cache, store, 1).nbytes
+    cache.max_bytes = int(size * 2.5)  # 2개까지 보관
+
+    _get(cache, store, 2)
+    _get(cache, store, 3)
+    assert [k[0] for k in cache.entries] == [2, 3]
+    # 2 를 다시 쓰면 가장 오래 안 쓴 항목은 3
+    _get(cache, store, 2)
+    _get(cache, store, 4)
+    assert [k[0] for k in cache.entries] == [2, 4]
+
+
+def test_ttl_applies_only_without_exact_version(tmp_path):
+    cache = PreparedCache(ttl=0)
+    exact = _Store(tmp_path)
+    assert _get(cache, exact, 1) is _get(cache, exact, 1)
+
+    sheet = _Store(tmp_path / 'sheet', exact_version=False)
+    assert _get(cache, sheet, 2) is not _get(cache, sheet, 2)
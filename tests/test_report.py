@@ -0,0 +1,145 @@
+import io
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import report
+from cube import build_cube, slice_cube
+from ingest import process_data
+from report import ReportBuilder, REPORT_FILES, STALE_TMP_SECONDS, report_key
+from schema import to_storage, to_typed
+from synthdata import as_upload, file_name, reservation_list
+
+
+def _cube(seed=5):
+    # 유료 예약 큐브 (화면/CLI 리포트와 같은 입력)
+    df = process_data(as_upload(reservation_list(400, seed=seed, start='2025-01-01', days=120), file_name('list', 'csv')), 'Booked')
+    return slice_cube(build_cube(to_typed(to_storage(df))), 'Booked', False)
+
+
+@pytest.fixture(autouse=True)
+def _tiny_charts(monkeypatch):
+    # 캐시/공개 동작만 보므로 차트는 1x1 PNG 로
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(buf, 'PNG')
+    monkeypatch.setattr(report, 'render_chart', lambda *args: buf.getvalue())
+
+
+@pytest.fixture(scope='module')
+def cube():
+    return _cube()
+
+
+@pytest.fixture
+def builder(tmp_path):
+    b = ReportBuilder(str(tmp_path / 'reports'), workers=1, keep=1)
+    yield b
+    b.close()
+
+
+def _reports(builder):
+    return sorted(os.listdir(builder.root))
+
+
+def test_key_follows_content(cube):
+    budget = pd.DataFrame({'Month': ['2025-01', '2025-02'], 'Budget': [1e8, 2e8]})
+    key = report_key(cube, budget, ('2025-01', '2025-04'))
+    # 같은 내용이면 같은 키 (다시 계산한 큐브도)
+    assert report_key(_cube(), budget.copy(), ('2025-01', '2025-04')) == key
+
+    changed = cube.copy()
+    changed.loc[changed.index[0], 'RN'] += 1
+    assert report_key(changed, budget, ('2025-01', '2025-04')) != key
+    assert report_key(cube, budget.assign(Budget=[1e8, 3e8]), ('2025-01', '2025-04')) != key
+    assert report_key(cube, budget, ('2025-01', '2025-03')) != key
+    assert report_key(cube, None, ('2025-01', '2025-04')) != key
+
+
+def test_unchanged_content_reuses_files(builder, cube, monkeypatch):
+    key, files = builder.build(cube)
+    assert set(files) == set(REPORT_FILES) and all(os.path.getsize(p) > 0 for p in files.values())
+    mtimes = {fmt: os.path.getmtime(p) for fmt, p in files.items()}
+
+    # 같은 키는 섹션/차트/파일을 다시 만들지 않음
+    def _fail(*args):
+        raise AssertionError('rebuilt')
+    monkeypatch.setattr(report, 'report_sections', _fail)
+    again_key, again = builder.build(_cube())
+    assert (again_key, again) == (key, files)
+    assert {fmt: os.path.getmtime(p) for fmt, p in again.items()} == mtimes
+    # 다른 프로세스(재시작 후)의 빌더도 디스크의 파일 사용
+    other = ReportBuilder(builder.root, workers=1)
+    assert other.build(cube) == (key, files) and other.status(key) == '완료'
+
+
+def test_changed_input_rebuilds_and_prunes_old(builder, cube):
+    old, _ = builder.build(cube)
+    changed = cube.copy()
+    changed.loc[changed.index[0], 'Room_Revenue'] += 10000
+    new, files = builder.build(changed)
+    assert new != old
+    assert builder.files(old) is None
+    # keep=1 -> 현재 리포트 하나만 남음
+    assert _reports(builder) == [new]
+    assert sorted(os.listdir(os.path.dirname(files['xlsx']))) == sorted([*REPORT_FILES.values(), 'manifest.json'])
+
+
+def test_keeps_recent_reports(tmp_path, cube):
+    builder = ReportBuilder(str(tmp_path / 'reports'), workers=1, keep=2)
+    try:
+        keys = []
+        for i in range(3):
+            changed = cube.copy()
+            changed.loc[changed.index[0], 'RN'] += i + 1
+            keys.append(builder.build(changed)[0])
+            time.sleep(0.01)
+    finally:
+        builder.close()
+    assert _reports(builder) == sorted(keys[1:])
+
+
+def test_failed_build_publishes_nothing(builder, cube, monkeypatch):
+    def _broken(path, *args):
+        open(path, 'wb').close()
+        raise RuntimeError('pdf')
+    monkeypatch.setattr(report, 'write_pdf', _broken)
+    with pytest.raises(RuntimeError):
+        builder.build(cube)
+    # 만들다 만 임시 폴더는 지워지고, 완성된 리포트로 보이지 않음
+    assert _reports(builder) == []
+    assert builder.status(report_key(cube)) is None
+
+
+def test_stale_tmp_is_pruned_and_fresh_tmp_kept(builder, cube):
+    stale = os.path.join(builder.root, '.stale-build')
+    fresh = os.path.join(builder.root, '.running-build')
+    os.makedirs(stale)
+    os.makedirs(fresh)
+    past = time.time() - STALE_TMP_SECONDS - 60
+    os.utime(stale, (past, past))
+
+    key, _ = builder.build(cube)
+    # 오래된 임시 폴더(중단된 생성)만 정리, 다른 프로세스가 만드는 중인 폴더는 유지
+    assert _reports(builder) == sorted(['.running-build', key])
+
+
+def test_concurrent_finish_keeps_first_report(builder, cube, monkeypatch):
+    # 같은 키를 다른 프로세스가 먼저 완성 -> 이름 바꾸기 실패, 임시 폴더만 지우고 먼저 것 사용
+    key, files = builder.build(cube)
+    marker = os.path.join(builder.root, key, 'first')
+    open(marker, 'w').close()
+    done, checks = builder.files, []
+
+    def _files(k):
+        # 첫 확인 때는 아직 없던 것으로 (확인 후 생성 중에 다른 프로세스가 완성)
+        checks.append(k)
+        return done(k) if len(checks) > 1 else None
+    monkeypatch.setattr(builder, 'files', _files)
+
+    assert builder.build(cube) == (key, files)
+    assert os.path.exists(marker)
+    assert _reports(builder) == [key]
@@ -0,0 +1,92 @@
+from fake_sheets import FakeWorksheet
+from prepared import PreparedCache
+from schema import FACT_COLUMNS
+from sheet_sync import SheetSync
+from storage import SheetStore
+
+
+def _row(name, day='2025-08-01'):
+    values = dict.fromkeys(FACT_COLUMNS, '')
+    values.update(Guest_Name=name, CheckIn=day, Booking_Date=day, RN='1', Room_Revenue='100000',
+                  Total_Revenue='100000', Segment='FIT', Status='Booked', Snapshot_Date=day)
+    return [values[c] for c in FACT_COLUMNS]
+
+
+def _store(tmp_path, rows):
+    ws = FakeWorksheet([FACT_COLUMNS] + rows, 'DB')
+    store = SheetStore(ws)
+    store.sync = SheetSync(ws, cache_dir=str(tmp_path))
+    return ws, store
+
+
+# --- 전체 삭제 후 버전 ---------------------------------------------------------
+def test_clear_keeps_version_increasing(tmp_path):
+    ws, store = _store(tmp_path, [_row('A')])
+    store.read()
+    before = store.version
+    store.clear()
+    assert store.version > before
+    ws.append_rows([_row('B')])
+    store.read()
+    assert store.version > before + 1
+
+
+def test_prepared_cache_does_not_serve_rows_from_before_clear(tmp_path):
+    ws, store = _store(tmp_path, [_row('A')])
+    cache = PreparedCache()
+    assert list(cache.get(store).df['Guest_Name']) == ['A']
+    store.clear()
+    ws.append_rows([_row('B')])
+    assert list(cache.get(store).df['Guest_Name']) == ['B']
+
+
+# --- 증분 동기화 ----------------------------------------------------------------
+def _sync(tmp_path, rows):
+    ws = FakeWorksheet([['Name', 'Value']] + rows, 'DB')
+    return ws, SheetSync(ws, cache_dir=str(tmp_path))
+
+
+def test_refresh_fetches_only_new_rows(tmp_path):
+    ws, sync = _sync(tmp_path, [['a', '1'], ['b', '2']])
+    assert sync.refresh()['Name'].tolist() == ['a', 'b']
+    assert ws.calls == {'get_all_values': 1}
+    v = sync.version
+
+    # 변경 없음 -> 로컬 사본 그대로, 버전 유지
+    assert sync.refresh()['Name'].tolist() == ['a', 'b']
+    assert sync.version == v
+
+    ws.append_rows([['c', '3']])
+    assert sync.refresh().values.tolist() == [['a', '1'], ['b', '2'], ['c', '3']]
+    assert ws.calls == {'get_all_values': 1, 'batch_get': 2, 'append_rows': 1}
+    assert sync.version == v + 1
+
+
+def test_refresh_reloads_after_clear(tmp_path):
+    ws, sync = _sync(tmp_path, [['a', '1'], ['b', '2']])
+    sync.refresh()
+    ws.clear()
+    ws.append_rows([['Name', 'Value'], ['x', '9']])
+    assert sync.refresh().values.tolist() == [['x', '9']]
+    assert ws.calls['get_all_values'] == 2
+
+
+def test_refresh_reloads_after_rewrite(tmp_path):
+    ws, sync = _sync(tmp_path, [['a', '1'], ['b', '2']])
+    sync.refresh()
+    # 행 수는 같고 마지막 행만 바뀜 (시트를 다시 쓴 경우)
+    ws.rows[-1] = ['b', '20']
+    ws.append_rows([['c', '3']])
+    assert sync.refresh().values.tolist() == [['a', '1'], ['b', '20'], ['c', '3']]
+    assert ws.calls['get_all_values'] == 2
+
+
+def test_refresh_uses_prefetched_ranges(tmp_path):
+    ws, sync = _sync(tmp_path, [['a', '1']])
+    sync.refresh()
+    ws.append_rows([['b', '2']])
+    ranges = sync.check_ranges()
+    values = ws.batch_get(ranges)
+    calls = dict(ws.calls)
+    assert sync.refresh(prefetched=(ranges, values))['Name'].tolist() == ['a', 'b']
+    assert ws.calls == calls
@@ -0,0 +1,125 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from bulk_writer import IngestLedger, ingest_frame
+from fake_sheets import FakeWorksheet
+from ingest import process_data
+from schema import FACT_COLUMNS, to_storage
+from sheet_sync import SheetSync
+from storage import MirroredStore, SQLiteStore, SheetStore, filter_months
+from synthdata import as_upload, file_name, otb_export, reservation_list
+
+
+def _facts():
+    booked = process_data(as_upload(reservation_list(400, seed=2, start='2025-01-01', days=200), file_name('list', 'csv')), 'Booked')
+    otb = process_data(as_upload(otb_export('2025-03-01', days=60, seed=2), file_name('otb', 'xlsx', snapshot='2025-03-01')),
+                       'Booked', 'Month')
+    return booked, otb
+
+
+def _sheet_store(tmp_path, frames):
+    rows = [to_storage(df).fillna('').astype(str).values.tolist() for df in frames]
+    ws = FakeWorksheet([FACT_COLUMNS] + sum(rows, []), 'DB')
+    store = SheetStore(ws)
+    store.sync = SheetSync(ws, cache_dir=str(tmp_path / 'sheet'))
+    return store
+
+
+# --- 시트 -> 로컬 DB 최초 가져오기 ------------------------------------------------
+def test_bootstrap_records_sheet_rows_in_ledger(tmp_path):
+    booked, otb = _facts()
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    store = MirroredStore(SQLiteStore(str(tmp_path / 'facts.db')), _sheet_store(tmp_path, [booked, otb]),
+                          pending_path=str(tmp_path / 'pending.parquet'))
+    assert store.bootstrap(ledger) == len(booked) + len(otb)
+    assert store.count() == len(booked) + len(otb)
+
+    # 시트에 이미 있던 파일을 다시 올려도 새 행 없음, 새 행만 있는 파일은 그 행만
+    assert ingest_frame(store, booked, ledger) == 0
+    assert ingest_frame(store, otb, ledger) == 0
+    extra = booked.head(3).assign(Guest_Name='New Guest')
+    assert ingest_frame(store, pd.concat([booked, extra], ignore_index=True), ledger) == 3
+
+
+def test_ledger_from_previous_hash_version_is_rebuilt(tmp_path):
+    booked, otb = _facts()
+    db = SQLiteStore(str(tmp_path / 'facts.db'))
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    ingest_frame(db, pd.concat([booked, otb], ignore_index=True), ledger)
+    with ledger._connect() as conn:
+        ledger._set_meta(conn, 'hashes', 1)
+        conn.execute("UPDATE rows SET hash = hash + 1")
+
+    ledger = IngestLedger(str(tmp_path / 'ledger.db'))
+    assert not ledger.built
+    assert ingest_frame(db, booked, IngestLedger(str(tmp_path / 'ledger.db'))) == len(booked)  # 재구성 전: 중복 적재
+    db.clear()
+    ingest_frame(db, pd.concat([booked, otb], ignore_index=True), IngestLedger(str(tmp_path / 'fresh.db')))
+    assert ledger.rebuild(db) == len(booked) + len(otb)
+    assert ledger.built
+    assert ingest_frame(db, booked, ledger) == 0
+    assert ingest_frame(db, otb, ledger) == 0
+
+
+# --- 월 범위 조회 ------------------------------------------------------------------
+@pytest.mark.parametrize('stay,booking', [
+    (None, None),
+    (('2025-02', '2025-04'), None),
+    (None, ('2024-12', '2025-01')),
+    (('2025-03', '2025-03'), ('2025-01', '2025-02')),
+    (('2030-01', '2030-12'), None),
+])
+def test_sqlite_month_filter_matches_filter_months(tmp_path, stay, booking):
+    booked, otb = _facts()
+    store = SQLiteStore(str(tmp_path / 'facts.db'))
+    store.append(pd.concat([booked, otb], ignore_index=True))
+    # SQL 은 날짜 인덱스 순서로 돌려줄 수 있으므로 행 순서는 맞춰서 비교
+    expected = _sorted(filter_months(store.read(), stay, booking))
+    got = _sorted(store.read_filtered(stay, booking))
+    assert len(got) == len(expected)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def _sorted(df):
+    return to_storage(df).fillna('').astype(str).sort_values(FACT_COLUMNS).reset_index(drop=True)
+
+
+# --- 구 스키마 변환 ----------------------------------------------------------------
+# 기존 앱이 시트/DB 에 쓰던 20열 (파생 컬럼 포함, 예약일 없음)
+OLD_COLUMNS = ['Guest_Name', 'CheckIn', 'RN', 'Room_Revenue', 'Total_Revenue', 'ADR', 'Segment', 'Account', 'Room_Type',
+               'Snapshot_Date', 'Status', 'Stay_Month', 'Booking_Month', 'Stay_YearWeek', 'Lead_Time', 'Day_Type',
+               'Day_of_Week', 'Nat_Group', 'Month_Label', 'Is_Zero_Rate']
+
+
+def test_old_wide_table_is_migrated_to_fact_columns(tmp_path):
+    path = str(tmp_path / 'facts.db')
+    old = pd.DataFrame([
+        ['김민수', '2025-08-11', 2, 180000.0, 200000.0, 90000.0, 'FIT', 'Direct', 'STD', '2025-07-01', 'Booked',
+         '2025-08', '2025-08', '2025-32주', 40, 'Weekday', 'Monday', 'KOR', '3.그외', False],
+        ['OTB_Month_DATA', '2025-08-12', 150, 16500000.0, 16500000.0, 110000.0, 'OTB_Month', 'OTB_Summary',
+         'Run of House', '2025-08-01', 'Booked', '2025-08', '2025-08', '2025-32주', 0, 'Weekday', 'Tuesday', 'KOR',
+         '3.그외', False],
+    ], columns=OLD_COLUMNS)
+    with sqlite3.connect(path) as conn:
+        old.to_sql('facts', conn, index=False)
+
+    store = SQLiteStore(path)
+    with store._connect() as conn:
+        assert [r[1] for r in conn.execute("PRAGMA table_info(facts)")] == FACT_COLUMNS
+    version = store.version
+    assert version > 0
+
+    df = store.read()
+    assert list(df.columns) == FACT_COLUMNS
+    assert df['Guest_Name'].tolist() == ['김민수', 'OTB_Month_DATA']
+    assert df['RN'].tolist() == [2, 150]
+    assert df['Room_Revenue'].tolist() == [180000.0, 16500000.0]
+    # 예약일이 없던 구 스키마는 입실일로 채움, 확인번호는 빈 값
+    assert (df['Booking_Date'] == df['CheckIn']).all()
+    assert df['Conf_No'].tolist() == ['', '']
+    assert store.months() == ['2025-08']
+
+    # 다시 열면 변환하지 않음
+    assert SQLiteStore(path).version == version
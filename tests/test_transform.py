@@ -0,0 +1,204 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import find_valid_header_row, normalize_and_map_columns, process_data
+from schema import to_typed, with_derived
+from synthdata import as_upload, file_name, otb_export, reservation_list
+from transform import day_type, format_dates, month_label, nat_group, safe_ratio, str_contains
+
+# ------------------------------------------------------------------------------
+# 변환 회귀 테스트: 벡터화한 파생 계산이 기존(행 단위 apply) 계산과 같은지
+# ------------------------------------------------------------------------------
+# 아래 _baseline_* 은 벡터화 이전 app.py 의 process_data 파생 계산을 그대로 옮긴 것 (비교 기준)
+
+
+def _frame(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now().normalize()
+    checkin = pd.Series(now + pd.to_timedelta(rng.integers(-400, 400, n), unit='D'))
+    checkin[rng.random(n) < 0.02] = pd.NaT
+    return pd.DataFrame({
+        'CheckIn_dt': checkin,
+        'Guest_Name': rng.choice(['김민수', 'John Smith', 'GROUP ABC', '李雷', 'Tanaka 太郎', '', '합계'], n),
+        'Nat_Orig': rng.choice(['KOR', 'chn', 'HKG', 'Twn', 'MAC', 'USA', 'JPN', '', 'Unknown'], n),
+        'Room_Revenue': rng.choice([0, 90000, 120000.5, -5000], n),
+        'RN': rng.choice([0, 1, 2, 3], n),
+    })
+
+
+def _baseline_nat(row):
+    name = str(row.get('Guest_Name', ''))
+    orig = str(row.get('Nat_Orig', '')).upper()
+    if re.search('[가-힣]', name): return 'KOR'
+    if any(x in orig for x in ['CHN', 'HKG', 'TWN', 'MAC']): return 'CHN'
+    return 'OTH'
+
+
+def _baseline_month_label(row_dt):
+    curr = datetime.now()
+    offset = (row_dt.year - curr.year) * 12 + (row_dt.month - curr.month)
+    if offset == 0: return "0.당월(M)"
+    elif offset == 1: return "1.익월(M+1)"
+    elif offset == 2: return "2.익익월(M+2)"
+    else: return "3.그외"
+
+
+def _same(a, b):
+    assert a.astype(object).where(a.notna(), None).tolist() == b.astype(object).where(b.notna(), None).tolist()
+
+
+@pytest.mark.parametrize('fmt', ['%Y-%m', '%Y-%U주', '%Y-%m-%d', '%A'])
+def test_format_dates_matches_strftime(fmt):
+    dt = _frame()['CheckIn_dt']
+    _same(format_dates(dt, fmt), dt.dt.strftime(fmt))
+
+
+def test_day_name_and_type_match_baseline():
+    dt = _frame()['CheckIn_dt'].dropna()
+    _same(format_dates(dt, '%A'), dt.dt.day_name())
+    weekday = dt.dt.weekday
+    _same(day_type(weekday), weekday.apply(lambda x: 'Weekend' if x >= 4 else 'Weekday'))
+
+
+def test_nat_group_matches_baseline():
+    df = _frame()
+    _same(nat_group(df['Guest_Name'], df['Nat_Orig']), df.apply(_baseline_nat, axis=1))
+
+
+def test_month_label_matches_baseline():
+    dt = _frame()['CheckIn_dt'].dropna()
+    _same(month_label(dt), dt.apply(_baseline_month_label))
+
+
+def test_adr_matches_baseline():
+    df = _frame()
+    expected = df.apply(lambda x: x['Room_Revenue'] / x['RN'] if x['RN'] > 0 else 0, axis=1)
+    np.testing.assert_allclose(safe_ratio(df['Room_Revenue'], df['RN']).to_numpy(), expected.to_numpy())
+
+
+@pytest.mark.parametrize('case', [True, False])
+def test_str_contains_matches_pandas(case):
+    s = _frame()['Guest_Name']
+    pattern = '합계|Total|소계|Subtotal|group'
+    assert str_contains(s, pattern, case=case).tolist() == s.astype(str).str.contains(pattern, case=case, na=False).tolist()
+
+
+# --- 업로드 전체 경로 -------------------------------------------------------------
+# process_data + 조회 시 파생(to_typed / with_derived) 결과를 기존 process_data + 화면 로드 계산과 비교
+# (_baseline 은 벡터화 이전 app.py 의 process_data / 데이터 로드 부분)
+
+COLUMNS = ['Guest_Name', 'CheckIn', 'RN', 'Room_Revenue', 'Total_Revenue', 'Segment', 'Account', 'Room_Type',
+           'Status', 'Lead_Time', 'Nat_Group', 'Stay_Month', 'Booking_Month', 'Stay_YearWeek', 'Day_of_Week',
+           'Day_Type', 'Month_Label', 'Is_Zero_Rate']
+DERIVED = ['Stay_Month', 'Booking_Month', 'Stay_YearWeek', 'Day_of_Week', 'Day_Type', 'Month_Label', 'Is_Zero_Rate', 'ADR']
+
+
+def _baseline(df_raw, status, sub_segment="General", is_otb=False):
+    if is_otb:
+        df_raw = find_valid_header_row(df_raw)
+        if '일자' in df_raw.columns:
+            df_raw = df_raw[~df_raw['일자'].astype(str).str.contains('소계|Subtotal|합계|Total', na=False)]
+        elif df_raw.shape[1] > 0:
+            df_raw = df_raw[~df_raw.iloc[:, 0].astype(str).str.contains('소계|Subtotal|합계|Total', na=False)]
+
+        df = pd.DataFrame()
+        df['Guest_Name'] = f'OTB_{sub_segment}_DATA'
+        date_col = next((c for c in df_raw.columns if '일자' in str(c) or 'Date' in str(c)), df_raw.columns[0])
+        df['CheckIn'] = pd.to_datetime(df_raw[date_col], errors='coerce')
+        df['RN'] = pd.to_numeric(df_raw.iloc[:, -5], errors='coerce').fillna(0)
+        df['Room_Revenue'] = pd.to_numeric(df_raw.iloc[:, -1], errors='coerce').fillna(0)
+        df['Total_Revenue'] = df['Room_Revenue']
+        df['Booking_Date'] = df['CheckIn']
+        df['Segment'] = f'OTB_{sub_segment}'
+        df['Account'] = 'OTB_Summary'
+        df['Room_Type'] = 'Run of House'
+        df['Nat_Orig'] = 'KOR'
+        df['Lead_Time'] = 0
+    else:
+        df_raw = find_valid_header_row(df_raw)
+        df_raw = df_raw[~df_raw.iloc[:, 0].astype(str).str.contains('합계|Total|소계|Subtotal', case=False, na=False)]
+        df = normalize_and_map_columns(df_raw).copy()
+        if 'Guest_Name' in df.columns:
+            df = df[~df['Guest_Name'].astype(str).str.contains('합계|Total|소계|Subtotal', case=False, na=False)]
+        if 'Booking_Date' not in df.columns:
+            df['Booking_Date'] = df['CheckIn']
+        for col in ['Room_Revenue', 'Total_Revenue', 'Rooms', 'Nights', 'Lead_Time']:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        df['Total_Revenue'] = np.where(df['Total_Revenue'] == 0, df['Room_Revenue'], df['Total_Revenue'])
+        df['RN'] = df['Rooms'] * df['Nights'].replace(0, 1)
+        df['ADR'] = df.apply(lambda x: x['Room_Revenue'] / x['RN'] if x['RN'] > 0 else 0, axis=1)
+
+    df['Status'] = status
+    df['CheckIn_dt'] = pd.to_datetime(df['CheckIn'], errors='coerce')
+    df['Booking_dt'] = pd.to_datetime(df['Booking_Date'], errors='coerce')
+    df.loc[df['Booking_dt'].isna(), 'Booking_dt'] = df.loc[df['Booking_dt'].isna(), 'CheckIn_dt']
+    df = df.dropna(subset=['CheckIn_dt'])
+
+    df['Stay_Month'] = df['CheckIn_dt'].dt.strftime('%Y-%m')
+    df['Booking_Month'] = df['Booking_dt'].dt.strftime('%Y-%m')
+    df['Stay_YearWeek'] = df['CheckIn_dt'].dt.strftime('%Y-%U주')
+    df['Day_of_Week'] = df['CheckIn_dt'].dt.day_name()
+    df['Day_Type'] = df['CheckIn_dt'].dt.weekday.apply(lambda x: 'Weekend' if x >= 4 else 'Weekday')
+    df['Lead_Time'] = df['Lead_Time'].fillna(0).astype(int)
+
+    df['Nat_Group'] = df.apply(_baseline_nat, axis=1)
+    df['Month_Label'] = df['CheckIn_dt'].apply(_baseline_month_label)
+    df['CheckIn'] = df['CheckIn_dt'].dt.strftime('%Y-%m-%d')
+    # 화면 로드 시 0원 판정은 총금액 기준
+    df['Is_Zero_Rate'] = df['Total_Revenue'] <= 0
+    return df.reset_index(drop=True)
+
+
+def _current(upload, status, sub_segment="General"):
+    upload.seek(0)
+    df = with_derived(to_typed(process_data(upload, status, sub_segment)), DERIVED)
+    df['CheckIn'] = df['CheckIn'].dt.strftime('%Y-%m-%d')
+    return df
+
+
+def _assert_same(cur, base, columns):
+    assert len(cur) == len(base) > 0
+    for c in columns:
+        a, b = cur[c], base[c]
+        if pd.api.types.is_numeric_dtype(b) and not pd.api.types.is_bool_dtype(b):
+            np.testing.assert_allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), err_msg=c)
+        else:
+            # 기존 OTB 는 빈 프레임에 스칼라를 넣어 투숙객이 NaN (시트에는 빈 값으로 저장됨)
+            assert a.astype(object).fillna('').astype(str).tolist() == b.astype(object).fillna('').astype(str).tolist(), c
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'xlsx'])
+@pytest.mark.parametrize('lang', ['ko', 'en'])
+@pytest.mark.parametrize('kind,status', [('list', 'Booked'), ('cancel', 'Cancelled')])
+def test_list_matches_baseline(lang, fmt, kind, status):
+    raw = reservation_list(1500, seed=7, lang=lang, kind=kind, start=datetime.now().strftime('%Y-%m-01'), days=120)
+    upload = as_upload(raw, file_name(kind, fmt, lang))
+    upload.seek(0)
+    base_raw = pd.read_csv(upload, header=None) if fmt == 'csv' else pd.read_excel(upload, header=None)
+    _assert_same(_current(upload, status), _baseline(base_raw, status), COLUMNS + ['ADR'])
+
+
+@pytest.mark.parametrize('lang', ['ko', 'en'])
+def test_otb_adr_is_revenue_over_rn(lang):
+    # OTB 파일의 ADR 열 대신 매출/RN (판매 객실이 있는 날은 파일 값과 같음)
+    raw = otb_export(days=365, seed=3, lang=lang, pace=0.3)
+    upload = as_upload(raw, file_name('otb', 'xlsx', lang))
+    cur = _current(upload, 'Booked', 'Month')
+    body = raw.iloc[4:-1].reset_index(drop=True)
+    file_adr = pd.to_numeric(body[6]).to_numpy()
+    sold = cur['RN'].to_numpy() > 0
+    assert sold.any() and (~sold).any()
+    np.testing.assert_allclose(cur['ADR'].to_numpy()[sold], file_adr[sold])
+    assert (cur['ADR'].to_numpy()[~sold] == 0).all()
+
+
+@pytest.mark.parametrize('lang', ['ko', 'en'])
+def test_otb_matches_baseline(lang):
+    upload = as_upload(otb_export(days=120, seed=3, lang=lang), file_name('otb', 'xlsx', lang))
+    upload.seek(0)
+    base = _baseline(pd.read_excel(upload, header=None), 'Booked', 'Month', is_otb=True)
+    _assert_same(_current(upload, 'Booked', 'Month'), base, COLUMNS)
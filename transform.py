@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------------------
+# 컬럼 변환 엔진 (행 단위 apply 제거 -> 벡터 연산)
+# ------------------------------------------------------------------------------
+# 날짜 문자열은 고유 날짜 수(수천 개) 만큼만 strftime 한 뒤 코드로 펼침.
+
+WEEKEND_FROM = 4  # 금(4)/토(5)/일(6) = 주말
+CHN_CODES = 'CHN|HKG|TWN|MAC'
+HANGUL = '[가-힣]'
+
+
+def str_contains(s, pattern, case=True):
+    # 고유값에만 정규식 적용 후 코드로 펼침 (세그먼트/국적/소계 라벨 등 반복값이 많음)
+    codes, uniques = pd.factorize(s.astype(str))
+    hit = pd.Series(uniques).str.contains(pattern, case=case, regex=True, na=False).to_numpy(dtype=bool)
+    out = np.zeros(len(codes), dtype=bool)
+    valid = codes >= 0
+    out[valid] = hit[codes[valid]]
+    return pd.Series(out, index=s.index)
+
+
+def safe_ratio(num, den):
+    num = pd.to_numeric(num, errors='coerce')
+    den = pd.to_numeric(den, errors='coerce')
+    return (num / den.where(den > 0)).fillna(0)
+
+
+def conf_number(s):
+    # 확인번호 -> 문자열 ('1000123' / 엑셀 숫자 셀 1000123.0 모두 '1000123', 빈 셀은 '')
+    out = s.astype(object).where(s.notna(), '').astype(str).str.strip()
+    return out.str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+
+
+def parse_dates(s, fmt=None):
+    # 형식을 알면 형식 지정 파싱(빠름). 형식에 안 맞는 값만 기존 추론 파싱으로 보완
+    if fmt is None or pd.api.types.is_datetime64_any_dtype(s):
+        return pd.to_datetime(s, errors='coerce')
+    out = pd.to_datetime(s, format=fmt, errors='coerce')
+    miss = out.isna() & s.notna()
+    if miss.any():
+        out[miss] = pd.to_datetime(s[miss], errors='coerce')
+    return out
+
+
+def format_dates(dt, fmt):
+    codes, uniques = pd.factorize(dt)
+    labels = np.asarray(pd.DatetimeIndex(uniques).strftime(fmt), dtype=object)
+    out = np.full(len(codes), np.nan, dtype=object)
+    valid = codes >= 0
+    out[valid] = labels[codes[valid]]
+    return pd.Series(out, index=dt.index)
+
+
+def day_type(weekday):
+    return pd.Series(np.where(weekday >= WEEKEND_FROM, 'Weekend', 'Weekday'), index=weekday.index)
+
+
+def nat_group(guest_name, nat_orig):
+    is_kor = str_contains(guest_name, HANGUL).to_numpy()
+    is_chn = str_contains(nat_orig, CHN_CODES, case=False).to_numpy()
+    return pd.Series(np.select([is_kor, is_chn], ['KOR', 'CHN'], 'OTH'), index=guest_name.index)
+
+
+def month_offset(dt, now=None):
+    now = now or datetime.now()
+    return (dt.dt.year - now.year) * 12 + (dt.dt.month - now.month)
+
+
+def month_label(dt, now=None):
+    offset = month_offset(dt, now).to_numpy(dtype=float)
+    labels = np.select(
+        [offset == 0, offset == 1, offset == 2, np.isnan(offset)],
+        ["0.당월(M)", "1.익월(M+1)", "2.익익월(M+2)", "Unknown"],
+        "3.그외",
+    )
+    return pd.Series(labels, index=dt.index)